@@ -48,6 +48,20 @@ class ConfigDetails(with_metaclass(SingletonType)):
         self.constPatientName = "XXX"
         self.replaceDateWith = "19000101"
         self.allowMultiplePatientIDs = False
+
+        # DICOM - processing (1 = sequential, 0 = all CPU cores)
+        self.scanProcesses = 1
+        self.descriptorCache = False  # Persistent cache of scanned DICOM descriptors (contains patient data)
+        self.descriptorCacheFileName = "dicom-descriptors.db"  # SQLite file in the working directory of the client
+        self.deidentProcesses = 1
+        self.uidStrategy = "random"  # random or hmac (derived from original UIDs)
+        self.streamPixelData = False  # Copy pixel data from original files instead of reading them
+        self.compactIdentityEncoding = True  # Encrypted attributes in DICOM binary encoding (otherwise pickled)
+        self.studyIdentityRecord = False  # Patient identity encrypted once per study (in the first instance)
+        self.uploadConcurrency = 1  # Number of DICOM upload requests in flight
+        self.uploadBatchInstances = 1  # Maximal number of instances in one upload request
+        self.uploadBatchBytes = 64 * 1024 * 1024  # Maximal size of instances in one upload request
+        self.uploadRetries = 2  # Number of retries of failed upload request
         
         self.applicationConfidentialityProfile = True
         self.retainPatientCharacteristicsOption = True
@@ -68,6 +82,13 @@ class ConfigDetails(with_metaclass(SingletonType)):
         self.autoRTStructMatch = True
         self.autoRTStructRef = False
 
+        # Database - connection pooling
+        self.dbPoolSize = 5  # Number of kept pooled connections
+        self.dbMaxOverflow = 10  # Number of additional connections when pool is exhausted
+        self.dbPoolPrePing = True  # Test pooled connection before it is used
+        self.dbPoolRecycle = 3600  # Seconds after which pooled connection is replaced
+        self.dbSlowQueryThreshold = None  # Seconds after which query is logged as slow (None = disabled)
+
         # Values read from config file
         self.rpbHost = ""
         self.rpbHostPort = ""
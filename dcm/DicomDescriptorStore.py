@@ -0,0 +1,108 @@
+#### ##     ## ########   #######  ########  ########  ######
+ ##  ###   ### ##     ## ##     ## ##     ##    ##    ##    ##
+ ##  #### #### ##     ## ##     ## ##     ##    ##    ##
+ ##  ## ### ## ########  ##     ## ########     ##     ######
+ ##  ##     ## ##        ##     ## ##   ##      ##          ##
+ ##  ##     ## ##        ##     ## ##    ##     ##    ##    ##
+#### ##     ## ##         #######  ##     ##    ##     ######
+
+
+class DicomDescriptorStore(object):
+    """DicomDescriptorStore
+    Columnar storage of light DICOM file descriptors (one row per file).
+    Each tag is stored in its own column (None = tag is missing in the file)
+    and hashable values are indexed (value -> row ids) while the rows are appended,
+    so that the lookups do not need to scan all descriptors.
+    """
+
+    def __init__(self):
+        """Default constructor
+        """
+        self._size = 0
+        self._columns = {}  # Dictionary (key = tag name, value = list of values)
+        self._indexes = {}  # Dictionary (key = tag name, value = dictionary value -> list of row ids)
+        self._unindexed = set()  # Tags with values which cannot be indexed (lists)
+
+    def __len__(self):
+        """Number of stored descriptors
+        """
+        return self._size
+
+    def __iter__(self):
+        """Iterate over descriptors (as dictionaries)
+        """
+        for rowId in range(self._size):
+            yield self.row(rowId)
+
+    def append(self, descriptor):
+        """Add descriptor dictionary as new row
+
+        return: row id
+        """
+        rowId = self._size
+
+        # Missing tags of the row are None in existing columns
+        for tag, column in self._columns.items():
+            column.append(descriptor.get(tag))
+
+        for tag, value in descriptor.items():
+            if tag not in self._columns:
+                self._columns[tag] = [None] * rowId
+                self._columns[tag].append(value)
+
+            if value is not None and tag not in self._unindexed:
+                try:
+                    self._indexes.setdefault(tag, {}).setdefault(value, []).append(rowId)
+                except TypeError:
+                    # Unhashable value, the column can be searched only sequentially
+                    self._unindexed.add(tag)
+                    self._indexes.pop(tag, None)
+
+        self._size += 1
+
+        return rowId
+
+    def row(self, rowId):
+        """Get descriptor dictionary of the row
+        """
+        descriptor = {}
+        for tag, column in self._columns.items():
+            value = column[rowId]
+            if value is not None:
+                descriptor[tag] = value
+
+        return descriptor
+
+    def value(self, rowId, tag):
+        """Get value of the tag in the row (None when missing)
+        """
+        column = self._columns.get(tag)
+        if column is None:
+            return None
+
+        return column[rowId]
+
+    def rowIds(self, tag, value):
+        """Get ids of rows where the tag has specified value
+        """
+        if tag in self._indexes:
+            return list(self._indexes[tag].get(value, []))
+        elif tag in self._columns:
+            return [i for i, v in enumerate(self._columns[tag]) if v is not None and v == value]
+        else:
+            return []
+
+    def belongingTo(self, tag, value):
+        """Get descriptor dictionaries where the tag has specified value
+        """
+        return [self.row(rowId) for rowId in self.rowIds(tag, value)]
+
+    def unique(self, tag):
+        """Get the list of distinct values of the tag
+        """
+        if tag in self._indexes:
+            return list(self._indexes[tag].keys())
+        elif tag in self._columns:
+            return list(set(v for v in self._columns[tag] if v is not None))
+        else:
+            return []
@@ -38,7 +38,7 @@ class DicomSeries(Node):
     # the data, perform some checks, and set the shape and sampling
     # attributes of the instance.
 
-    def __init__(self, suid, showProgress=False, parent=None):
+    def __init__(self, suid, showProgress=False, parent=None, headerOnly=True):
         """Default constructor
         """
         super(DicomSeries, self).__init__(suid, parent)
@@ -47,6 +47,9 @@ class DicomSeries(Node):
         self._datasets = Sequence()
         self._showProgress = showProgress
 
+        # Read only DICOM header (stop before pixel data) when finishing the series
+        self._headerOnly = headerOnly
+
         # Init properties
         self._suid = suid
         self._modality = ""
@@ -502,7 +505,7 @@ class DicomSeries(Node):
           * that the pixel spacing of all images match
         """
         if len(self._files) > 0:
-            dcmFile = dicom.read_file(self._files[0], force=True)
+            dcmFile = dicom.read_file(self._files[0], force=True, stop_before_pixels=self._headerOnly)
 
             if "StudyInstanceUID" in dcmFile:
                 self._studyInstanceUid = dcmFile.StudyInstanceUID
@@ -0,0 +1,131 @@
+#### ##     ## ########   #######  ########  ########  ######
+ ##  ###   ### ##     ## ##     ## ##     ##    ##    ##    ##
+ ##  #### #### ##     ## ##     ## ##     ##    ##    ##
+ ##  ## ### ## ########  ##     ## ########     ##     ######
+ ##  ##     ## ##        ##     ## ##   ##      ##          ##
+ ##  ##     ## ##        ##     ## ##    ##     ##    ##    ##
+#### ##     ## ##         #######  ##     ##    ##     ######
+
+# Standard
+import sys
+
+# DICOM
+if sys.version < "3":
+    from dicom.datadict import DicomDictionary
+else:
+    from pydicom.datadict import DicomDictionary
+
+
+class DicomTagPathExtractor(object):
+    """DicomTagPathExtractor
+    Extracts values of DICOM elements addressed by numeric tag paths
+    in a single traversal of the dataset (only non-private elements).
+
+    Path is a list of tags separated by ">", where all but the last one are sequences
+    e.g. (3006,0039)>(3006,0040)>(3006,0016)>(0008,1155)
+    Path starting with "*>" matches the last tag at any depth e.g. *>(0020,0052)
+
+    The compiled paths are not modified during extraction, so one extractor
+    can be used from several threads or worker processes.
+
+    paths: dictionary (key = name of extracted value, value = path)
+    collected: names of values where all occurrences are collected (otherwise the last one is taken)
+    """
+
+    def __init__(self, paths, collected=None):
+        """Default constructor
+        """
+        self._collected = frozenset(collected or [])
+
+        # Tree of sequence tags, each node holds (tag -> names of values, tag -> child node)
+        self._root = ({}, {})
+        # Tags matched at any depth (tag -> names of values)
+        self._anyDepth = {}
+
+        for name, path in paths.items():
+            self._compile(name, path)
+
+    def extract(self, dataset):
+        """Extract values from the dataset
+
+        return: dictionary (key = name of value, value = element value or list of collected values)
+        """
+        values = {}
+        for name in self._collected:
+            values[name] = []
+
+        self._visit(dataset, self._root, values)
+
+        return values
+
+    def _compile(self, name, path):
+        """Add path to the tree of sequence tags
+        """
+        segments = [s.strip() for s in path.split(">")]
+
+        if segments[0] == "*":
+            if len(segments) != 2:
+                raise ValueError("Any depth path has to address one element: " + path)
+            self._anyDepth.setdefault(self._parseTag(segments[1]), []).append(name)
+            return
+
+        node = self._root
+        for segment in segments[:-1]:
+            node = node[1].setdefault(self._parseTag(segment), ({}, {}))
+
+        node[0].setdefault(self._parseTag(segments[-1]), []).append(name)
+
+    def _visit(self, dataset, node, values):
+        """Traverse dataset elements in tag order and record values of matching elements
+        """
+        names, sequences = node
+
+        for tag in sorted(dataset.keys()):
+
+            # Only non-private elements (odd group number)
+            if (tag >> 16) & 1:
+                continue
+
+            matched = names.get(tag)
+            anyDepthMatched = self._anyDepth.get(tag)
+            child = sequences.get(tag)
+
+            # Element value is needed only when it is addressed or when it is a sequence to descend into
+            isSequence = self._isSequence(tag)
+            if matched is None and anyDepthMatched is None and child is None:
+                if not self._anyDepth or isSequence is False:
+                    continue
+
+            element = dataset[tag]
+
+            if element.VR == "SQ":
+                if child is None:
+                    if not self._anyDepth:
+                        continue
+                    child = ({}, {})
+
+                for item in element.value:
+                    self._visit(item, child, values)
+            else:
+                for name in (matched or []) + (anyDepthMatched or []):
+                    if name in self._collected:
+                        values[name].append(element.value)
+                    else:
+                        values[name] = element.value
+
+    @staticmethod
+    def _isSequence(tag):
+        """Whether the tag is a sequence according to DICOM dictionary (None when unknown)
+        """
+        entry = DicomDictionary.get(tag)
+        if entry is None:
+            return None
+
+        return entry[0] == "SQ"
+
+    @staticmethod
+    def _parseTag(segment):
+        """Convert (gggg,eeee) to numeric tag
+        """
+        group, element = segment.strip("()").split(",")
+        return (int(group, 16) << 16) | int(element, 16)
@@ -0,0 +1,77 @@
+#### ##     ## ########   #######  ########  ########  ######
+ ##  ###   ### ##     ## ##     ## ##     ##    ##    ##    ##
+ ##  #### #### ##     ## ##     ## ##     ##    ##    ##
+ ##  ## ### ## ########  ##     ## ########     ##     ######
+ ##  ##     ## ##        ##     ## ##   ##      ##          ##
+ ##  ##     ## ##        ##     ## ##    ##     ##    ##    ##
+#### ##     ## ##         #######  ##     ##    ##     ######
+
+# Standard
+import csv
+
+
+class DicomUidMap(object):
+    """DicomUidMap
+    Mapping of original DICOM UIDs to their pseudonymised replacements
+    """
+
+    def __init__(self, mapping=None):
+        """Default constructor
+        """
+        # Dictionary (key = original UID, value = pseudonymised UID)
+        self._map = dict(mapping or {})
+
+    def __len__(self):
+        """Number of mapped UIDs
+        """
+        return len(self._map)
+
+    def __contains__(self, original):
+        """Is the original UID mapped
+        """
+        return original in self._map
+
+    def __getitem__(self, original):
+        """Get pseudonymised UID for original UID (KeyError when not mapped)
+        """
+        return self._map[original]
+
+    def get(self, original, default=None):
+        """Get pseudonymised UID for original UID or default
+        """
+        return self._map.get(original, default)
+
+    def add(self, original, pseudonymised):
+        """Map original UID to pseudonymised UID
+        """
+        self._map[original] = pseudonymised
+
+    def originals(self):
+        """List of mapped original UIDs
+        """
+        return list(self._map.keys())
+
+    def items(self):
+        """List of (original UID, pseudonymised UID) pairs
+        """
+        return list(self._map.items())
+
+    def save(self, fileName):
+        """Persist the mapping into CSV file (original UID, pseudonymised UID)
+        """
+        with open(fileName, "w") as f:
+            writer = csv.writer(f)
+            for original in sorted(self._map.keys()):
+                writer.writerow([original, self._map[original]])
+
+    @staticmethod
+    def load(fileName):
+        """Create mapping from CSV file created by save
+        """
+        uidMap = DicomUidMap()
+        with open(fileName, "r") as f:
+            for row in csv.reader(f):
+                if len(row) == 2:
+                    uidMap.add(row[0], row[1])
+
+        return uidMap
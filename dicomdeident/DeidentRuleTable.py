@@ -0,0 +1,108 @@
+#### ##     ## ########   #######  ########  ########  ######
+ ##  ###   ### ##     ## ##     ## ##     ##    ##    ##    ##
+ ##  #### #### ##     ## ##     ## ##     ##    ##    ##
+ ##  ## ### ## ########  ##     ## ########     ##     ######
+ ##  ##     ## ##        ##     ## ##   ##      ##          ##
+ ##  ##     ## ##        ##     ## ##    ##     ##    ##    ##
+#### ##     ## ##         #######  ##     ##    ##     ######
+
+# Standard
+import sys
+
+# DICOM
+if sys.version < "3":
+    from dicom.datadict import DicomDictionary
+else:
+    from pydicom.datadict import DicomDictionary
+
+
+class DeidentRuleTable(object):
+    """De-identification rule table
+    Basic profile (names of removed and replaced attributes) and de-identification options
+    compiled into dispatch table keyed by numeric tag, so that the rule for the element is one lookup.
+
+    Options override the basic profile (the first option defining the attribute wins).
+    Tags which are not in DICOM dictionary (repeating groups, private tags) are resolved
+    according to element name when they are seen for the first time.
+    """
+
+    # Rule actions
+    KEEP = 0  # Keep the element, sequences are de-identified recursively
+    REMOVE = 1  # Remove the element
+    REPLACE = 2  # Replace the element value with default value for VR
+    OPTION = 3  # Perform the action of de-identification option
+
+    def __init__(self, deidentConfig, removeNames, replaceNames, options):
+        """Default constructor
+        """
+        self._removeNames = frozenset(removeNames)
+        self._replaceNames = frozenset(replaceNames)
+
+        # Default values of replaced elements (key = VR)
+        self._replacements = {
+            "PN": deidentConfig.ReplacePersonNameWith,
+            "DA": deidentConfig.ReplaceDateWith,
+            "TM": deidentConfig.ReplaceTimeWith,
+            "DT": deidentConfig.ReplaceDateTimeWith
+        }
+        self._defaultReplacement = deidentConfig.ReplaceDefaultWith
+
+        # Attribute actions of options (key = numeric tag)
+        self._optionActions = {}
+        for option in options:
+            for attribute in option.Attributes:
+                tag = (int(attribute.Group, 16) << 16) | int(attribute.Element, 16)
+                if tag not in self._optionActions:
+                    self._optionActions[tag] = attribute.Action
+
+        # Rules (key = numeric tag, value = (action, attribute action of option or None))
+        self._rules = {}
+        for tag, entry in DicomDictionary.items():
+            rule = self._compile(tag, entry[2])
+            if rule[0] != DeidentRuleTable.KEEP:
+                self._rules[tag] = rule
+
+        self._keepRule = (DeidentRuleTable.KEEP, None)
+
+        # Names of elements which are not compiled have to be resolved only once
+        self._resolved = set(DicomDictionary.keys())
+
+    def __len__(self):
+        """Number of compiled rules which are not keep
+        """
+        return len(self._rules)
+
+    def rule(self, element):
+        """Get (action, attribute action of option or None) for DICOM element
+        """
+        tag = element.tag
+
+        rule = self._rules.get(tag)
+        if rule is not None:
+            return rule
+
+        if tag not in self._resolved:
+            self._resolved.add(tag)
+            rule = self._compile(tag, element.name)
+            if rule[0] != DeidentRuleTable.KEEP:
+                self._rules[tag] = rule
+                return rule
+
+        return self._keepRule
+
+    def replacement(self, vr):
+        """Default value of replaced element with value representation (except SQ)
+        """
+        return self._replacements.get(vr, self._defaultReplacement)
+
+    def _compile(self, tag, name):
+        """Rule for the tag with name
+        """
+        if tag in self._optionActions:
+            return DeidentRuleTable.OPTION, self._optionActions[tag]
+        elif name in self._removeNames:
+            return DeidentRuleTable.REMOVE, None
+        elif name in self._replaceNames:
+            return DeidentRuleTable.REPLACE, None
+        else:
+            return DeidentRuleTable.KEEP, None
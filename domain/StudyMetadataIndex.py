@@ -0,0 +1,106 @@
+#### ##     ## ########   #######  ########  ########  ######
+ ##  ###   ### ##     ## ##     ## ##     ##    ##    ##    ##
+ ##  #### #### ##     ## ##     ## ##     ##    ##    ##
+ ##  ## ### ## ########  ##     ## ########     ##     ######
+ ##  ##     ## ##        ##     ## ##   ##      ##          ##
+ ##  ##     ## ##        ##     ## ##    ##     ##    ##    ##
+#### ##     ## ##         #######  ##     ##    ##     ######
+
+# Prefer C accelerated version of ElementTree for XML parsing
+try:
+    import xml.etree.cElementTree as ET
+except ImportError:
+    import xml.etree.ElementTree as ET
+
+# Namespace maps for reading of XML
+nsmaps = {
+    'odm': 'http://www.cdisc.org/ns/odm/v1.3',
+    'OpenClinica': 'http://www.openclinica.org/ns/odm_ext_v130/v3.1'
+}
+
+
+class StudyMetadataIndex(object):
+    """StudyMetadataIndex
+    ODM study metadata parsed once and indexed by OIDs,
+    so that the metadata queries do not have to parse and search the whole XML document.
+
+    metadata: XML ODM metadata of the study
+    """
+
+    def __init__(self, metadata):
+        """Default constructor
+        """
+        documentTree = ET.ElementTree(ET.fromstring(str(metadata)))
+
+        # ItemDef elements (key = ItemOID)
+        self._itemDefs = {}
+        # ItemOIDs (key = (OpenClinica:FormOIDs, Name))
+        self._itemOids = {}
+        for itemDef in documentTree.iterfind('.//odm:ItemDef', namespaces=nsmaps):
+            oid = itemDef.attrib['OID']
+            self._itemDefs.setdefault(oid, []).append(itemDef)
+
+            key = (itemDef.attrib.get('{http://www.openclinica.org/ns/odm_ext_v130/v3.1}FormOIDs'), itemDef.attrib.get('Name'))
+            self._itemOids.setdefault(key, []).append(oid)
+
+        # ItemGroupOID of the first group referencing the item (key = ItemOID)
+        self._itemGroupOids = {}
+        for group in documentTree.iterfind('.//odm:ItemGroupDef', namespaces=nsmaps):
+            for element in group:
+                if element.tag == "{http://www.cdisc.org/ns/odm/v1.3}ItemRef":
+                    self._itemGroupOids.setdefault(element.attrib['ItemOID'], group.attrib['OID'])
+
+        # StudyEventOIDs referenced in protocol (in order of references)
+        self._studyEventRefs = []
+        for studyEventRef in documentTree.iterfind('.//odm:StudyEventRef', namespaces=nsmaps):
+            self._studyEventRefs.append(studyEventRef.attrib['StudyEventOID'])
+
+        # StudyEventDef elements and FormOIDs of their FormRefs (key = StudyEventOID)
+        self._studyEventDefs = {}
+        self._formRefs = {}
+        for studyEventDef in documentTree.iterfind('.//odm:StudyEventDef', namespaces=nsmaps):
+            oid = studyEventDef.attrib['OID']
+            self._studyEventDefs.setdefault(oid, []).append(studyEventDef)
+
+            formRefs = self._formRefs.setdefault(oid, [])
+            for element in studyEventDef:
+                if element.tag == "{http://www.cdisc.org/ns/odm/v1.3}FormRef":
+                    formRefs.append(element.attrib['FormOID'])
+
+        # The first EDC StudyParameterConfiguration element
+        self._studyParameterConfiguration = documentTree.find('.//OpenClinica:StudyParameterConfiguration', namespaces=nsmaps)
+
+    def itemDefs(self, itemOid):
+        """ItemDef elements with OID
+        """
+        return self._itemDefs.get(itemOid, [])
+
+    def itemOids(self, formOids, itemName):
+        """OIDs of ItemDefs with OpenClinica:FormOIDs attribute and Name
+        """
+        return self._itemOids.get((formOids, itemName), [])
+
+    def itemGroupOid(self, itemOid):
+        """OID of the first ItemGroupDef referencing the item or None
+        """
+        return self._itemGroupOids.get(itemOid)
+
+    def studyEventRefs(self):
+        """StudyEventOIDs referenced in protocol
+        """
+        return self._studyEventRefs
+
+    def studyEventDefs(self, studyEventOid):
+        """StudyEventDef elements with OID
+        """
+        return self._studyEventDefs.get(studyEventOid, [])
+
+    def formRefs(self, studyEventOid):
+        """FormOIDs referenced by StudyEventDef
+        """
+        return self._formRefs.get(studyEventOid, [])
+
+    def studyParameterConfiguration(self):
+        """EDC StudyParameterConfiguration element or None
+        """
+        return self._studyParameterConfiguration
@@ -25,6 +25,7 @@ from contexts.UserDetails import UserDetails
 
 # Domain
 from domain.CrfDicomField import CrfDicomField
+from domain.StudyMetadataIndex import StudyMetadataIndex
 
 # Module UI
 from gui.DicomUploadModuleUI import DicomUploadModuleUI
@@ -126,6 +127,7 @@ class DicomUploadModule(QWidget, DicomUploadModuleUI):
 
         self._selectedStudy = None
         self._studyMetadata = None
+        self._studyMetadataIndex = None
         self._studyParameterConfiguration = None
         self._selectedStudySite = None
         self._selectedStudySubject = None
@@ -516,6 +518,7 @@ class DicomUploadModule(QWidget, DicomUploadModuleUI):
         self._studies = []
         self._selectedStudy = None
         self._studyMetadata = None
+        self._studyMetadataIndex = None
         self._studyParameterConfiguration = None
 
         # OpenClinica study site
@@ -686,14 +689,14 @@ class DicomUploadModule(QWidget, DicomUploadModuleUI):
             self._threadPool.append(
                 WorkerThread(
                     self.ocWebServices.listAllStudySubjectsByStudySite,
-                    [self._selectedStudy, self._selectedStudySite, self._studyMetadata]
+                    [self._selectedStudy, self._selectedStudySite, self._studyMetadataIndex]
                 )
             )
         else:
             self._threadPool.append(
                 WorkerThread(
                     self.ocWebServices.listAllStudySubjectsByStudy,
-                    [self._selectedStudy, self._studyMetadata]
+                    [self._selectedStudy, self._studyMetadataIndex]
                 )
             )
 
@@ -786,6 +789,12 @@ class DicomUploadModule(QWidget, DicomUploadModuleUI):
             eventDefOid = self._selectedStudyEvent.eventDefinitionOID
             studyEventRepeatKey = self._selectedStudyEvent.studyEventRepeatKey
 
+            # Subject key for RESTfull URL (values are loaded from clinical data of the event)
+            if not self._canUseSSIDinREST:
+                studySubjectIdentifier = self._selectedStudySubject.oid
+            else:
+                studySubjectIdentifier = self._selectedStudySubject.label()
+
             # Get annotation for selected event and non-hidden eCRFs which you want to retrieve values for
             annotations = []
             for crfAnnotation in self._crfFieldsAnnotation:
@@ -799,7 +808,16 @@ class DicomUploadModule(QWidget, DicomUploadModuleUI):
             self._threadPool.append(
                 WorkerThread(
                     self.svcHttp.getCrfItemsValues,
-                    [studyoid, sspid, eventDefOid, studyEventRepeatKey, annotations]
+                    [
+                        studyoid,
+                        sspid,
+                        eventDefOid,
+                        studyEventRepeatKey,
+                        annotations,
+                        self._mySite.edc.edcpublicurl,
+                        studyoid,
+                        studySubjectIdentifier
+                    ]
                 )
             )
 
@@ -1134,9 +1152,12 @@ class DicomUploadModule(QWidget, DicomUploadModuleUI):
         else:
             self._studyMetadata = metadata
 
+        # Parse metadata only once, the following metadata queries use the index
+        self._studyMetadataIndex = StudyMetadataIndex(self._studyMetadata)
+
         # Parse the study configuration from metadata
         self._studyParameterConfiguration = self.fileMetaDataService.getStudyParameterConfigurationFromMetadata(
-            self._studyMetadata
+            self._studyMetadataIndex
         )
 
         # Update status bar
@@ -1554,7 +1575,7 @@ class DicomUploadModule(QWidget, DicomUploadModuleUI):
                     i = self.fileMetaDataService.loadCrfItem(
                         crfAnnotation.formoid,
                         crfAnnotation.crfitemoid,
-                        self._studyMetadata
+                        self._studyMetadataIndex
                     )
                     if i is not None:
                         field.label = i.label
@@ -10,6 +10,7 @@
 import sys
 import os
 import platform
+import multiprocessing
 
 # Logging
 import logging
@@ -394,6 +395,28 @@ def configure():
             ConfigDetails().autoRTStructRef = appConfig.getboolean(section, "autortstructref")
         if appConfig.hasOption(section, "requirertstructrename"):
             ConfigDetails().requireRTStructRename = appConfig.getboolean(section, "requirertstructrename")
+        if appConfig.hasOption(section, "scanprocesses"):
+            ConfigDetails().scanProcesses = int(appConfig.get(section)["scanprocesses"])
+        if appConfig.hasOption(section, "descriptorcache"):
+            ConfigDetails().descriptorCache = appConfig.getboolean(section, "descriptorcache")
+        if appConfig.hasOption(section, "deidentprocesses"):
+            ConfigDetails().deidentProcesses = int(appConfig.get(section)["deidentprocesses"])
+        if appConfig.hasOption(section, "uidstrategy"):
+            ConfigDetails().uidStrategy = appConfig.get(section)["uidstrategy"]
+        if appConfig.hasOption(section, "streampixeldata"):
+            ConfigDetails().streamPixelData = appConfig.getboolean(section, "streampixeldata")
+        if appConfig.hasOption(section, "compactidentityencoding"):
+            ConfigDetails().compactIdentityEncoding = appConfig.getboolean(section, "compactidentityencoding")
+        if appConfig.hasOption(section, "studyidentityrecord"):
+            ConfigDetails().studyIdentityRecord = appConfig.getboolean(section, "studyidentityrecord")
+        if appConfig.hasOption(section, "uploadconcurrency"):
+            ConfigDetails().uploadConcurrency = int(appConfig.get(section)["uploadconcurrency"])
+        if appConfig.hasOption(section, "uploadbatchinstances"):
+            ConfigDetails().uploadBatchInstances = int(appConfig.get(section)["uploadbatchinstances"])
+        if appConfig.hasOption(section, "uploadbatchbytes"):
+            ConfigDetails().uploadBatchBytes = int(appConfig.get(section)["uploadbatchbytes"])
+        if appConfig.hasOption(section, "uploadretries"):
+            ConfigDetails().uploadRetries = int(appConfig.get(section)["uploadretries"])
 
     section = "SanityTests"
     if appConfig.hasSection(section):
@@ -402,6 +425,19 @@ def configure():
         if appConfig.hasOption(section, "patientdobmatch"):
             ConfigDetails().patientDobMatch = appConfig.getboolean(section, "patientdobmatch")
 
+    section = "Database"
+    if appConfig.hasSection(section):
+        if appConfig.hasOption(section, "poolsize"):
+            ConfigDetails().dbPoolSize = int(appConfig.get(section)["poolsize"])
+        if appConfig.hasOption(section, "maxoverflow"):
+            ConfigDetails().dbMaxOverflow = int(appConfig.get(section)["maxoverflow"])
+        if appConfig.hasOption(section, "poolpreping"):
+            ConfigDetails().dbPoolPrePing = appConfig.getboolean(section, "poolpreping")
+        if appConfig.hasOption(section, "poolrecycle"):
+            ConfigDetails().dbPoolRecycle = int(appConfig.get(section)["poolrecycle"])
+        if appConfig.hasOption(section, "slowquerythreshold"):
+            ConfigDetails().dbSlowQueryThreshold = float(appConfig.get(section)["slowquerythreshold"])
+
     section = "General"
     if appConfig.hasSection(section):
         if appConfig.hasOption(section, "startupupdatecheck"):
@@ -431,4 +467,6 @@ def configure():
 
 
 if __name__ == '__main__':
+    # DICOM scanning and de-identification use worker processes (also in frozen executable)
+    multiprocessing.freeze_support()
     main()
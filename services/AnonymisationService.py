@@ -9,12 +9,16 @@
 # Standard
 import os
 import sys
+import errno
+import struct
 from string import whitespace
 
 # Crypto
 import uuid
+import hmac
 import hashlib
 import random
+import multiprocessing
 
 # PyQt
 from PyQt4 import QtCore
@@ -24,18 +28,20 @@ if sys.version < "3":
     import dicom
 
     from dicom.dataset import Dataset
+    from dicom.filebase import DicomBytesIO
+    from dicom.filewriter import write_dataset
     from dicom.multival import MultiValue
     from dicom.sequence import Sequence
 else:
     from pydicom import dicomio as dicom
 
     from pydicom.dataset import Dataset
+    from pydicom.filebase import DicomBytesIO
+    from pydicom.filewriter import write_dataset
     from pydicom.multival import MultiValue
     from pydicom.sequence import Sequence
 
 # List
-from blist import blist
-
 # Pickle
 if sys.version < "3":
     import cPickle as pickle
@@ -45,12 +51,16 @@ else:
 # Services
 from services.CryptoService import CryptoService
 
+from dcm.DicomPatient import DicomPatient
+from dcm.DicomUidMap import DicomUidMap
+
 # Contexts
 from contexts.ConfigDetails import ConfigDetails
 
 # Generic library for DICOM de-identification
 from dicomdeident.DeidentConfig import DeidentConfig
 from dicomdeident.DeidentModelLoader import DeidentModelLoader
+from dicomdeident.DeidentRuleTable import DeidentRuleTable
 
  ######  ######## ########  ##     ## ####  ######  ########
 ##    ## ##       ##     ## ##     ##  ##  ##    ## ##
@@ -95,13 +105,33 @@ class AnonymisationService(object):
         self._errorMessage = ""
         self._sourceSize = 0
            
-        # List of original DICOM UID for elements with name in li_NameUID
-        self.li_UID = blist([])
-        # List of anonymised DICOM UID for element with name in li_NameUID
-        self.li_UID_anonym = blist([])
+        # Mapping of original DICOM UIDs (elements with name in li_NameUID) to anonymised ones
+        self._uidMap = DicomUidMap()
+        # Attributes I want to keep and encrypt (Frame Of Reference UID, Patient ID, Patient name,
+        # Patient birth date, SOP Instance UID, Study Instance UID)
+        self._protectedTags = [(0x0020, 0x0052), (0x0010, 0x0020), (0x0010, 0x0010),
+                               (0x0010, 0x0030), (0x0008, 0x0018), (0x0020, 0x000D)]
+
+        # Study-constant identity attributes (Patient ID, Patient name, Patient birth date)
+        # encrypted only once into the carrier instance (None = identity is stored in each instance)
+        self._studyIdentityTags = [(0x0010, 0x0020), (0x0010, 0x0010), (0x0010, 0x0030)]
+        self._studyIdentity = None
+        self._studyIdentityCarrier = None
+
+        # Buffer for copying of pixel data when streaming (bytes)
+        self._copyBufferSize = 1024 * 1024
+
+        # Secret key for deterministic derivation of anonymised UIDs (None = random UIDs)
+        self._uidKey = None
+        # Random UID replacements are mapped before de-identification (pool workers must not generate own)
+        self._uidMapComplete = False
 
         self.__patient = patient
-        
+
+        # New study description (None = remove) and new series descriptions (key = series instance UID)
+        self._studyDescription = None
+        self._seriesDescriptions = {}
+
         if dicomDataRoot is not None:
           self._dicomDataRoot = dicomDataRoot
           self.__series = []
@@ -118,6 +148,13 @@ class AnonymisationService(object):
               if serie.isChecked:
                 self.__series.append(serie)
 
+          if type(self.__study.newDescription) is not str and str(self.__study.newDescription.toUtf8()).decode("utf-8") != "":
+            self._studyDescription = str(self.__study.newDescription.toUtf8())
+
+          for serie in self.__series:
+            if serie.suid not in self._seriesDescriptions:
+              self._seriesDescriptions[serie.suid] = str(serie.newDescription)
+
         self.__mappingRoiDic = mappingRoiDic
 
         # These list for now define the Basic Profile
@@ -393,6 +430,9 @@ class AnonymisationService(object):
                            'Verifying Observer Name',
                            'Verifying Observer Sequence']
 
+        # Basic profile and options compiled into rules for numeric tags
+        self._ruleTable = DeidentRuleTable(self._deidentConfig, self.li_NameRemove, self.li_NameReplace, self._options)
+
 ########  ########   #######  ########  ######## ########  ######## #### ########  ######
 ##     ## ##     ## ##     ## ##     ## ##       ##     ##    ##     ##  ##       ##    ##
 ##     ## ##     ## ##     ## ##     ## ##       ##     ##    ##     ##  ##       ##
@@ -439,6 +479,12 @@ class AnonymisationService(object):
         """
         return self._errorMessage
 
+    @property
+    def uidMap(self):
+        """Mapping of original DICOM UIDs to anonymised UIDs Getter
+        """
+        return self._uidMap
+
 ##     ## ######## ######## ##     ##  #######  ########   ######
 ###   ### ##          ##    ##     ## ##     ## ##     ## ##    ##
 #### #### ##          ##    ##     ## ##     ## ##     ## ##
@@ -462,66 +508,52 @@ class AnonymisationService(object):
         # Get original SOP instance UID of selected RTSTRUCT for referencing in RTPLANs
         originalStructUid = self._getOriginalStructSopUid()
 
+        # Anonymised UIDs are derived from original UIDs with key of the pseudonymised patient,
+        # so the repeated upload of the same study results in the same UIDs
+        if ConfigDetails().uidStrategy == "hmac":
+            self._uidKey = self._svcCrypto.deriveKey("DICOM UID " + str(self.PatientID))
+            self.StudyInstanceUID = self._anonymiseUid(self.__study.suid)
+
+            # UIDs which are read back from uidMap after de-identification are derived in main process
+            # (mappings derived in pool workers are not returned)
+            for study in self._dicomDataRoot.children:
+                for series in study.children:
+                    if series.isChecked:
+                        self._anonymiseUid(series.suid)
+            if originalStructUid:
+                self._anonymiseUid(originalStructUid)
         # As a study UID I will use randomly generated UID
-        self.StudyInstanceUID = str(self._generateDicomUid())
+        else:
+            self._uidKey = None
+            self.StudyInstanceUID = str(self._generateDicomUid())
         self.PatientsName = self._deidentConfig.ReplacePatientNameWith
 
-        # Prepare all UIDs with randomly generated replacements 
-        self._prepareUIDs(filenames, thread)
+        # Study identity record is taken from the first file which also carries it
+        if ConfigDetails().studyIdentityRecord and len(filenames) > 0:
+            self._studyIdentityCarrier = filenames[0]
+            self._studyIdentity = self._readStudyIdentity(self._studyIdentityCarrier)
+        else:
+            self._studyIdentityCarrier = None
+            self._studyIdentity = None
 
-        anonymised = 0
-        
-        # Now anonymise/pseudonymise whole selected original DICOM hierarchy
-        for filename in filenames:
-          dcmFile = dicom.read_file(filename, force=True)
-                  
-          # Keep list of IDAT (PatientID, PatientsName)
-          # TODO: this should be extended about more values also from tags with different VR type
-          idat = []         
-          if self._isValidValue(dcmFile.PatientID):
-            idat.append(dcmFile.PatientID)
-          if self._isValidValue(dcmFile.PatientsName):
-            idat.append(dcmFile.PatientsName)
-
-          # De-identify
-          # print "Replacing study and series descriptions"
-          self._rewriteDicomDescriptions(dcmFile)
-          # print "Encrypting and storing DICOM identity data"
-          self._storeIdentity(dcmFile)
-          # print "De-identification of dcmFile"
-          self._anonymizeDicomUID(dcmFile)
-          # print "Remove private tags"
-          self._removePrivateTags(dcmFile)
-          # print "De-identification of metadata"
-          self._anonymizeDicomUID(dcmFile.file_meta)
-          # print "De-identification of data"
-          self._anonymizeDicomData(dcmFile, idat)
-          # print "Map ROI contours"
-          if ConfigDetails().requireRTStructRename:
-            self._formalizeDicomROIs(dcmFile)
-          # print "Correct RTPlans to point to exactly one RTSTRUCT"
-          self._fixPlanToStructReference(dcmFile, originalStructUid)
-          # print "Correct RTDose to point to exactly one RTSTRUCT"
-          self._fixDoseToStructReference(dcmFile, originalStructUid)
-
-          # Assign pseudonymised PatientID, PatientsName and StudyInstanceUID
-          dcmFile.PatientID = self.PatientID
-          dcmFile.PatientsName = self.PatientsName
-          dcmFile.StudyInstanceUID = self.StudyInstanceUID
-
-          # Save newly de-identified file (filename: modality_randomUID.dcm)
-          dicomExtension = ".dcm"
-          separator = "_"
-          if self._isValidValue(dcmFile.Modality):
-            anonymisedFileName = dcmFile.Modality + separator + str(self._generateDicomUid()) + dicomExtension
-          else:
-            anonymisedFileName = str(self._generateDicomUid()) + dicomExtension            
-          dcmFile.save_as(self._destination + os.sep + anonymisedFileName)
-
-          # Progress
-          if thread:
-              anonymised += 1
-              thread.emit(QtCore.SIGNAL("taskUpdated"), [anonymised, self._sourceSize])
+        processes = ConfigDetails().deidentProcesses
+        if processes == 0:
+            processes = multiprocessing.cpu_count()
+
+        if processes > 1 and len(filenames) > 1:
+            self._makeAnonymousInPool(filenames, originalStructUid, processes, thread)
+        else:
+            anonymised = 0
+
+            # Anonymise/pseudonymise whole selected original DICOM hierarchy in one pass
+            # UIDs get randomly generated replacements when they are seen for the first time
+            for filename in filenames:
+                self._anonymiseFile(filename, originalStructUid)
+
+                # Progress
+                if thread:
+                    anonymised += 1
+                    thread.emit(QtCore.SIGNAL("taskUpdated"), [anonymised, self._sourceSize])
 
 ########  ########  #### ##     ##    ###    ######## ########
 ##     ## ##     ##  ##  ##     ##   ## ##      ##    ##
@@ -544,6 +576,274 @@ class AnonymisationService(object):
 
         return filenames
 
+    def _anonymiseFile(self, filename, originalStructUid):
+        """Anonymise/pseudonymise one DICOM file and save it into destination
+        """
+        # When streaming, only header is read and pixel data are copied from original file
+        dcmFile = None
+        pixelDataRange = None
+        if ConfigDetails().streamPixelData:
+            dcmFile, pixelDataRange = self._readDicomHeader(filename)
+        if dcmFile is None:
+            dcmFile = dicom.read_file(filename, force=True)
+
+        # Keep list of IDAT (PatientID, PatientsName)
+        # TODO: this should be extended about more values also from tags with different VR type
+        idat = []
+        if self._isValidValue(dcmFile.PatientID):
+          idat.append(dcmFile.PatientID)
+        if self._isValidValue(dcmFile.PatientsName):
+          idat.append(dcmFile.PatientsName)
+
+        # De-identify
+        # print "Replacing study and series descriptions"
+        self._rewriteDicomDescriptions(dcmFile)
+        # print "Encrypting and storing DICOM identity data"
+        self._storeIdentity(dcmFile, filename == self._studyIdentityCarrier)
+        # print "De-identification of dcmFile"
+        self._anonymizeDicomUID(dcmFile)
+        # print "Remove private tags"
+        self._removePrivateTags(dcmFile)
+        # print "De-identification of metadata"
+        self._anonymizeDicomUID(dcmFile.file_meta)
+        # print "De-identification of data"
+        self._anonymizeDicomData(dcmFile, idat)
+        # print "Map ROI contours"
+        if ConfigDetails().requireRTStructRename:
+          self._formalizeDicomROIs(dcmFile)
+        # print "Correct RTPlans to point to exactly one RTSTRUCT"
+        self._fixPlanToStructReference(dcmFile, originalStructUid)
+        # print "Correct RTDose to point to exactly one RTSTRUCT"
+        self._fixDoseToStructReference(dcmFile, originalStructUid)
+
+        # Assign pseudonymised PatientID, PatientsName and StudyInstanceUID
+        dcmFile.PatientID = self.PatientID
+        dcmFile.PatientsName = self.PatientsName
+        dcmFile.StudyInstanceUID = self.StudyInstanceUID
+
+        # Save newly de-identified file (filename: modality_randomUID.dcm)
+        dicomExtension = ".dcm"
+        separator = "_"
+        if self._isValidValue(dcmFile.Modality):
+          anonymisedFileName = dcmFile.Modality + separator + str(self._generateDicomUid()) + dicomExtension
+        else:
+          anonymisedFileName = str(self._generateDicomUid()) + dicomExtension
+        dcmFile.save_as(self._destination + os.sep + anonymisedFileName)
+
+        if pixelDataRange is not None:
+            self._copyFileRange(filename, self._destination + os.sep + anonymisedFileName, pixelDataRange)
+
+    def _readStudyIdentity(self, filename):
+        """Dataset with study-constant identity attributes of the file
+        """
+        dcmFile = dicom.read_file(filename, force=True, stop_before_pixels=True)
+
+        studyIdentity = Dataset()
+        for tag in self._studyIdentityTags:
+            if tag in dcmFile:
+                studyIdentity[tag] = dcmFile[tag]
+
+        return studyIdentity
+
+    def _readDicomHeader(self, filename):
+        """Read DICOM file without pixel data and locate the pixel data element in file
+        return: (dataset, (start, end) byte range of pixel data element) or (None, None) when
+        the file cannot be streamed (deflated transfer syntax, elements following pixel data)
+        """
+        with open(filename, "rb") as fp:
+            dcmFile = dicom.read_file(fp, force=True, stop_before_pixels=True)
+
+            # Deflated dataset cannot be copied byte by byte
+            if "TransferSyntaxUID" in dcmFile.file_meta:
+                if dcmFile.file_meta.TransferSyntaxUID == "1.2.840.10008.1.2.1.99":
+                    return None, None
+
+            start = fp.tell()
+            end = self._pixelDataEnd(fp, start, dcmFile.is_little_endian, dcmFile.is_implicit_VR)
+
+            fp.seek(0, os.SEEK_END)
+            size = fp.tell()
+
+        if end is None or end != size:
+            return None, None
+
+        return dcmFile, (start, end)
+
+    def _pixelDataEnd(self, fp, start, isLittleEndian, isImplicitVR):
+        """Find the end of pixel data element which starts at position (None when not found)
+        only element headers and encapsulated item headers are read
+        """
+        endian = "<" if isLittleEndian else ">"
+
+        fp.seek(start)
+        header = fp.read(8)
+        # No pixel data
+        if len(header) == 0:
+            return start
+        if len(header) < 8:
+            return None
+
+        group, element = struct.unpack(endian + "HH", header[:4])
+        if (group, element) != (0x7FE0, 0x0010):
+            return None
+
+        if isImplicitVR:
+            length = struct.unpack(endian + "L", header[4:])[0]
+        elif header[4:6] in (b"OB", b"OW", b"OF", b"UN"):
+            length = struct.unpack(endian + "L", fp.read(4))[0]
+        else:
+            length = struct.unpack(endian + "H", header[6:])[0]
+
+        if length != 0xFFFFFFFF:
+            return fp.tell() + length
+
+        # Encapsulated pixel data: items until sequence delimiter
+        while True:
+            header = fp.read(8)
+            if len(header) < 8:
+                return None
+
+            group, element, length = struct.unpack(endian + "HHL", header)
+            fp.seek(length, os.SEEK_CUR)
+
+            if (group, element) == (0xFFFE, 0xE0DD):
+                return fp.tell()
+
+    def _copyFileRange(self, source, destination, byteRange):
+        """Append byte range of source file to destination file
+        zero-copy where the platform supports it (os.sendfile), otherwise buffered copy
+        """
+        start, end = byteRange
+        offset = start
+
+        with open(source, "rb") as src:
+            # Output of sendfile cannot be opened in append mode
+            with open(destination, "r+b") as dst:
+                dst.seek(0, os.SEEK_END)
+
+                sendfile = getattr(os, "sendfile", None)
+                if sendfile is not None:
+                    try:
+                        while offset < end:
+                            sent = sendfile(dst.fileno(), src.fileno(), offset, end - offset)
+                            if sent == 0:
+                                break
+                            offset += sent
+                    except OSError as err:
+                        # Files are not supported by sendfile on this platform, the rest is copied buffered
+                        if err.errno not in (errno.EINVAL, errno.ENOSYS, errno.ENOTSOCK):
+                            raise
+                        dst.seek(0, os.SEEK_END)
+
+                src.seek(offset)
+                remaining = end - offset
+                while remaining > 0:
+                    chunk = src.read(min(self._copyBufferSize, remaining))
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    remaining -= len(chunk)
+
+    def _makeAnonymousInPool(self, filenames, originalStructUid, processes, thread=None):
+        """Anonymise/pseudonymise files in a pool of worker processes
+        Workers have to agree on UID replacements, so random UIDs are collected
+        (from headers, in parallel) and mapped before the files are rewritten,
+        derived UIDs are the same in each worker without collecting
+        """
+        chunkSize = max(1, min(16, len(filenames) // (processes * 4)))
+
+        if self._uidKey is None:
+            # Collect original UIDs
+            processed = 0
+            originalUids = set()
+            pool = multiprocessing.Pool(processes, _initAnonymisationWorker, (self._workerState(originalStructUid),))
+            try:
+                for uids in pool.imap_unordered(_collectUidsTask, filenames, chunkSize):
+                    originalUids.update(uids)
+
+                    # Progress
+                    if thread:
+                        processed += 1
+                        thread.emit(QtCore.SIGNAL("taskUpdated"), [processed, self._sourceSize])
+                pool.close()
+            finally:
+                pool.terminate()
+                pool.join()
+
+            # Map each original UID to randomly generated UID
+            for uid in sorted(originalUids):
+                self._anonymiseUid(uid)
+            if originalStructUid:
+                self._anonymiseUid(originalStructUid)
+
+        # Rewrite files with complete UID mapping
+        anonymised = 0
+        pool = multiprocessing.Pool(processes, _initAnonymisationWorker, (self._workerState(originalStructUid),))
+        try:
+            for filename in pool.imap_unordered(_anonymiseFileTask, filenames, chunkSize):
+
+                # Progress
+                if thread:
+                    anonymised += 1
+                    thread.emit(QtCore.SIGNAL("taskUpdated"), [anonymised, self._sourceSize])
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def _workerState(self, originalStructUid):
+        """Picklable state which is needed to create the service in worker process
+        """
+        return {
+            "destination": self._destination,
+            "patientNewName": self.__patient.newName,
+            "mappingRoiDic": self.__mappingRoiDic,
+            "patientID": self.PatientID,
+            "patientsName": self.PatientsName,
+            "studyInstanceUID": self.StudyInstanceUID,
+            "studyDescription": self._studyDescription,
+            "seriesDescriptions": self._seriesDescriptions,
+            "originalStructUid": originalStructUid,
+            "uidMap": dict(self._uidMap.items()),
+            "uidKey": self._uidKey,
+            "studyIdentity": self._studyIdentity,
+            "studyIdentityCarrier": self._studyIdentityCarrier,
+            "config": {
+                "retainPatientCharacteristicsOption": ConfigDetails().retainPatientCharacteristicsOption,
+                "retainLongFullDatesOption": ConfigDetails().retainLongFullDatesOption,
+                "retainDeviceIdentityOption": ConfigDetails().retainDeviceIdentityOption,
+                "requireRTStructRename": ConfigDetails().requireRTStructRename,
+                "streamPixelData": ConfigDetails().streamPixelData,
+                "compactIdentityEncoding": ConfigDetails().compactIdentityEncoding,
+                "studyIdentityRecord": ConfigDetails().studyIdentityRecord
+            }
+        }
+
+    @staticmethod
+    def _fromWorkerState(state):
+        """Create the service in worker process
+        """
+        for name, value in state["config"].items():
+            setattr(ConfigDetails(), name, value)
+
+        patient = DicomPatient()
+        patient.newName = state["patientNewName"]
+
+        svc = AnonymisationService(state["destination"], patient, None, state["mappingRoiDic"])
+        svc.PatientID = state["patientID"]
+        svc.PatientsName = state["patientsName"]
+        svc.StudyInstanceUID = state["studyInstanceUID"]
+        svc._studyDescription = state["studyDescription"]
+        svc._seriesDescriptions = state["seriesDescriptions"]
+        svc._originalStructUid = state["originalStructUid"]
+        svc._uidMap = DicomUidMap(state["uidMap"])
+        svc._uidKey = state["uidKey"]
+        svc._uidMapComplete = svc._uidKey is None
+        svc._studyIdentity = state["studyIdentity"]
+        svc._studyIdentityCarrier = state["studyIdentityCarrier"]
+
+        return svc
+
     def _getOriginalStructSopUid(self):
         """Get original SOPInstanceUID of selected RTSTRUCT (for referencing)
         """
@@ -552,71 +852,44 @@ class AnonymisationService(object):
               if series.isChecked and series.modality == "RTSTRUCT":
                 return series.sopInstanceUid
 
-    def _prepareUIDs(self, filenames, thread=None):
-        """Collect original UIDs and prepare the randomly generated ones
-        """
-        processed = 0
-        for filename in filenames:
-          dcmFile = dicom.read_file(filename, force=True)
-           
-          # Collect all original UIDs li_UID  from main dataset as well as meta
-          self._getDicomUID(dcmFile)
-          self._getDicomUID(dcmFile.file_meta)
- 
-          # Progress
-          if thread:
-              processed += 1
-              thread.emit(QtCore.SIGNAL("taskUpdated"), [processed, self._sourceSize])
- 
-        # Remove duplicates from li_UID lists
-        self.li_UID = blist(set(self.li_UID))
-        self.li_UID.sort()
- 
-        # Create li_UID_anonym list filled with randomly generated UID
-        # The list will have the same size as li_UID (mirroring each other)
-        for i in range(len(self.li_UID)):
-            self.li_UID_anonym.append(str(self._generateDicomUid()))
-
-    def _getDicomUID(self, dataset):
-      """Collect list of all DICOM UIDs for elements with names in li_NameUID
-      param dataset: DICOM file or SQ (Sequence of items)
-      """
-      for element in dataset:
-          # When the element is sequence run it recursively
-          if element.VR == "SQ":
-              for sequence in element.value:
-                  self._getDicomUID(sequence)
-          # When the element is unique identifier
-          elif element.VR == "UI":
-              if element.name in self.li_NameUID:
-                  if self._isValidValue(element.value):
-                      self.li_UID.append(element.value)
-
     def _rewriteDicomDescriptions(self, dataset):
         """Apply new study and series descriptions
         """
-        if type(self.__study.newDescription) is not str and str(self.__study.newDescription.toUtf8()).decode("utf-8") != "":
+        if self._studyDescription is not None:
           if "StudyDescription" in dataset:
-            dataset.StudyDescription = str(self.__study.newDescription.toUtf8())
+            dataset.StudyDescription = self._studyDescription
         else:
           if "StudyDescription" in dataset:
             del dataset.StudyDescription
 
-        # Try to replace according to series instance UID 
+        # Try to replace according to series instance UID
+        found = False
         if "SeriesInstanceUID" in dataset:
-          found = False
-          for serie in self.__series:
-            if serie.suid == dataset.SeriesInstanceUID:
-              if "SeriesDescription" in dataset:
-                dataset.SeriesDescription = str(serie.newDescription)
-                found = True
-                break
+          if dataset.SeriesInstanceUID in self._seriesDescriptions:
+            if "SeriesDescription" in dataset:
+              dataset.SeriesDescription = self._seriesDescriptions[dataset.SeriesInstanceUID]
+              found = True
 
         # If no new series description than delete
         if found == False:
           if "SeriesDescription" in dataset:
             del dataset.SeriesDescription
 
+    def _collectDicomUids(self, dataset, originalUids):
+      """Collect set of all DICOM UIDs for elements with names in li_NameUID
+      param dataset: DICOM file or SQ (Sequence of items)
+      """
+      for element in dataset:
+          # When the element is sequence run it recursively
+          if element.VR == "SQ":
+              for sequence in element.value:
+                  self._collectDicomUids(sequence, originalUids)
+          # When the element is unique identifier
+          elif element.VR == "UI":
+              if element.name in self.li_NameUID:
+                  if self._isValidValue(element.value):
+                      originalUids.add(element.value)
+
     def _anonymizeDicomUID(self, dataset):
         """Anonymise DICOM UID elements
         UID values are replaced with randomly generated UID
@@ -630,58 +903,34 @@ class AnonymisationService(object):
             elif element.VR == "UI":
                 if element.name in self.li_NameUID:
                     if self._isValidValue(element.value):
-                        element.value = self.li_UID_anonym[self.li_UID.index(element.value)]  
+                        element.value = self._anonymiseUid(element.value)
 
     def _anonymizeDicomData(self, dataset, idat):
         """Apply de-identification rules for tags in DICOM dataset
         """
         for element in dataset:
-            # First check whether an option is defined which overrides the basic profile
-            if self._optionApplied(element, idat):
-                continue
+            action, optionAction = self._ruleTable.rule(element)
 
+            # Option is defined which overrides the basic profile
+            if action == DeidentRuleTable.OPTION:
+                optionAction.PerformDeident(element, self._deidentConfig, idat)
             # Otherwise continue with basic profile
             # Remove element
-            if element.name in self.li_NameRemove:
+            elif action == DeidentRuleTable.REMOVE:
                 del dataset[element.tag]
             # Replace element with default value
-            elif element.name in self.li_NameReplace:
-                # When element is person name
-                if element.VR == "PN":
-                    element.value = self._deidentConfig.ReplacePersonNameWith
-                # When element is date yyyymmdd
-                elif element.VR == "DA":
-                    element.value = self._deidentConfig.ReplaceDateWith
-                # When element is time hhmmss.frac
-                elif element.VR == "TM":
-                    element.value = self._deidentConfig.ReplaceTimeWith
-                # When element is datetime
-                elif element.VR == "DT":
-                    element.value = self._deidentConfig.ReplaceDateTimeWith
+            elif action == DeidentRuleTable.REPLACE:
                 # When element is sequence
-                elif element.VR == "SQ":
-                    element.value = dicom.sequence.Sequence([dicom.dataset.Dataset()])
-                # The rest replace with empty string
+                if element.VR == "SQ":
+                    element.value = Sequence([Dataset()])
+                # Default value according to VR (person name, date, time, datetime, the rest empty string)
                 else:
-                    element.value = self._deidentConfig.ReplaceDefaultWith
+                    element.value = self._ruleTable.replacement(element.VR)
             # For inner sequences run the anonymise recursive
-            # this should be always the last condition branch
             elif element.VR == "SQ":
                 for sequence in element.value:
                     self._anonymizeDicomData(sequence, idat)
 
-    def _optionApplied(self, dataset, idat):
-        """Try to apply defined de-identification options
-        """
-        wasApplied = False
-        for option in self._options:
-            if not wasApplied:
-                wasApplied = option.Deidentificate(dataset, self._deidentConfig, idat)
-            else:
-                break
-
-        return wasApplied
-
     def _removePrivateTags(self, dataset):
         """Remove private tags from DICOM dataset if there is not special exception defined
         """
@@ -751,59 +1000,122 @@ class AnonymisationService(object):
     def _fixPlanToStructReference(self, dataset, originalStructUid):
         """Make all RTPLANs to refer to one RTSTRUCT that was selected before and harmonised
         """
-        if dataset.Modality == "RTPLAN":
+        if dataset.Modality == "RTPLAN" and originalStructUid is not None:
             if "ReferencedStructureSetSequence" in dataset:
                 for seqItem in dataset.ReferencedStructureSetSequence:
                     if "ReferencedSOPInstanceUID" in seqItem:
-                        if seqItem.ReferencedSOPInstanceUID != self.li_UID_anonym[self.li_UID.index(originalStructUid)]:
-                            seqItem.ReferencedSOPInstanceUID = self.li_UID_anonym[self.li_UID.index(originalStructUid)]
+                        if seqItem.ReferencedSOPInstanceUID != self._anonymiseUid(originalStructUid):
+                            seqItem.ReferencedSOPInstanceUID = self._anonymiseUid(originalStructUid)
 
     def _fixDoseToStructReference(self, dataset, originalStructUid):
         """Make all RTDOSEs to refer to one RTSTRUCT that was selected before and harmonised
         """
-        if dataset.Modality == "RTDOSE":
+        if dataset.Modality == "RTDOSE" and originalStructUid is not None:
             if "ReferencedStructureSetSequence" in dataset:
                 for seqItem in dataset.ReferencedStructureSetSequence:
                     if "ReferencedSOPInstanceUID" in seqItem:
-                        if seqItem.ReferencedSOPInstanceUID != self.li_UID_anonym[self.li_UID.index(originalStructUid)]:
-                            seqItem.ReferencedSOPInstanceUID = self.li_UID_anonym[self.li_UID.index(originalStructUid)]
+                        if seqItem.ReferencedSOPInstanceUID != self._anonymiseUid(originalStructUid):
+                            seqItem.ReferencedSOPInstanceUID = self._anonymiseUid(originalStructUid)
     
-    def _storeIdentity(self, dcmFile):
-        """
+    def _storeIdentity(self, dcmFile, isCarrier=False):
+        """Encrypt original identity attributes into Encrypted Attributes Sequence
+        with study identity record only attributes which differ from the record are kept per instance,
+        the record itself is stored as additional item in the carrier instance
         """
         # Collect attributes I want to keep and encrypt
-        protectedAttributes = []
-
-        # Frame Of Reference UID
-        if "FrameOfReferenceUID" in dcmFile:
-          ds1 = Dataset()
-          ds1[0x0020,0x0052] = dcmFile[0x0020,0x0052]
-          protectedAttributes.append(ds1)
-        # Patient ID
-        if "PatientID" in dcmFile:
-          ds2 = Dataset()
-          ds2[0x0010,0x0020] = dcmFile[0x0010,0x0020]
-          protectedAttributes.append(ds2)
-        # Patient name
-        if "PatientName" in dcmFile:
-          ds3 = Dataset()
-          ds3[0x0010,0x0010] = dcmFile[0x0010,0x0010]
-          protectedAttributes.append(ds3)
-        # Patient birth date
-        if "PatientBirthDate" in dcmFile:
-          ds4 = Dataset()
-          ds4[0x0010,0x0030] = dcmFile[0x0010,0x0030]
-          protectedAttributes.append(ds4)
-        # SOP Instance UID
-        if "SOPInstanceUID" in dcmFile:
-          ds5 = Dataset()
-          ds5[0x0008,0x0018] = dcmFile[0x0008,0x0018]
-          protectedAttributes.append(ds5)
-        # StudyInstance UID
-        if "StudyInstanceUID" in dcmFile:
-          ds6 = Dataset()
-          ds6[0x0020,0x000D] = dcmFile[0x0020,0x000D]
-          protectedAttributes.append(ds6)
+        protectedAttributes = Dataset()
+        for tag in self._protectedTags:
+            if tag in dcmFile:
+                if self._studyIdentity is not None and tag in self._studyIdentity:
+                    if dcmFile[tag].value == self._studyIdentity[tag].value:
+                        continue
+                protectedAttributes[tag] = dcmFile[tag]
+
+        attributeSets = [protectedAttributes]
+        if self._studyIdentity is not None and isCarrier:
+            attributeSets.append(self._studyIdentity)
+        items = self._encryptAttributes(dcmFile, attributeSets)
+
+        # Set the attribute Encrypted Attributes Sequence (0400,0500)
+        # each item consists of two attributes ( (0400,0510); (0400,0520) )
+        t = dicom.tag.Tag((0x400, 0x500))
+        dcmFile[t] = dicom.dataelem.DataElement(t, "SQ", Sequence(items))
+
+        # Set the attribute Patient Identity Removed (0012,0062) to YES
+        t = dicom.tag.Tag((0x12, 0x62))
+        dcmFile[t] = dicom.dataelem.DataElement(t, "CS", "YES")
+
+        # Codes of corresponding profiles and options as a dataset
+        profilesOptionsDs = Dataset()
+
+        # De-identification Method Coding Scheme Designator (0008,0102)
+        t = dicom.tag.Tag((0x8, 0x102))
+
+        profilesOptionsDs[t] = dicom.dataelem.DataElement(t, "DS", MultiValue(dicom.valuerep.DS, self._deidentConfig.GetAppliedMethodCodes()))
+
+        # Set the attribute De-identification method code sequence (0012,0064)
+        # to the created dataset of codes for profiles and options
+        t = dicom.tag.Tag((0x12, 0x64))
+        dcmFile[t] = dicom.dataelem.DataElement(t, "SQ", Sequence([profilesOptionsDs]))
+
+        # A string describing the method used may also be inserted in or added to De-identification Method (0012,0063), but is not required
+
+    def _encryptAttributes(self, dcmFile, attributeSets):
+        """Encrypted Attributes Sequence items, one for each dataset of protected attributes
+        """
+        if ConfigDetails().compactIdentityEncoding:
+            return self._encryptAttributesCompact(attributeSets)
+        else:
+            return [self._encryptAttributesPickled(dcmFile, protectedAttributes) for protectedAttributes in attributeSets]
+
+    def _encryptAttributesCompact(self, attributeSets):
+        """Encrypted Attributes Sequence items with Modified Attributes Sequence (0400,0550)
+        encoded in explicit VR little endian and encrypted into binary tokens (in one batch)
+        """
+        payloads = []
+        for protectedAttributes in attributeSets:
+            # One item of Modified Attributes Sequence holds all attributes I want to keep and encrypt
+            # Instance of Encrypted Attributes Data Set
+            encryptedAttributesDs = Dataset()
+            t = dicom.tag.Tag((0x400, 0x550))
+            encryptedAttributesDs[t] = dicom.dataelem.DataElement(t, "SQ", Sequence([protectedAttributes]))
+
+            # Serialize these original DICOM data in explicit VR little endian transfer syntax
+            fp = DicomBytesIO()
+            fp.is_little_endian = True
+            fp.is_implicit_VR = False
+            write_dataset(fp, encryptedAttributesDs)
+            payloads.append(fp.getvalue())
+
+        items = []
+        for encryptedData in self._svcCrypto.encryptBatch(payloads):
+            # Encrypted Attributes Sequence item with two attributes
+            item = Dataset()
+
+            # Set the attribute Encrypted Content Transfer Syntax UID (0400,0510) to
+            # the UID of the Transfer Syntax used to encode the instance of the Encrypted Attributes Data Set
+            t = dicom.tag.Tag((0x400, 0x510))
+            item[t] = dicom.dataelem.DataElement(t, "UI", "1.2.840.10008.1.2.1")
+
+            # Set the atribute Encrypted Content (0400,0520) to
+            # the data resulting from the encryption of the Encrypted Attributes Data Set instance
+            t = dicom.tag.Tag((0x400, 0x520))
+            item[t] = dicom.dataelem.DataElement(t, "OB", encryptedData)
+
+            items.append(item)
+
+        return items
+
+    def _encryptAttributesPickled(self, dcmFile, protectedAttributes):
+        """Encrypted Attributes Sequence item with pickled Modified Attributes Sequence (0400,0550)
+        encrypted into base64 text (original format)
+        """
+        # Each item of Modified Attributes Sequence holds one attribute I want to keep and encrypt
+        modifiedAttributes = []
+        for element in protectedAttributes:
+            ds = Dataset()
+            ds[element.tag] = element
+            modifiedAttributes.append(ds)
 
         # Instance of Encrypted Attributes Data Set
         encryptedAttributesDs = Dataset()
@@ -811,7 +1123,7 @@ class AnonymisationService(object):
         # Set the Modified Attributes Sequence (0400,0550) to
         # the Attributes to be protected
         t = dicom.tag.Tag((0x400, 0x550))
-        encryptedAttributesDs[t] = dicom.dataelem.DataElement(t, "SQ", Sequence(protectedAttributes))
+        encryptedAttributesDs[t] = dicom.dataelem.DataElement(t, "SQ", Sequence(modifiedAttributes))
 
         # Serialize these original DICOM data to string
         encryptedDicomAttributes = pickle.dumps(encryptedAttributesDs)
@@ -832,34 +1144,41 @@ class AnonymisationService(object):
         t = dicom.tag.Tag((0x400, 0x520))
         item[t] = dicom.dataelem.DataElement(t, "OB", encryptedData)
 
-        # Set the attribute Encrypted Attributes Sequence (0400,0500)
-        # each item consists of two attributes ( (0400,0510); (0400,0520) )
-        t = dicom.tag.Tag((0x400, 0x500))
-        dcmFile[t] = dicom.dataelem.DataElement(t, "SQ", Sequence([item]))
+        return item
 
-        # Set the attribute Patient Identity Removed (0012,0062) to YES
-        t = dicom.tag.Tag((0x12, 0x62))
-        dcmFile[t] = dicom.dataelem.DataElement(t, "CS", "YES")
-
-        # Codes of corresponding profiles and options as a dataset
-        profilesOptionsDs = Dataset()
+    def _isValidValue(self, value):
+        """Proof whether the value is valid for further use
+        """
+        return value != "" and value is not whitespace
 
-        # De-identification Method Coding Scheme Designator (0008,0102)
-        t = dicom.tag.Tag((0x8, 0x102))
+    def _anonymiseUid(self, uid):
+        """Get anonymised replacement of original UID
+        Replacement (randomly generated or derived) is assigned when the UID is used for the first time,
+        pool workers with random UIDs only use the complete mapping collected in main process
+        """
+        anonymisedUid = self._uidMap.get(uid)
+        if anonymisedUid is None:
+            if self._uidKey is not None:
+                anonymisedUid = self._deriveDicomUid(uid)
+            # Locally generated UID would differ from UIDs assigned in other workers
+            elif self._uidMapComplete:
+                raise ValueError("Original UID is missing in collected UID mapping")
+            else:
+                anonymisedUid = str(self._generateDicomUid())
+            self._uidMap.add(uid, anonymisedUid)
 
-        profilesOptionsDs[t] = dicom.dataelem.DataElement(t, "DS", MultiValue(dicom.valuerep.DS, self._deidentConfig.GetAppliedMethodCodes()))
+        return anonymisedUid
 
-        # Set the attribute De-identification method code sequence (0012,0064)
-        # to the created dataset of codes for profiles and options
-        t = dicom.tag.Tag((0x12, 0x64))
-        dcmFile[t] = dicom.dataelem.DataElement(t, "SQ", Sequence([profilesOptionsDs]))
+    def _deriveDicomUid(self, uid, prefix="2.25."):
+        """Derive DICOM UID from original UID with HMAC-SHA256 keyed by UID key
+        The same original UID and key always result in the same UID
+        """
+        maxUidSize = 64
+        availDigits = maxUidSize - len(prefix)
 
-        # A string describing the method used may also be inserted in or added to De-identification Method (0012,0063), but is not required
+        hashVal = hmac.new(self._uidKey, uid.encode("utf-8"), hashlib.sha256)
 
-    def _isValidValue(self, value):
-        """Proof whether the value is valid for further use
-        """
-        return value != "" and value is not whitespace
+        return prefix + str(int(hashVal.hexdigest(), 16))[:availDigits]
 
     def _generateDicomUid(self):
         """Generate unique UID for DICOM element
@@ -894,3 +1213,43 @@ class AnonymisationService(object):
 
         # Convert this to an int with the maximum available digits
         return prefix + str(int(hashVal.hexdigest(), 16))[:availDigits]
+
+##      ##  #######  ########  ##    ## ######## ########   ######
+##  ##  ## ##     ## ##     ## ##   ##  ##       ##     ## ##    ##
+##  ##  ## ##     ## ##     ## ##  ##   ##       ##     ## ##
+##  ##  ## ##     ## ########  #####    ######   ########   ######
+##  ##  ## ##     ## ##   ##   ##  ##   ##       ##   ##         ##
+##  ##  ## ##     ## ##    ##  ##   ##  ##       ##    ##  ##    ##
+ ###  ###   #######  ##     ## ##    ## ######## ##     ##  ######
+
+# Tasks of the de-identification pool have to be module level (picklable) functions
+# each worker process holds its own service created from the state of main service
+
+_workerService = None
+
+
+def _initAnonymisationWorker(state):
+    """De-identification pool worker process initialisation
+    """
+    global _workerService
+    _workerService = AnonymisationService._fromWorkerState(state)
+
+
+def _collectUidsTask(filename):
+    """Collect original UIDs (elements with name in li_NameUID) from DICOM file header
+    """
+    dcmFile = dicom.read_file(filename, force=True, stop_before_pixels=True)
+
+    uids = set()
+    _workerService._collectDicomUids(dcmFile, uids)
+    _workerService._collectDicomUids(dcmFile.file_meta, uids)
+
+    return uids
+
+
+def _anonymiseFileTask(filename):
+    """Anonymise/pseudonymise DICOM file
+    """
+    _workerService._anonymiseFile(filename, _workerService._originalStructUid)
+
+    return filename
@@ -10,13 +10,25 @@
 import os
 import sys
 
+# Logging
+import logging
+
 # Encoding RFC 3548
 import base64
+import hmac
+import hashlib
 
 # Crypto
 from Crypto import Random
 from Crypto.Cipher import AES
 
+# AEAD (optional, binary tokens fall back to AES-CBC without it)
+# pinned cryptography release requires Python 3, so the Python 2 client always writes AES-CBC tokens
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:
+    AESGCM = None
+
 # Pickle
 if sys.version < "3":
     import cPickle as pickle
@@ -36,8 +48,16 @@ class CryptoService:
     """This service is providing strong cryptography
 
     Using AES-256
+    Binary tokens are AES-256-GCM when cryptography package is available, otherwise AES-256-CBC
     """
 
+    # AES-CBC fallback of binary tokens is reported only once
+    _cbcFallbackLogged = False
+
+    # Version bytes of binary tokens, never part of base64 alphabet
+    CBC_TOKEN = b"\x01"  # AES-256-CBC
+    GCM_TOKEN = b"\x02"  # AES-256-GCM
+
     def __init__(self):
         """Default constructor
         """
@@ -46,6 +66,8 @@ class CryptoService:
         self.__key = ""  # Will be generated randomly and stored
         self.__mode = AES.MODE_CBC  # Block mode of AES
         self.__blockSize = 16  # 16 byte is the size of the basic AES block
+        self.__nonceSize = 12  # 12 byte nonce for AES-GCM
+        self.__aead = None  # AES-GCM context is created once for the key
 
         self.__setupKey()
 
@@ -90,6 +112,77 @@ class CryptoService:
 
         return result
 
+    def encryptBytes(self, raw):
+        """Encrypt into compact binary token (version byte, IV/nonce, ciphertext) without text encoding
+        AES-GCM is used when available, otherwise AES-CBC
+        """
+        aead = self.__aeadContext()
+        if aead is not None:
+            # Random 12 bytes nonce, ciphertext includes authentication tag
+            nonce = os.urandom(self.__nonceSize)
+            return CryptoService.GCM_TOKEN + nonce + aead.encrypt(nonce, raw, None)
+
+        # Padding
+        padded = self.__pad(raw)
+        # Random 16 bytes initialization vector for encryption
+        iv = Random.get_random_bytes(self.__blockSize)
+        # Setup AES
+        aes = AES.new(self.__key, self.__mode, iv)
+
+        return CryptoService.CBC_TOKEN + iv + aes.encrypt(padded)
+
+    def encryptBatch(self, payloads):
+        """Encrypt list of payloads into binary tokens (each with its own IV/nonce)
+        """
+        aead = self.__aeadContext()
+        if aead is None:
+            return [self.encryptBytes(raw) for raw in payloads]
+
+        # One call for all nonces, cipher context is shared
+        nonces = os.urandom(self.__nonceSize * len(payloads))
+
+        tokens = []
+        for i, raw in enumerate(payloads):
+            nonce = nonces[i * self.__nonceSize:(i + 1) * self.__nonceSize]
+            tokens.append(CryptoService.GCM_TOKEN + nonce + aead.encrypt(nonce, raw, None))
+
+        return tokens
+
+    def decryptBytes(self, token):
+        """Decrypt binary token created by encryptBytes or encryptBatch
+        """
+        version = token[:1]
+
+        if version == CryptoService.GCM_TOKEN:
+            aead = self.__aeadContext()
+            if aead is None:
+                raise ValueError("AES-GCM encrypted token requires cryptography package")
+
+            nonce = token[1:1 + self.__nonceSize]
+            return aead.decrypt(nonce, token[1 + self.__nonceSize:], None)
+
+        elif version == CryptoService.CBC_TOKEN:
+            # Next 16 bytes defines iv
+            iv = token[1:1 + self.__blockSize]
+            # Setup AES
+            aes = AES.new(self.__key, self.__mode, iv)
+            # Decrypt and unpad
+            return self.__unpad(aes.decrypt(token[1 + self.__blockSize:]))
+
+        raise ValueError("Unknown encrypted token version")
+
+    @staticmethod
+    def isToken(encrypted):
+        """Whether encrypted data are binary token (otherwise base64 text created by encrypt)
+        """
+        return encrypted[:1] in (CryptoService.CBC_TOKEN, CryptoService.GCM_TOKEN)
+
+    def deriveKey(self, context):
+        """Derive secret key for the context (HMAC-SHA256 of context with encryption key)
+        Encryption key itself is never used for anything else than AES
+        """
+        return hmac.new(self.__key, context.encode("utf-8"), hashlib.sha256).digest()
+
 ########  ########  #### ##     ##    ###    ######## ########
 ##     ## ##     ##  ##  ##     ##   ## ##      ##    ##
 ##     ## ##     ##  ##  ##     ##  ##   ##     ##    ##
@@ -128,6 +221,18 @@ class CryptoService:
                 self.error_message = "Error during reading the encryption key"
                 return None
 
+    def __aeadContext(self):
+        """Reusable AES-GCM context (None when cryptography package is not available)
+        """
+        if self.__aead is None and AESGCM is not None and self.keyExists():
+            self.__aead = AESGCM(self.__key)
+
+        if AESGCM is None and not CryptoService._cbcFallbackLogged:
+            CryptoService._cbcFallbackLogged = True
+            logging.getLogger(__name__).warning("cryptography package is not available, binary tokens are encrypted with AES-CBC.")
+
+        return self.__aead
+
     def __pad(self, original):
         """Pad original data to fit into chosen block size
         """
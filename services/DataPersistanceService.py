@@ -6,7 +6,12 @@
  ##  ##     ## ##        ##     ## ##    ##     ##    ##    ##
 #### ##     ## ##         #######  ##     ##    ##     ######
 
+# Standard
+import logging
+import time
+
 # ORM
+from sqlalchemy import event
 from sqlalchemy import Column, Sequence, Integer, String, Boolean, DateTime, ForeignKey, Unicode
 from sqlalchemy import create_engine
 from sqlalchemy import text
@@ -14,6 +19,9 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship, scoped_session
 from sqlalchemy.orm.exc import MultipleResultsFound, NoResultFound
 
+# Contexts
+from contexts.ConfigDetails import ConfigDetails
+
 # Utils
 from utils.JsonSerializer import JsonSerializer
 
@@ -538,28 +546,46 @@ class DataPersistanceService():
     via this class the application modules can create, read and update persistent objects
     """
 
-    def __init__(self, username, password, dbname, host, port):
+    def __init__(self, username, password, dbname, host, port, echo=False, poolSize=None, maxOverflow=None, poolPrePing=None, poolRecycle=None, slowQueryThreshold=None):
         """Constructor - create connection to RadPlanBio database
+        echo: log every SQL statement (development only)
+        poolSize, maxOverflow: number of kept and additional pooled connections
+        poolPrePing: test pooled connection before it is used (dropped connections are replaced)
+        poolRecycle: seconds after which pooled connection is replaced
+        slowQueryThreshold: seconds after which query is logged as slow
+        pooling and slow query settings which are not provided are taken from ConfigDetails ([Database] section)
         """
-        # DB logging
-        isDbLoggingEnabled = True
+        self._logger = logging.getLogger(__name__)
+
+        # Engine settings (shared by RadPlanBio and OpenClinica engines)
+        self._echo = echo
+        self._poolSize = poolSize if poolSize is not None else ConfigDetails().dbPoolSize
+        self._maxOverflow = maxOverflow if maxOverflow is not None else ConfigDetails().dbMaxOverflow
+        self._poolPrePing = poolPrePing if poolPrePing is not None else ConfigDetails().dbPoolPrePing
+        self._poolRecycle = poolRecycle if poolRecycle is not None else ConfigDetails().dbPoolRecycle
+        self._slowQueryThreshold = slowQueryThreshold if slowQueryThreshold is not None else ConfigDetails().dbSlowQueryThreshold
 
         # Engine with connection string
-        self.engine = create_engine('postgresql://' + username + ':' + password + '@' + host + ':' + port + '/' +  dbname, client_encoding='utf8', echo=isDbLoggingEnabled)
+        self.engine = self._createEngine('postgresql://' + username + ':' + password + '@' + host + ':' + port + '/' +  dbname)
 
         # Session binned to DB engine - UnitOfWork design patter
         self.Session = scoped_session(
             sessionmaker(bind=self.engine)
         )
 
+        # OpenClinica engines (key = connection string)
+        self._ocEngines = {}
+
     def createOcDbConnection(self, ocusername, ocpassword, ocdbname, ochost, ocport):
         """Create connection to OpenClinica database
+        engine (and its connection pool) is created only once for the connection string
         """
-        # DB logging
-        isDbLoggingEnabled = True
+        url = "postgresql://" + ocusername + ":" + ocpassword + "@" + ochost + ":" + ocport + "/" +  ocdbname
 
         # Engine with connection string
-        self.ocengine = create_engine("postgresql://" + ocusername + ":" + ocpassword + "@" + ochost + ":" + ocport + "/" +  ocdbname, client_encoding='utf8', echo=isDbLoggingEnabled)
+        if url not in self._ocEngines:
+            self._ocEngines[url] = self._createEngine(url)
+        self.ocengine = self._ocEngines[url]
 
         # Session binned to DB engine - UnitOfWork design patter
         self.ocSession = sessionmaker()
@@ -570,6 +596,39 @@ class DataPersistanceService():
         """
         self.engine.execute("select 1").scalar()
 
+    def _createEngine(self, url):
+        """Create engine with connection pool for connection string
+        """
+        engine = create_engine(
+            url,
+            client_encoding='utf8',
+            echo=self._echo,
+            pool_size=self._poolSize,
+            max_overflow=self._maxOverflow,
+            pool_pre_ping=self._poolPrePing,
+            pool_recycle=self._poolRecycle
+        )
+
+        if self._slowQueryThreshold is not None:
+            self._logSlowQueries(engine)
+
+        return engine
+
+    def _logSlowQueries(self, engine):
+        """Log queries of engine which take longer than slow query threshold
+        """
+        # Start time is kept by execution context (nothing is left behind when statement fails)
+        @event.listens_for(engine, "before_cursor_execute")
+        def beforeCursorExecute(conn, cursor, statement, parameters, context, executemany):
+            context._queryStartTime = time.time()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def afterCursorExecute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.time() - context._queryStartTime
+            # Parameters are not logged (they may contain patient data)
+            if elapsed >= self._slowQueryThreshold:
+                self._logger.warning("Slow query (%.3f s): %s" % (elapsed, " ".join(statement.split())))
+
  #######  ########  ######## ##    ##     ######  ##       #### ##    ## ####  ######     ###
 ##     ## ##     ## ##       ###   ##    ##    ## ##        ##  ###   ##  ##  ##    ##   ## ##
 ##     ## ##     ## ##       ####  ##    ##       ##        ##  ####  ##  ##  ##        ##   ##
@@ -592,8 +651,6 @@ class DataPersistanceService():
         for row in result:
             passwordHash = row[0]
 
-        conn.close()
-
         return passwordHash
 
     def getOCStudyByIdentifier(self, session, identifier):
@@ -748,10 +805,89 @@ class DataPersistanceService():
         for row in result:
             value = row[19] # ItemValue
 
-        conn.close()
-
         return value
 
+    def getCrfItemValuesV2(self, session, studySiteOid, subjectPid, studyEventOid, studyEventRepeatKey, items):
+        """Get values of multiple OpenClinica eCRF fields within one study event with one query
+        items: list of (formOid, itemOid)
+        returns values in order of items (the same values as getCrfItemValueV2 provides for each item,
+        except unknown study site where all values are "" instead of error)
+        """
+        values = [""] * len(items)
+
+        if not items:
+            return values
+
+        # Requested items are joined as table of (formOid, itemOid, position) rows
+        # (parameters are typed explicitly, untyped literals are of unknown type in PostgreSQL < 10)
+        requested = []
+        params = {
+            "studySiteOid": studySiteOid,
+            "subjectPid": subjectPid,
+            "studyEventOid": studyEventOid,
+            "studyEventRepeatKey": studyEventRepeatKey
+        }
+        for position, (formOid, itemOid) in enumerate(items):
+            requested.append(
+                "select cast(:formOid%d as varchar) as form_oid, cast(:itemOid%d as varchar) as item_oid, %d as position" %
+                (position, position, position)
+            )
+            params["formOid%d" % position] = formOid
+            params["itemOid%d" % position] = itemOid
+
+        rawQuery = """select
+            ri.position as Position,
+            id.value as ItemValue
+
+            from study_subject ss
+            inner join subject s
+                on ss.subject_id = s.subject_id
+            inner join study_event se
+                on ss.study_subject_id = se.study_subject_id
+            inner join study_event_definition sed
+                on se.study_event_definition_id = sed.study_event_definition_id
+            inner join event_crf ec
+                on se.study_event_id = ec.study_event_id
+            inner join crf_version cv
+                on ec.crf_version_id = cv.crf_version_id
+            inner join event_definition_crf edc
+                on cv.crf_id = edc.crf_id
+                and se.study_event_definition_id = edc.study_event_definition_id
+            inner join item_form_metadata ifm
+                on cv.crf_version_id = ifm.crf_version_id
+            inner join item i
+                on ifm.item_id = i.item_id
+            inner join (
+                """ + " union all ".join(requested) + """
+            ) ri
+                on cv.oc_oid = ri.form_oid
+                and i.oc_oid = ri.item_oid
+            left join item_data id
+                on ec.event_crf_id = id.event_crf_id
+                and i.item_id = id.item_id
+
+            where ss.study_id = (select st.study_id from study st where st.oc_oid = :studySiteOid) and
+                s.unique_identifier = :subjectPid and
+                sed.oc_oid = :studyEventOid and
+                se.sample_ordinal = :studyEventRepeatKey
+                order by
+                ri.position,
+                ss.study_subject_id,
+                sed.ordinal,
+                se.sample_ordinal,
+                edc.ordinal,
+                id.ordinal,
+                ifm.ordinal"""
+
+        conn = session.connection()
+        result = conn.execute(text(rawQuery), params)
+
+        # Last row of the item wins (as in single item query)
+        for row in result:
+            values[row[0]] = row[1] # ItemValue
+
+        return values
+
 ########  ######## ########    ###    ##     ## ##       ########       ###     ######   ######   #######  ##     ## ##    ## ########
 ##     ## ##       ##         ## ##   ##     ## ##          ##         ## ##   ##    ## ##    ## ##     ## ##     ## ###   ##    ##
 ##     ## ##       ##        ##   ##  ##     ## ##          ##        ##   ##  ##       ##       ##     ## ##     ## ####  ##    ##
@@ -11,6 +11,8 @@ import os
 
 # DICOM
 import dicom
+from dicom.filebase import DicomBytesIO
+from dicom.filereader import read_dataset
 
 # Pickle
 import cPickle as pickle
@@ -41,6 +43,7 @@ class DeanonymisationService():
         """
         self.__svcCrypto = CryptoService()
         self.__directory = directory
+        self.__studyIdentities = {}
 
 ########  ########   #######  ########  ######## ########  ######## #### ########  ######
 ##     ## ##     ## ##     ## ##     ## ##       ##     ##    ##     ##  ##       ##    ##
@@ -80,6 +83,9 @@ class DeanonymisationService():
             print "Could not read directory ",  self.__directory, " check existence and reading rights"
             sys.exit()
 
+        # Patient identity can be stored once per study
+        self.__collectStudyIdentities()
+
         for f in os.listdir(self.__directory):
             # Read
             dcmFile = dicom.read_file(self.__directory + os.sep + f)
@@ -103,6 +109,51 @@ class DeanonymisationService():
 ##        ##    ##   ##    ## ##   ##     ##    ##    ##
 ##        ##     ## ####    ###    ##     ##    ##    ########
 
+    def __collectStudyIdentities(self):
+        """Decrypt study identity records from carrier instances (key = pseudonymised study instance UID)
+        """
+        self.__studyIdentities = {}
+
+        for f in os.listdir(self.__directory):
+            dcmFile = dicom.read_file(self.__directory + os.sep + f, stop_before_pixels=True)
+
+            # Study identity record is the additional item of Encrypted Attributes Sequence (0400,0500)
+            t = dicom.tag.Tag((0x400, 0x500))
+            if t in dcmFile and len(dcmFile[t].value) > 1 and "StudyInstanceUID" in dcmFile:
+                elements = []
+                for item in dcmFile[t].value[1:]:
+                    elements.extend(self.__decryptAttributes(item))
+                self.__studyIdentities[dcmFile.StudyInstanceUID] = elements
+
+    def __decryptAttributes(self, item):
+        """Decrypt original data elements from Encrypted Attributes Sequence item
+        """
+        # Get the atribute Encrypted Content (0400,0520) from sequence item
+        encryptedContent = item.EncryptedContent
+
+        # Compact binary token with Encrypted Attributes Data Set in explicit VR little endian
+        if CryptoService.isToken(encryptedContent):
+            decryptedData = self.__svcCrypto.decryptBytes(encryptedContent)
+            encryptedAttributesDs = read_dataset(DicomBytesIO(decryptedData), False, True)
+        # Original base64 text with pickled Encrypted Attributes Data Set
+        else:
+            # Get decripted dicom dataset
+            decryptedData = self.__svcCrypto.decrypt(encryptedContent)
+
+            # Deserialize these original DICOM data from string
+            encryptedAttributesDs = pickle.loads(decryptedData)
+
+        # Get the Modified Attributes Sequence (0400,0550) from encryptedAttributesDs
+        # original format has one attribute per item, compact format all attributes in one item
+        t = dicom.tag.Tag((0x400, 0x550))
+
+        elements = []
+        for encryptedAttributeDs in encryptedAttributesDs[t]:
+            for element in encryptedAttributeDs:
+                elements.append(element)
+
+        return elements
+
     def __reverseIdentity(self, dcmFile):
         """Reverse the dcmFile identity
         """
@@ -113,41 +164,32 @@ class DeanonymisationService():
             t = dicom.tag.Tag((0x400, 0x500))
             encryptedAttributesSequence = dcmFile[t]
 
-            # Get the atribute Encrypted Content (0400,0520) from sequence
-            encryptedContent = encryptedAttributesSequence[0].EncryptedContent
-
-            # Get decripted dicom dataset
-            decryptedData = self.__svcCrypto.decrypt(encryptedContent)
+            # First item holds instance attributes, carrier instance of study identity record has the record in next item
+            originalElements = self.__decryptAttributes(encryptedAttributesSequence[0])
+            for item in encryptedAttributesSequence[1:]:
+                originalElements.extend(self.__decryptAttributes(item))
 
-            # Deserialize these original DICOM data from string
-            encryptedAttributesDs = pickle.loads(decryptedData)
+            # Attributes which are not stored per instance are restored from study identity record
+            if "StudyInstanceUID" in dcmFile and dcmFile.StudyInstanceUID in self.__studyIdentities:
+                restoredTags = set(element.tag for element in originalElements)
+                for element in self.__studyIdentities[dcmFile.StudyInstanceUID]:
+                    if element.tag not in restoredTags:
+                        originalElements.append(element)
 
             # Get the attribute De-identification method code sequence (0012,0064)
             # to know codes of profiles and options used for deanonymisation
             t = dicom.tag.Tag((0x0012, 0x0064))
             dcmFile[t]
 
-            # Get the Modified Attributes Sequence (0400,0550) from
-            # encryptedAttributesDs and set them to origin
-            t = dicom.tag.Tag((0x400, 0x550))
-
-            for encryptedAttributeDs in encryptedAttributesDs[t]:
+            for element in originalElements:
                 # Ignore SOAP Instance UID
-                if "SOPInstanceUID" in encryptedAttributeDs:
-                    # There is just one data element in dta set and I want to know the name
-                    elementName =  encryptedAttributeDs.dir()[0]
-                    element = encryptedAttributeDs.data_element(elementName)
-
+                if element.tag == (0x0008, 0x0018):
                     print dcmFile[element.tag]
 
                     self.__sopInstanceUid = element.value
 
                     print self.__sopInstanceUid
                 else:
-                    # There is just one data element in dta set and I want to know the name
-                    elementName =  encryptedAttributeDs.dir()[0]
-                    element = encryptedAttributeDs.data_element(elementName)
-
                     print dcmFile[element.tag]
 
                     dcmFile[element.tag].value = element.value
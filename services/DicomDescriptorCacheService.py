@@ -0,0 +1,225 @@
+#### ##     ## ########   #######  ########  ########  ######
+ ##  ###   ### ##     ## ##     ## ##     ##    ##    ##    ##
+ ##  #### #### ##     ## ##     ## ##     ##    ##    ##
+ ##  ## ### ## ########  ##     ## ########     ##     ######
+ ##  ##     ## ##        ##     ## ##   ##      ##          ##
+ ##  ##     ## ##        ##     ## ##    ##     ##    ##    ##
+#### ##     ## ##         #######  ##     ##    ##     ######
+
+# Standard
+import os
+import sys
+import numbers
+
+# Logging
+import logging
+import logging.config
+
+# Database
+import sqlite3
+
+# Collections
+if sys.version < "3":
+    from collections import Sequence
+else:
+    from collections.abc import Sequence
+
+# Pickle
+if sys.version < "3":
+    import cPickle as pickle
+else:
+    import _pickle as pickle
+
+ ######  ######## ########  ##     ## ####  ######  ########
+##    ## ##       ##     ## ##     ##  ##  ##    ## ##
+##       ##       ##     ## ##     ##  ##  ##       ##
+ ######  ######   ########  ##     ##  ##  ##       ######
+      ## ##       ##   ##    ##   ##   ##  ##       ##
+##    ## ##       ##    ##    ## ##    ##  ##    ## ##
+ ######  ######## ##     ##    ###    ####  ######  ########
+
+
+class DicomDescriptorCacheService(object):
+    """Persistent cache of light DICOM file descriptors
+
+    Scanning results are stored in SQLite database keyed by (path, size, mtime),
+    so re-scanning of unchanged files is only a lookup. Only descriptor fields
+    converted to plain values are stored (no DICOM datasets or element objects),
+    however the descriptors still contain patient identity (PatientID, PatientName, ...).
+
+    fileName: SQLite database file (ConfigDetails().descriptorCacheFileName,
+    relative path is resolved against the working directory of the client)
+    """
+
+    # Has to be increased whenever the content of scanning results changes
+    VERSION = 4
+
+    def __init__(self, fileName):
+        """Default constructor
+        """
+        # Setup logger - use logging config file
+        self._logger = logging.getLogger(__name__)
+        logging.config.fileConfig("logging.ini", disable_existing_loggers=False)
+
+        self._fileName = fileName
+        self._connection = None
+
+        self._hits = 0
+        self._misses = 0
+
+########  ########   #######  ########  ######## ########  ######## #### ########  ######
+##     ## ##     ## ##     ## ##     ## ##       ##     ##    ##     ##  ##       ##    ##
+##     ## ##     ## ##     ## ##     ## ##       ##     ##    ##     ##  ##       ##
+########  ########  ##     ## ########  ######   ########     ##     ##  ######    ######
+##        ##   ##   ##     ## ##        ##       ##   ##      ##     ##  ##             ##
+##        ##    ##  ##     ## ##        ##       ##    ##     ##     ##  ##       ##    ##
+##        ##     ##  #######  ##        ######## ##     ##    ##    #### ########  ######
+
+    @property
+    def isOpen(self):
+        """Is the cache database opened
+        """
+        return self._connection is not None
+
+    @property
+    def hits(self):
+        """Number of cache hits
+        """
+        return self._hits
+
+    @property
+    def misses(self):
+        """Number of cache misses
+        """
+        return self._misses
+
+##     ## ######## ######## ##     ##  #######  ########   ######
+###   ### ##          ##    ##     ## ##     ## ##     ## ##    ##
+#### #### ##          ##    ##     ## ##     ## ##     ## ##
+## ### ## ######      ##    ######### ##     ## ##     ##  ######
+##     ## ##          ##    ##     ## ##     ## ##     ##       ##
+##     ## ##          ##    ##     ## ##     ## ##     ## ##    ##
+##     ## ########    ##    ##     ##  #######  ########   ######
+
+    def open(self):
+        """Open (and create if necessary) the cache database
+        Cache database is used only from the thread which opened it
+        """
+        try:
+            self._connection = sqlite3.connect(self._fileName)
+
+            # Drop cached data when they were created by different version
+            version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != DicomDescriptorCacheService.VERSION:
+                self._connection.execute("DROP TABLE IF EXISTS descriptors")
+                self._connection.execute("PRAGMA user_version = " + str(DicomDescriptorCacheService.VERSION))
+                # Do not leave dropped patient data in free pages of database file
+                self._connection.commit()
+                self._connection.execute("VACUUM")
+
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS descriptors ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime REAL, result BLOB)"
+            )
+            self._connection.commit()
+        except sqlite3.Error:
+            self._logger.exception("Cannot open DICOM descriptor cache: " + self._fileName)
+            self._connection = None
+
+        return self.isOpen
+
+    def close(self):
+        """Commit stored results and close the cache database
+        """
+        if self._connection is not None:
+            try:
+                self._connection.commit()
+                self._connection.close()
+            except sqlite3.Error:
+                self._logger.exception("Cannot close DICOM descriptor cache: " + self._fileName)
+
+            self._connection = None
+            self._logger.info("DICOM descriptor cache hits: " + str(self._hits) + ", misses: " + str(self._misses))
+
+    def lookup(self, path):
+        """Get cached scanning result of the file or None when file is unknown or changed
+        """
+        if self._connection is None:
+            return None
+
+        size, mtime = self._fileStamp(path)
+
+        row = self._connection.execute(
+            "SELECT result FROM descriptors WHERE path = ? AND size = ? AND mtime = ?",
+            (os.path.abspath(path), size, mtime)
+        ).fetchone()
+
+        if row is None:
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        result = pickle.loads(bytes(row[0]))
+
+        # Descriptor refers to the file by the path it was looked up with
+        result[0]["Filename"] = path
+
+        return result
+
+    def store(self, path, result):
+        """Store scanning result (descriptor, rois, studyDate, errors) of the file
+        """
+        if self._connection is None:
+            return
+
+        size, mtime = self._fileStamp(path)
+
+        descriptor, rois, studyDate, errors = result
+        descriptor = dict((k, v) for k, v in descriptor.items() if k != "Filename")
+        result = (self._plainValue(descriptor), self._plainValue(rois), self._plainValue(studyDate), list(errors))
+
+        self._connection.execute(
+            "INSERT OR REPLACE INTO descriptors (path, size, mtime, result) VALUES (?, ?, ?, ?)",
+            (os.path.abspath(path), size, mtime, sqlite3.Binary(pickle.dumps(result, -1)))
+        )
+
+    def clear(self):
+        """Remove all cached scanning results
+        """
+        if self._connection is not None:
+            self._connection.execute("DELETE FROM descriptors")
+            self._connection.commit()
+
+########  ########  #### ##     ##    ###    ######## ########
+##     ## ##     ##  ##  ##     ##   ## ##      ##    ##
+##     ## ##     ##  ##  ##     ##  ##   ##     ##    ##
+########  ########   ##  ##     ## ##     ##    ##    ######
+##        ##   ##    ##   ##   ##  #########    ##    ##
+##        ##    ##   ##    ## ##   ##     ##    ##    ##
+##        ##     ## ####    ###    ##     ##    ##    ########
+
+    def _fileStamp(self, path):
+        """File size and modification time
+        """
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime
+
+    def _plainValue(self, value):
+        """Convert DICOM element value (UID, PersonName, IS, DS, MultiValue, ...) to plain Python value
+        """
+        if value is None or isinstance(value, bool):
+            return value
+        elif sys.version < "3" and isinstance(value, unicode):
+            return unicode(value)
+        elif isinstance(value, str):
+            return str(value)
+        elif isinstance(value, numbers.Integral):
+            return int(value)
+        elif isinstance(value, numbers.Real):
+            return float(value)
+        elif isinstance(value, dict):
+            return dict((self._plainValue(k), self._plainValue(v)) for k, v in value.items())
+        elif isinstance(value, Sequence):
+            return [self._plainValue(v) for v in value]
+        else:
+            return str(value)
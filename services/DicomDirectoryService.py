@@ -9,6 +9,7 @@
 # Standard
 import os
 import sys
+import multiprocessing
 
 # Logging
 import logging
@@ -30,10 +31,15 @@ from domain.Node import Node
 from dcm.DicomPatient import DicomPatient
 from dcm.DicomStudy import DicomStudy
 from dcm.DicomSeries import DicomSeries
+from dcm.DicomDescriptorStore import DicomDescriptorStore
+from dcm.DicomTagPathExtractor import DicomTagPathExtractor
 
 # DICOM De-identification
 from dicomdeident.DeidentConfig import DeidentConfig
 
+# Services
+from services.DicomDescriptorCacheService import DicomDescriptorCacheService
+
 # Context
 from contexts.ConfigDetails import ConfigDetails
 
@@ -52,9 +58,11 @@ class DicomDirectoryService:
     It provides hierarchical access to DICOM elements within the files.
 
     directory: source DICOM data directory
+    headerOnly: read only DICOM header of files (stop before pixel data)
+    processes: number of scanning processes (None = configured, 0 = all cores, 1 = sequential)
     """
 
-    def __init__(self, directory):
+    def __init__(self, directory, headerOnly=True, processes=None):
         """Default constructor
         """
         # Setup logger - use logging config file
@@ -65,9 +73,25 @@ class DicomDirectoryService:
         self._directory = directory
         # List of DICOM files in a source directory
         self._files = []
+        # Scanning does not need pixel data, so reading can stop before it
+        self._headerOnly = headerOnly
+        # Files can be scanned in parallel by a pool of worker processes
+        if processes is not None:
+            self._processes = processes
+        else:
+            self._processes = ConfigDetails().scanProcesses
+
+        # Persistent cache of scanning results (re-scan of unchanged files is only lookup)
+        self._cache = None
+        if ConfigDetails().descriptorCache:
+            self._cache = DicomDescriptorCacheService(ConfigDetails().descriptorCacheFileName)
 
-        # The list of descriptors describing DICOM files (used for search)
-        self._dicomDescriptors = []
+        # Indexed store of descriptors describing DICOM files (used for search)
+        self._dicomDescriptors = DicomDescriptorStore()
+        # Descriptors and ROIs (key = file path) created during setup, reload filters them
+        # Until the reload, search is done over all scanned descriptors
+        self._scannedDescriptors = self._dicomDescriptors
+        self._scannedRois = {}
 
         # Data root holds hierarchy structure of underlying DICOM data
         self._rootNode = None
@@ -90,11 +114,6 @@ class DicomDirectoryService:
         # Configuration of de-identification
         self._deidentConfig = DeidentConfig()
 
-        # Searching results over DICOM tree (have to be members because searching function is recursive)
-        # TODO: refactor this and make it work more transparently
-        self.dataValue = ""
-        self.dataList = []
-
         # Parsing errors
         self._errors = []
 
@@ -226,195 +245,46 @@ class DicomDirectoryService:
         tempSeries = {}
 
         # Only process DICOM files
-        for f in self._files:
-            if self._invalidFile(f):
-                continue
-
-            try:
-                descriptor = None
-                dcmFile = dicom.read_file(f, force=True)
-                self._logger.debug("Reading DICOM file: " + f)
-
-                # Construct DICOM file descriptor
-                descriptor = {
-                    "Filename": f
-                }
-
-                # PatientID
-                if "PatientID" in dcmFile:
-                    descriptor["PatientID"] = dcmFile.PatientID
-                else:
-                    self._logger.error("PatientID tag is missing in " + f + "!")
-                    self._errors.append("PatientID tag is missing in " + f + "!")
+        files = [f for f in self._files if not self._invalidFile(f)]
 
-                # StudyInstanceUID
-                if "StudyInstanceUID" in dcmFile:
-                    studyInstanceUid = dcmFile.StudyInstanceUID
-                    descriptor["StudyInstanceUID"] = dcmFile.StudyInstanceUID
+        # Results come back in the same order as files (also from scanning pool)
+        for i, result in enumerate(self._scanFiles(files)):
+            f = files[i]
+            descriptor, rois, studyDate, errors = result
+            self._errors.extend(errors)
 
-                    # Get SUID and prepare study objects
+            if descriptor is not None:
+                # Get SUID and prepare study objects
+                if "StudyInstanceUID" in descriptor:
+                    studyInstanceUid = str(descriptor["StudyInstanceUID"])
                     if studyInstanceUid not in tempStudies:
-                        tempStudies[str(studyInstanceUid)] = DicomStudy(studyInstanceUid)
-                else:
-                    self._logger.error("StudyInstanceUID tag is missing in " + f + "!")
-                    self._errors.append("StudyInstanceUID tag is missing in " + f + "!")
+                        tempStudies[studyInstanceUid] = DicomStudy(descriptor["StudyInstanceUID"])
 
-                # Is it a DICOM series (SeriesInstanceUID)
-                if "SeriesInstanceUID" in dcmFile:
-                    seriesInstanceUID = dcmFile.SeriesInstanceUID
-                    descriptor["SeriesInstanceUID"] = dcmFile.SeriesInstanceUID
+                    if "StudyDescription" in descriptor:
+                        tempStudies[studyInstanceUid].description = descriptor["StudyDescription"]
+                        if studyDate is not None:
+                            tempStudies[studyInstanceUid].date = studyDate
 
-                    # Get SUID and register the file with an existing or new series object
+                # Get SUID and register the file with an existing or new series object
+                if "SeriesInstanceUID" in descriptor:
+                    seriesInstanceUID = str(descriptor["SeriesInstanceUID"])
                     if seriesInstanceUID not in tempSeries:
-                        tempSeries[str(seriesInstanceUID)] = DicomSeries(seriesInstanceUID)
+                        tempSeries[seriesInstanceUID] = DicomSeries(
+                            descriptor["SeriesInstanceUID"],
+                            headerOnly=self._headerOnly
+                        )
 
                     # Lower memory consumption by saving only paths
-                    tempSeries[str(seriesInstanceUID)].appendFile(f)
-                else:
-                    self._logger.error("SeriesInstanceUID tag is missing in " + f + "!")
-                    self._errors.append("SeriesInstanceUID tag is missing in " + f + "!")
+                    tempSeries[seriesInstanceUID].appendFile(f)
 
+                # RTSTRUCT ROIs dictionary
+                if rois:
+                    self._rois.update(rois)
+                    self._scannedRois[f] = rois
+                    self._logger.info("Number of RTSTRUCT ROIs: " + str(len(self._rois)))
 
-                # SOPInstanceUID
-                if "SOPInstanceUID" in dcmFile:
-                    descriptor["SOPInstanceUID"] = dcmFile.SOPInstanceUID
-                else:
-                    self._logger.error("SOPInstanceUID tag is missing in " + f + "!")
-                    self._errors.append("SOPInstanceUID tag is missing in " + f + "!")
-
-                # PatientName in descriptor
-                if "PatientName" in dcmFile:
-                    descriptor["PatientName"] = dcmFile.PatientName
-                else:
-                    self._logger.info("PatientName tag is missing in " + f + ". Replacing with default: " + self._deidentConfig.ReplacePatientNameWith + ".")
-                    descriptor["PatientName"] = self._deidentConfig.ReplacePatientNameWith
-
-                # PatientBirthDate in descriptor
-                if "PatientBirthDate" in dcmFile:
-                    descriptor["PatientBirthDate"] = dcmFile.PatientBirthDate
-                else:
-                    self._logger.info("PatientBirthDate tag is missing in " + f + ". Replacing with default: " + self._deidentConfig.ReplaceDateWith + ".")
-                    descriptor["PatientBirthDate"] = self._deidentConfig.ReplaceDateWith
-
-                # PatientSex in descriptor
-                if "PatientSex" in dcmFile:
-                    descriptor["PatientSex"] = dcmFile.PatientSex
-                else:
-                    self._logger.info("PatientSex tag is missing in " + f + ". Replacing with default: O.")
-                    descriptor["PatientSex"] = "O"  # Other, if not present
-
-                # Save StudyDescription in descriptor
-                if "StudyDescription" in dcmFile:
-                    descriptor["StudyDescription"] = dcmFile.StudyDescription
-                    tempStudies[str(studyInstanceUid)].description = dcmFile.StudyDescription
-                    if "StudyDate" in dcmFile:
-                        tempStudies[str(studyInstanceUid)].date = dcmFile.StudyDate
-
-                # Save InstanceNumber in descriptor
-                if "InstanceNumber" in dcmFile:
-                    descriptor["InstanceNumber"] = dcmFile.InstanceNumber
-                else:
-                    descriptor["InstanceNumber"] = 0
-
-                # Save PatientsAge in descriptor
-                if "PatientsAge" in dcmFile:
-                    descriptor["PatientsAge"] = dcmFile.PatientsAge
-                else:
-                    descriptor["PatientsAge"] = "OOOY"
-
-                # Save FrameOfReferenceUID in descriptor
-                self.getValue(dcmFile, "Frame of Reference UID")
-                if self.dataValue != "":
-                    descriptor["FrameOfReferenceUID"] = self.dataValue
-
-                self.dataValue = ""
-                self.dataList = []
-
-                # Save ReferencedSOPInstanceUID_RTPLAN in descriptor
-                self.getValue(dcmFile, "Referenced SOP Instance UID", reference="Referenced Structure Set Sequence")
-                if self.dataValue != "":
-                    descriptor["ReferencedSOPInstanceUID_RTSTRUCT"] = self.dataValue
-
-                self.dataValue = ""
-                self.dataList = []
-
-                # Save ReferencedSOPInstanceUID_RTPLAN in descriptor
-                self.getValue(dcmFile,  "Referenced SOP Instance UID", reference="Referenced RT Plan Sequence")
-                if self.dataValue != "":
-                    descriptor["ReferencedSOPInstanceUID_RTPLAN"] = self.dataValue
-
-                self.dataValue = ""
-                self.dataList = []
-
-                # According to modality save
-                if "Modality" in dcmFile:
-                    descriptor["Modality"] = dcmFile.Modality,
-
-                    # For RTPLAN
-                    if dcmFile.Modality == "RTPLAN":
-
-                        # Save RTPlanLabel in descriptor
-                        if "RTPlanLabel" in dcmFile:
-                            descriptor["RTPlanLabel"] = dcmFile.RTPlanLabel
-
-                        # Save BeamNumbers
-                        if "Beams" in dcmFile:
-                            descriptor["BeamNumbers"] = len(dcmFile.Beams)
-
-                        # Save RadiationType
-                        self.getValue(dcmFile, "Radiation Type")
-                        if self.dataValue != "":
-                            descriptor["RadiationType"] = self.dataValue
-
-                        self.dataValue = ""
-                        self.dataList = []
-
-                    # Save DoseSummationType for RTDOSE
-                    elif dcmFile.Modality == "RTDOSE" and \
-                        "DoseSummationType" in dcmFile:
-                        descriptor["DoseSummationType"] = dcmFile.DoseSummationType
-
-                    # For RTSTRUCT prepare ROIs dictionary
-                    elif dcmFile.Modality == "RTSTRUCT":
-                        # Oncentra MasterPlan case exports RTSTRUCT with this point we should store this info
-                        if "ReferencedFrameOfReferenceSequence" in dcmFile:
-                            for element in dcmFile.ReferencedFrameOfReferenceSequence:
-                                if "FrameOfReferenceRelationshipSequence" in element:
-                                    for secElem in element.FrameOfReferenceRelationshipSequence:
-                                        if "FrameOfReferenceTransformationType" in secElem:
-                                            descriptor["TreatmentPlanningReferencePoint"] = "Yes"
-                                            break
-
-                        # Store the Referenced SOP Instance UIDs of Contour polygons
-                        descriptor["ContourImageSequence"] = []
-                        if "ROIContourSequence" in dcmFile:
-                            for element in dcmFile.ROIContourSequence:
-                                if "ContourSequence" in element:
-                                    for subElement in element.ContourSequence:
-                                        if "ContourImageSequence" in subElement:
-                                            for subSubElement in subElement.ContourImageSequence:
-                                                if "ReferencedSOPInstanceUID" in subSubElement:
-                                                    descriptor["ContourImageSequence"].append(
-                                                        subSubElement.ReferencedSOPInstanceUID
-                                                    )
-
-                        # Store the list of StructureSet ROI names
-                        for element in dcmFile:
-                            if element.VR == "SQ":
-                                if element.name == "Structure Set ROI Sequence":
-                                    for subElem in element:
-                                        self._rois[subElem.ROINumber] = [subElem.ROIName]
-
-                        self._logger.info("Number of RTSTRUCT ROIs: " + str(len(self._rois)))
-
-            except Exception as err:
-                msg = "Unexpected error during DICOM data parsing:" + f + "!"
-                self._logger.exception(msg)
-                self._errors.append(msg)
-
-            # Add descriptor for DICOM file
-            if descriptor is not None:
-                self._dicomDescriptors.append(descriptor)
+                # Add descriptor for DICOM file
+                self._scannedDescriptors.append(descriptor)
 
             # Progress
             if thread:
@@ -472,17 +342,14 @@ class DicomDirectoryService:
     def reload(self, thread=None):
         """Setup the dicomDirectory to make it possible to lookup what DICOM data have been provided
         DICOM study descriptor (on top of selected study) for easier search
+        Descriptors are derived from the ones created during setup, files are not read again
         """
         self._errors = []
 
         # Reset lookup variables
         self._rois = {}  # Dictionary (key = ROINumber, value = ROIName)
-        self._dicomDescriptors = []
-
-        # Searching results over DICOM tree (have to be members because searching function is recursive)
+        self._dicomDescriptors = DicomDescriptorStore()
         self._burnedInAnnotations = False
-        self.dataValue = ""
-        self.dataList = []
 
         # File reading progress checking
         processed = 0
@@ -492,169 +359,45 @@ class DicomDirectoryService:
         # for such series the descriptor will be holding selected study instance UID
         # this is important to pass the DICOM study upload consistency check
         if self._rootNode is not None:
+            size = 0
+            for study in self._rootNode.children:
+                for serie in study.children:
+                    if serie.isChecked:
+                        size += serie.size
+
             for study in self._rootNode.children:
                 for serie in study.children:
                     # Even if series is not in a selected study
                     if serie.isChecked:
                         for f in serie.files:
-                            try:
-                                dcmFile = dicom.read_file(f, force=True)
+                            for rowId in self._scannedDescriptors.rowIds("Filename", f):
+                                descriptor = self._scannedDescriptors.row(rowId)
 
                                 # Determine whether there is any data with burned in annotations
                                 if not self._burnedInAnnotations:
-                                    if "BurnedInAnnotation" in dcmFile:
-                                        if (str(dcmFile.BurnedInAnnotation)).upper() == "TRUE":
+                                    if "BurnedInAnnotation" in descriptor:
+                                        if (str(descriptor["BurnedInAnnotation"])).upper() == "TRUE":
                                             self._burnedInAnnotations = True
                                             self._logger.info("Burned in annotation found in: " + f)
 
-                                # Construct DICOM file descriptor
-                                descriptor = {
-                                    "PatientID": dcmFile.PatientID,
-                                    "SeriesInstanceUID": dcmFile.SeriesInstanceUID,
-                                    "SOPInstanceUID": dcmFile.SOPInstanceUID,
-                                    "Modality": dcmFile.Modality,
-                                    "Filename": dcmFile.filename
-                                }
-
-                                # PatientName in descriptor
-                                if "PatientName" in dcmFile:
-                                    descriptor["PatientName"] = dcmFile.PatientName
-                                else:
-                                    descriptor["PatientName"] = self._deidentConfig.ReplacePatientNameWith
-
-                                # PatientBirthDate in descriptor
-                                if "PatientBirthDate" in dcmFile:
-                                    descriptor["PatientBirthDate"] = dcmFile.PatientBirthDate
-                                else:
-                                    descriptor["PatientBirthDate"] = self._deidentConfig.ReplaceDateWith
-
-                                # PatientSex in descriptor
-                                if "PatientSex" in dcmFile:
-                                    descriptor["PatientSex"] = dcmFile.PatientSex
-                                else:
-                                    descriptor["PatientSex"] = "O"  # Other, if not present
-
                                 # StudyInstanceUID in descriptor
                                 # Depends on the fact that the file belong to series in selected study
-                                if "StudyInstanceUID" in dcmFile:
-                                    if dcmFile.StudyInstanceUID != self.study.suid:
-                                        dcmFile.StudyInstanceUID = self.study.suid
+                                if "StudyInstanceUID" in descriptor:
                                     descriptor["StudyInstanceUID"] = self.study.suid
 
                                 # StudyDescription in descriptor
                                 # Depends on the fact that the file belong to series in selected study
-                                if "StudyDescription" in dcmFile:
-                                    if dcmFile.StudyDescription != self.study.description:
-                                        dcmFile.StudyDescription = self.study.description
+                                if "StudyDescription" in descriptor:
                                     descriptor["StudyDescription"] = self.study.description
 
-                                # Save InstanceNumber in descriptor
-                                if "InstanceNumber" in dcmFile:
-                                    descriptor["InstanceNumber"] = dcmFile.InstanceNumber
-                                else:
-                                    descriptor["InstanceNumber"] = 0
-
-                                # Save PatientsAge in descriptor
-                                if "PatientsAge" in dcmFile:
-                                    descriptor["PatientsAge"] = dcmFile.PatientsAge
-                                else:
-                                    descriptor["PatientsAge"] = "OOOY"
-
-                                # Save FrameOfReferenceUID in descriptor
-                                self.getValue(dcmFile, "Frame of Reference UID")
-                                if self.dataValue != "":
-                                    descriptor["FrameOfReferenceUID"] = self.dataValue
-
-                                self.dataValue = ""
-                                self.dataList = []
-
-                                # Save ReferencedSOPInstanceUID_RTPLAN in descriptor
-                                self.getValue(dcmFile, "Referenced SOP Instance UID", reference="Referenced Structure Set Sequence")
-                                if self.dataValue != "":
-                                    descriptor["ReferencedSOPInstanceUID_RTSTRUCT"] = self.dataValue
-
-                                self.dataValue = ""
-
-                                self.dataList = []
-
-                                # Save ReferencedSOPInstanceUID_RTPLAN in descriptor
-                                self.getValue(dcmFile, "Referenced SOP Instance UID", reference="Referenced RT Plan Sequence")
-                                if self.dataValue != "":
-                                    descriptor["ReferencedSOPInstanceUID_RTPLAN"] = self.dataValue
-
-                                self.dataValue = ""
-                                self.dataList = []
-
-                                # According to modality save
-                                if "Modality" in dcmFile:
-
-                                    # For RTPLAN
-                                    if dcmFile.Modality == "RTPLAN":
-
-                                        # Save RTPlanLabel in descriptor
-                                        if "RTPlanLabel" in dcmFile:
-                                            descriptor["RTPlanLabel"] = dcmFile.RTPlanLabel
-
-                                        # Save BeamNumbers
-                                        if "Beams" in dcmFile:
-                                            descriptor["BeamNumbers"] = len(dcmFile.Beams)
-
-                                        # Save RadiationType
-                                        self.getValue(dcmFile, "Radiation Type")
-                                        if self.dataValue != "":
-                                            descriptor["RadiationType"] = self.dataValue
-
-                                        self.dataValue = ""
-                                        self.dataList = []
-
-                                    # Save DoseSummationType for RTDOSE
-                                    elif dcmFile.Modality == "RTDOSE" and "DoseSummationType" in dcmFile:
-                                        descriptor["DoseSummationType"] = dcmFile.DoseSummationType
-
-                                    # For RTSTRUCT prepare ROIs dictionary
-                                    elif dcmFile.Modality == "RTSTRUCT":
-
-                                        # Store the Referenced SOP Instance UIDs of Contour polygons
-                                        descriptor["ContourImageSequence"] = []
-                                        if "ROIContourSequence" in dcmFile:
-                                            for element in dcmFile.ROIContourSequence:
-                                                if "ContourSequence" in element:
-                                                    for subElement in element.ContourSequence:
-                                                        if "ContourImageSequence" in subElement:
-                                                            for subSubElement in subElement.ContourImageSequence:
-                                                                if "ReferencedSOPInstanceUID" in subSubElement:
-                                                                    descriptor["ContourImageSequence"].append(
-                                                                        subSubElement.ReferencedSOPInstanceUID
-                                                                    )
-
-                                        # Oncentra MasterPlan case exports RTSTRUCT with this point we should store this info
-                                        if "ReferencedFrameOfReferenceSequence" in dcmFile:
-                                            for element in dcmFile.ReferencedFrameOfReferenceSequence:
-                                                if "FrameOfReferenceRelationshipSequence" in element:
-                                                    for secElem in element.FrameOfReferenceRelationshipSequence:
-                                                        if "FrameOfReferenceTransformationType" in secElem:
-                                                            descriptor["TreatmentPlanningReferencePoint"] = "Yes"
-                                                            break
-
-                                        for element in dcmFile:
-                                            if element.VR == "SQ":
-                                                if element.name == "Structure Set ROI Sequence":
-                                                    for subElem in element:
-                                                        self._rois[subElem.ROINumber] = [subElem.ROIName]
-
-                            except Exception as err:
-                                self._logger.exception("Unexpected error in dicom file reading.")
-
-                            # Add descriptor for DICOM file
-                            self._dicomDescriptors.append(descriptor)
+                                # RTSTRUCT ROIs dictionary
+                                if f in self._scannedRois:
+                                    self._rois.update(self._scannedRois[f])
 
-                            # Progress
-                            size = 0
-                            for progressStudy in self._rootNode.children:
-                                for progressSeries in progressStudy.children:
-                                    if progressSeries.isChecked:
-                                        size += progressSeries.size
+                                # Add descriptor for DICOM file
+                                self._dicomDescriptors.append(descriptor)
 
+                            # Progress
                             if thread:
                                 processed += 1
                                 thread.emit(QtCore.SIGNAL("taskUpdated"), [processed, size])
@@ -662,85 +405,34 @@ class DicomDirectoryService:
     def unique(self, tagname):
         """Lookup whether specific tag has unique value within DICOM study
         """
-        # Initialise return list
-        resList = []
-
-        # Search within descriptors dictionary
-        for entry in self._dicomDescriptors:
-            if tagname in entry:
-                resList.append(entry[tagname])
-
-        # Return created list
-        return list(set(resList))
+        return self._dicomDescriptors.unique(tagname)
 
     def isFrameOfReferenceUnique(self):
         """For treatment plan the frame of reference has to be the same
         """
-        frameOfReferenceUids = []
-
-        for entry in self._dicomDescriptors:
-            if "Modality" in entry:
-                if entry["Modality"] in ["CT", "RTPLAN", "RTDOSE", "RTSTRUCT"]:
-                    if "FrameOfReferenceUID" in entry:
-                        if entry["FrameOfReferenceUID"] not in frameOfReferenceUids:
-                            if entry["Modality"] == "RTSTRUCT":
-                                if "TreatmentPlanningReferencePoint" in entry:
-                                    # TreatmentPanningReferencePoint can have a different frame of refferences (multicase export from Oncentra)
-                                    if entry["TreatmentPlanningReferencePoint"] == "Yes":
-                                        self._logger.info("Skipping frame of reference because it is treatment plan reference point.")
-                                        continue
-                                    frameOfReferenceUids.append(entry["FrameOfReferenceUID"])
-                            frameOfReferenceUids.append(entry["FrameOfReferenceUID"])
-                            self._logger.debug(entry)
-
-        self._logger.info("FrameOfReferences: " + str(len(list(set(frameOfReferenceUids)))))
-
-        return len(list(set(frameOfReferenceUids))) == 1
-
-    def belongingTo(self, tagname, tagValue):
-        """
-        """
-        # Initialise return list
-        resList = []
+        frameOfReferenceUids = set()
 
-        # Search within descriptors dictionary
-        for entry in self._dicomDescriptors:
-            if tagname in entry:
-                if entry[tagname] == tagValue:
-                    resList.append(entry)
+        for modality in ["CT", "RTPLAN", "RTDOSE", "RTSTRUCT"]:
+            for entry in self._dicomDescriptors.belongingTo("Modality", modality):
+                if "FrameOfReferenceUID" in entry:
+                    if entry["FrameOfReferenceUID"] not in frameOfReferenceUids:
+                        if entry["Modality"] == "RTSTRUCT":
+                            if "TreatmentPlanningReferencePoint" in entry:
+                                # TreatmentPanningReferencePoint can have a different frame of refferences (multicase export from Oncentra)
+                                if entry["TreatmentPlanningReferencePoint"] == "Yes":
+                                    self._logger.info("Skipping frame of reference because it is treatment plan reference point.")
+                                    continue
+                        frameOfReferenceUids.add(entry["FrameOfReferenceUID"])
+                        self._logger.debug(entry)
 
-        # Return created list
-        return resList
+        self._logger.info("FrameOfReferences: " + str(len(frameOfReferenceUids)))
 
-    def getValue(self, dcmFile, dataName, reference=None):
-        """Read value of specified DICOM element for the DICOM file (only non-private elements)
+        return len(frameOfReferenceUids) == 1
 
-        dcmFile: DICOM file
-        dataName: DICOM tag element name
-        reference: element is referenced by other element (name)
-
-        return: value of found dicom tag
+    def belongingTo(self, tagname, tagValue):
+        """Lookup descriptors where specific tag has the value
         """
-        # Search in all elements within DICOM file
-        for element in dcmFile:
-
-            # Search only non-private elements
-            if not element.tag.is_private:
-
-                # For sequences
-                if element.VR == "SQ":
-                    if reference is not None and element.name != reference:
-                        continue
-
-                    for dataset in element.value:
-                        self.getValue(dataset, dataName, reference)
-
-                # For normal elements
-                else:
-                    if element.name == dataName:
-                        self.dataValue = element.value
-
-        return 0
+        return self._dicomDescriptors.belongingTo(tagname, tagValue)
 
     def determineNumberOfPatientIDs(self):
         """Detect the number of patient IDs
@@ -834,6 +526,67 @@ class DicomDirectoryService:
 
             self._files.sort()
 
+    def _scanFiles(self, files):
+        """Scan DICOM files, unchanged files are taken from persistent descriptor cache
+        Yields scanning results in the order of provided files
+        """
+        cached = {}
+        if self._cache is not None and self._cache.open():
+            for i, f in enumerate(files):
+                try:
+                    result = self._cache.lookup(f)
+                except Exception:
+                    self._logger.exception("Cannot lookup cached DICOM descriptor: " + f)
+                    result = None
+                if result is not None:
+                    cached[i] = result
+
+        # Only new or changed files are parsed
+        parsed = self._parseFiles([f for i, f in enumerate(files) if i not in cached])
+
+        try:
+            for i, f in enumerate(files):
+                if i in cached:
+                    yield cached[i]
+                else:
+                    result = next(parsed)
+                    if self._cache is not None and result[0] is not None:
+                        try:
+                            self._cache.store(f, result)
+                        except Exception:
+                            self._logger.exception("Cannot cache DICOM descriptor: " + f)
+                    yield result
+        finally:
+            if self._cache is not None:
+                self._cache.close()
+
+    def _parseFiles(self, files):
+        """Parse DICOM files sequentially or in a pool of worker processes
+        Yields scanning results in the order of provided files
+        """
+        processes = self._processes
+        if processes == 0:
+            processes = multiprocessing.cpu_count()
+
+        if processes > 1 and len(files) > 1:
+            self._logger.info("Scanning " + str(len(files)) + " files with " + str(processes) + " processes.")
+
+            # Big enough chunks to keep inter process communication low, small enough for smooth progress
+            chunkSize = max(1, min(64, len(files) // (processes * 4)))
+            tasks = [(f, self._headerOnly) for f in files]
+
+            pool = multiprocessing.Pool(processes, _initScanWorker)
+            try:
+                for result in pool.imap(_scanDicomFileTask, tasks, chunkSize):
+                    yield result
+                pool.close()
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            for f in files:
+                yield scanDicomFile(f, self._headerOnly)
+
     def _invalidFile(self, path):
         """Check whether the file should be ignored
         """
@@ -856,3 +609,196 @@ class DicomDirectoryService:
             isInvalid = True
 
         return isInvalid
+
+##      ##  #######  ########  ##    ## ######## ########   ######
+##  ##  ## ##     ## ##     ## ##   ##  ##       ##     ## ##    ##
+##  ##  ## ##     ## ##     ## ##  ##   ##       ##     ## ##
+##  ##  ## ##     ## ########  #####    ######   ########   ######
+##  ##  ## ##     ## ##   ##   ##  ##   ##       ##   ##         ##
+##  ##  ## ##     ## ##    ##  ##   ##  ##       ##    ##  ##    ##
+ ###  ###   #######  ##     ## ##    ## ######## ##     ##  ######
+
+# Scanning of files has to be done by module level functions, so that they can be
+# executed (pickled) by the worker processes of scanning pool
+
+# Values of nested DICOM elements stored in descriptors
+_scanExtractor = DicomTagPathExtractor(
+    {
+        "FrameOfReferenceUID": "*>(0020,0052)",
+        "ReferencedSOPInstanceUID_RTSTRUCT": "(300C,0060)>(0008,1155)",
+        "ReferencedSOPInstanceUID_RTPLAN": "(300C,0002)>(0008,1155)",
+        "RadiationType": "*>(300A,00C6)",
+        "FrameOfReferenceTransformationType": "(3006,0010)>(3006,00C0)>(3006,00C4)",
+        "ContourImageSequence": "(3006,0039)>(3006,0040)>(3006,0016)>(0008,1155)"
+    },
+    collected=["ContourImageSequence"]
+)
+
+
+def scanDicomFile(path, headerOnly=True):
+    """Read DICOM file and create its light descriptor used for search
+
+    path: DICOM file path
+    headerOnly: read only DICOM header (stop before pixel data)
+
+    return: tuple (descriptor, rois, studyDate, errors)
+    """
+    logger = logging.getLogger(__name__)
+    deidentConfig = DeidentConfig()
+
+    descriptor = None
+    rois = {}  # Dictionary (key = ROINumber, value = ROIName)
+    studyDate = None
+    errors = []
+
+    try:
+        dcmFile = dicom.read_file(path, force=True, stop_before_pixels=headerOnly)
+        logger.debug("Reading DICOM file: " + path)
+
+        # Construct DICOM file descriptor
+        descriptor = {
+            "Filename": path
+        }
+
+        # PatientID
+        if "PatientID" in dcmFile:
+            descriptor["PatientID"] = dcmFile.PatientID
+        else:
+            logger.error("PatientID tag is missing in " + path + "!")
+            errors.append("PatientID tag is missing in " + path + "!")
+
+        # StudyInstanceUID
+        if "StudyInstanceUID" in dcmFile:
+            descriptor["StudyInstanceUID"] = dcmFile.StudyInstanceUID
+        else:
+            logger.error("StudyInstanceUID tag is missing in " + path + "!")
+            errors.append("StudyInstanceUID tag is missing in " + path + "!")
+
+        # Is it a DICOM series (SeriesInstanceUID)
+        if "SeriesInstanceUID" in dcmFile:
+            descriptor["SeriesInstanceUID"] = dcmFile.SeriesInstanceUID
+        else:
+            logger.error("SeriesInstanceUID tag is missing in " + path + "!")
+            errors.append("SeriesInstanceUID tag is missing in " + path + "!")
+
+        # SOPInstanceUID
+        if "SOPInstanceUID" in dcmFile:
+            descriptor["SOPInstanceUID"] = dcmFile.SOPInstanceUID
+        else:
+            logger.error("SOPInstanceUID tag is missing in " + path + "!")
+            errors.append("SOPInstanceUID tag is missing in " + path + "!")
+
+        # PatientName in descriptor
+        if "PatientName" in dcmFile:
+            descriptor["PatientName"] = dcmFile.PatientName
+        else:
+            logger.info("PatientName tag is missing in " + path + ". Replacing with default: " + deidentConfig.ReplacePatientNameWith + ".")
+            descriptor["PatientName"] = deidentConfig.ReplacePatientNameWith
+
+        # PatientBirthDate in descriptor
+        if "PatientBirthDate" in dcmFile:
+            descriptor["PatientBirthDate"] = dcmFile.PatientBirthDate
+        else:
+            logger.info("PatientBirthDate tag is missing in " + path + ". Replacing with default: " + deidentConfig.ReplaceDateWith + ".")
+            descriptor["PatientBirthDate"] = deidentConfig.ReplaceDateWith
+
+        # PatientSex in descriptor
+        if "PatientSex" in dcmFile:
+            descriptor["PatientSex"] = dcmFile.PatientSex
+        else:
+            logger.info("PatientSex tag is missing in " + path + ". Replacing with default: O.")
+            descriptor["PatientSex"] = "O"  # Other, if not present
+
+        # Save StudyDescription in descriptor
+        if "StudyDescription" in dcmFile:
+            descriptor["StudyDescription"] = dcmFile.StudyDescription
+            if "StudyDate" in dcmFile:
+                studyDate = dcmFile.StudyDate
+
+        # Save InstanceNumber in descriptor
+        if "InstanceNumber" in dcmFile:
+            descriptor["InstanceNumber"] = dcmFile.InstanceNumber
+        else:
+            descriptor["InstanceNumber"] = 0
+
+        # Save PatientsAge in descriptor
+        if "PatientsAge" in dcmFile:
+            descriptor["PatientsAge"] = dcmFile.PatientsAge
+        else:
+            descriptor["PatientsAge"] = "OOOY"
+
+        # Values from nested elements are extracted in one traversal
+        values = _scanExtractor.extract(dcmFile)
+
+        # Save FrameOfReferenceUID in descriptor
+        if values.get("FrameOfReferenceUID", "") != "":
+            descriptor["FrameOfReferenceUID"] = values["FrameOfReferenceUID"]
+
+        # Save ReferencedSOPInstanceUID_RTSTRUCT in descriptor
+        if values.get("ReferencedSOPInstanceUID_RTSTRUCT", "") != "":
+            descriptor["ReferencedSOPInstanceUID_RTSTRUCT"] = values["ReferencedSOPInstanceUID_RTSTRUCT"]
+
+        # Save ReferencedSOPInstanceUID_RTPLAN in descriptor
+        if values.get("ReferencedSOPInstanceUID_RTPLAN", "") != "":
+            descriptor["ReferencedSOPInstanceUID_RTPLAN"] = values["ReferencedSOPInstanceUID_RTPLAN"]
+
+        # Save BurnedInAnnotation in descriptor
+        if "BurnedInAnnotation" in dcmFile:
+            descriptor["BurnedInAnnotation"] = dcmFile.BurnedInAnnotation
+
+        # According to modality save
+        if "Modality" in dcmFile:
+            descriptor["Modality"] = dcmFile.Modality
+
+            # For RTPLAN
+            if dcmFile.Modality == "RTPLAN":
+
+                # Save RTPlanLabel in descriptor
+                if "RTPlanLabel" in dcmFile:
+                    descriptor["RTPlanLabel"] = dcmFile.RTPlanLabel
+
+                # Save BeamNumbers
+                if "Beams" in dcmFile:
+                    descriptor["BeamNumbers"] = len(dcmFile.Beams)
+
+                # Save RadiationType
+                if values.get("RadiationType", "") != "":
+                    descriptor["RadiationType"] = values["RadiationType"]
+
+            # Save DoseSummationType for RTDOSE
+            elif dcmFile.Modality == "RTDOSE" and \
+                "DoseSummationType" in dcmFile:
+                descriptor["DoseSummationType"] = dcmFile.DoseSummationType
+
+            # For RTSTRUCT prepare ROIs dictionary
+            elif dcmFile.Modality == "RTSTRUCT":
+                # Oncentra MasterPlan case exports RTSTRUCT with this point we should store this info
+                if "FrameOfReferenceTransformationType" in values:
+                    descriptor["TreatmentPlanningReferencePoint"] = "Yes"
+
+                # Store the Referenced SOP Instance UIDs of Contour polygons
+                descriptor["ContourImageSequence"] = values["ContourImageSequence"]
+
+                # Store the list of StructureSet ROI names
+                if "StructureSetROISequence" in dcmFile:
+                    for subElem in dcmFile.StructureSetROISequence:
+                        rois[subElem.ROINumber] = [subElem.ROIName]
+
+    except Exception:
+        msg = "Unexpected error during DICOM data parsing:" + path + "!"
+        logger.exception(msg)
+        errors.append(msg)
+
+    return descriptor, rois, studyDate, errors
+
+
+def _scanDicomFileTask(task):
+    """Scanning pool task (path, headerOnly)
+    """
+    return scanDicomFile(task[0], task[1])
+
+
+def _initScanWorker():
+    """Scanning pool worker process initialisation
+    """
+    logging.config.fileConfig("logging.ini", disable_existing_loggers=False)
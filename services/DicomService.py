@@ -12,6 +12,13 @@ import sys
 import tempfile
 import shutil
 import time
+import threading
+
+# Queue
+if sys.version < "3":
+    import Queue as queue
+else:
+    import queue
 
 # Pickle
 if sys.version < "3":
@@ -37,8 +44,8 @@ else:
     from pydicom.multival import MultiValue
     from pydicom.sequence import Sequence
 
-# List
-from blist import blist
+# DICOM domain
+from dcm.DicomUidMap import DicomUidMap
 
 # PyQt
 from PyQt4 import QtCore
@@ -80,8 +87,7 @@ class DicomService(object):
         logging.config.fileConfig("logging.ini", disable_existing_loggers=False)
 
         self.StudyUID = ""
-        self.li_UID = blist([])
-        self.li_UID_anonym = blist([])
+        self.uidMap = DicomUidMap()
       
         # Init members
         self.dicomData = None
@@ -367,9 +373,9 @@ class DicomService(object):
            "RTDOSE" in modalities:
 
             ct_dicomData = self.dicomData.belongingTo("Modality", "CT")
-            li_SOPInstanceUID_CT = []
+            li_SOPInstanceUID_CT = set()
             for elem in ct_dicomData:
-                li_SOPInstanceUID_CT.append(elem["SOPInstanceUID"])
+                li_SOPInstanceUID_CT.add(elem["SOPInstanceUID"])
 
             # Check how many RTSTRUCT is in the folder
             rtstruct_dicomData = self.dicomData.belongingTo("Modality", "RTSTRUCT")
@@ -498,9 +504,9 @@ class DicomService(object):
            "RTSTRUCT" in modalities:
 
             ct_dicomData = self.dicomData.belongingTo("Modality", "CT")
-            li_SOPInstanceUID_CT = []
+            li_SOPInstanceUID_CT = set()
             for elem in ct_dicomData:
-                li_SOPInstanceUID_CT.append(elem["SOPInstanceUID"])
+                li_SOPInstanceUID_CT.add(elem["SOPInstanceUID"])
 
             # Check how many RTSTRUCT is in the folder
             rtstruct_dicomData = self.dicomData.belongingTo("Modality", "RTSTRUCT")
@@ -570,8 +576,7 @@ class DicomService(object):
         thread.emit(QtCore.SIGNAL("taskUpdated"), 0)
 
         self.StudyUID = svcAnonymise.StudyInstanceUID
-        self.li_UID_anonym = svcAnonymise.li_UID_anonym
-        self.li_UID = svcAnonymise.li_UID
+        self.uidMap = svcAnonymise.uidMap
 
         if not self.StudyUID:
             shutil.rmtree(self.directory_tmp)
@@ -696,7 +701,7 @@ class DicomService(object):
             for series in study.children:
                 if series.isChecked:
                     # New series instance UID
-                    seriesInstanceUID = self.li_UID_anonym[self.li_UID.index(series.suid)]
+                    seriesInstanceUID = self.uidMap[series.suid]
 
                     # Retrieve series details from research PACS
                     dicomVerifyImportRepeat = 300  # repeat the verification multiple times
@@ -736,6 +741,148 @@ class DicomService(object):
             thread.emit(QtCore.SIGNAL("message(QString)"), "PACS data import failed.")
             return False
 
+    def _storeInstancesConcurrently(self, svcHttp, files, batches, concurrency, thread):
+        """Upload batches of files from temporary directory with bounded number of requests in flight
+        progress is reported in order of batches, the first failure stops submitting of further batches
+
+        return: True when all files were uploaded
+        """
+        tasks = queue.Queue()
+        results = queue.Queue()
+        abort = threading.Event()
+
+        def upload():
+            """Upload batches taken from tasks queue until None is received
+            """
+            while True:
+                i = tasks.get()
+                if i is None:
+                    break
+
+                # Batches submitted before failure are not sent
+                if abort.is_set():
+                    results.put((i, False))
+                    continue
+
+                try:
+                    self._uploadBatch(svcHttp, [files[f] for f in batches[i]])
+                    results.put((i, True))
+                except Exception as err:
+                    self._logger.error(err)
+                    abort.set()
+                    results.put((i, False))
+
+        workers = []
+        for w in range(min(concurrency, len(batches))):
+            worker = threading.Thread(target=upload)
+            worker.daemon = True
+            worker.start()
+            workers.append(worker)
+
+        sourceSize = len(files)
+        submitted = 0
+        inFlight = 0
+        reported = 0
+        uploaded = 0
+        completed = set()
+
+        try:
+            while submitted < len(batches) or inFlight > 0:
+                # Keep the pool of requests full
+                while submitted < len(batches) and inFlight < concurrency and not abort.is_set():
+                    if submitted == len(batches) - 1:
+                        thread.emit(QtCore.SIGNAL("log(QString)"), "Last file sent...")
+                    tasks.put(submitted)
+                    submitted += 1
+                    inFlight += 1
+
+                if inFlight == 0:
+                    break
+
+                i, ok = results.get()
+                inFlight -= 1
+                if ok:
+                    completed.add(i)
+
+                # Report progress of consecutive uploaded batches
+                while reported in completed:
+                    completed.remove(reported)
+                    uploaded += len(batches[reported])
+                    reported += 1
+                    if thread:
+                        thread.emit(QtCore.SIGNAL("taskUpdated"), [uploaded, sourceSize])
+        finally:
+            # Stop workers (batches which were not sent yet are skipped)
+            abort.set()
+            for worker in workers:
+                tasks.put(None)
+            for worker in workers:
+                worker.join()
+
+        return uploaded == sourceSize
+
+    def _uploadBatches(self, files):
+        """Group files from temporary directory into upload batches (lists of file indexes)
+        limited by number of instances and bytes (file exceeding byte limit is sent alone)
+        """
+        maxInstances = max(1, ConfigDetails().uploadBatchInstances)
+        maxBytes = ConfigDetails().uploadBatchBytes
+
+        batches = []
+        batch = []
+        batchBytes = 0
+        for i in xrange(len(files)):
+            size = os.path.getsize(os.path.join(self.directory_tmp, files[i]))
+
+            if batch and (len(batch) >= maxInstances or batchBytes + size > maxBytes):
+                batches.append(batch)
+                batch = []
+                batchBytes = 0
+
+            batch.append(i)
+            batchBytes += size
+
+        if batch:
+            batches.append(batch)
+
+        return batches
+
+    def _uploadBatch(self, svcHttp, filenames):
+        """Upload files from temporary directory in one multipart request
+        failed request is retried, batch rejected as too large (413) is split in halves
+        """
+        attempt = 0
+        while True:
+            try:
+                # Files are streamed from disk into request body
+                svcHttp.httpPostMultipartApplicationDicomFiles(
+                    [os.path.join(self.directory_tmp, filename) for filename in filenames]
+                )
+                return
+
+            except Exception as err:
+                response = getattr(err, "response", None)
+                status = response.status_code if response is not None else None
+
+                # Request entity too large
+                if status == 413 and len(filenames) > 1:
+                    self._logger.info("Batch of " + str(len(filenames)) + " instances too large, splitting")
+                    half = len(filenames) // 2
+                    self._uploadBatch(svcHttp, filenames[:half])
+                    self._uploadBatch(svcHttp, filenames[half:])
+                    return
+
+                # Client errors (except timeout and too many requests) will not pass on retry
+                if status is not None and 400 <= status < 500 and status not in (408, 429):
+                    raise
+
+                attempt += 1
+                if attempt > ConfigDetails().uploadRetries:
+                    raise
+
+                self._logger.warning("Upload of batch failed (" + str(err) + "), retry " + str(attempt))
+                time.sleep(attempt)
+
     def storeInstances(self, data, thread):
         """Stores DICOM instances
         """
@@ -752,38 +899,48 @@ class DicomService(object):
         files = os.listdir(self.directory_tmp)
         files.sort()
 
-        # Upload each file separately (due to memory conservation)
-        sourceSize = len(files)
-        uploaded = 0
+        # Group files into multipart requests
+        batches = self._uploadBatches(files)
 
-        for i in xrange(len(files)):
+        # Upload several batches at once (bounded number of requests in flight)
+        if ConfigDetails().uploadConcurrency > 1 and len(batches) > 1:
+            if not self._storeInstancesConcurrently(svcHttp, files, batches, ConfigDetails().uploadConcurrency, thread):
+                result = "False"
+                resultLogMessage = "Upload failed!"
+                thread.emit(QtCore.SIGNAL("message(QString)"), "Cannot read the data, cannot send them.")
+        else:
+            # Upload each batch separately (due to memory conservation)
+            sourceSize = len(files)
+            uploaded = 0
 
-            try:
-                if i == len(files) - 1:
-                    thread.emit(QtCore.SIGNAL("log(QString)"), "Last file sent...")
+            for i in xrange(len(batches)):
 
-                # Load i-th file for sending into list
-                encoded_datasets = list()
-                filepath = os.path.join(self.directory_tmp, files[i])
-                with open(filepath, 'rb') as dataset:
-                    encoded_ds = dataset.read()
-                    encoded_datasets.append(encoded_ds)
+                try:
+                    if i == len(batches) - 1:
+                        thread.emit(QtCore.SIGNAL("log(QString)"), "Last file sent...")
 
-                svcHttp.httpPostMultipartApplicationDicom(encoded_datasets)
+                    self._uploadBatch(svcHttp, [files[f] for f in batches[i]])
 
-            except Exception as err:
-                result = "False"
-                resultLogMessage = "Upload failed!"
-                self._logger.error(err)
-                thread.emit(QtCore.SIGNAL("message(QString)"), "Cannot read the data, cannot send them.")
-                if os.path.exists(self.directory_tmp):
-                    shutil.rmtree(self.directory_tmp)
-                break
+                except Exception as err:
+                    result = "False"
+                    resultLogMessage = "Upload failed!"
+                    self._logger.error(err)
+                    thread.emit(QtCore.SIGNAL("message(QString)"), "Cannot read the data, cannot send them.")
+                    if os.path.exists(self.directory_tmp):
+                        shutil.rmtree(self.directory_tmp)
+                    break
 
-            # Report progress
-            if thread:
-                uploaded += 1
-                thread.emit(QtCore.SIGNAL("taskUpdated"), [uploaded, sourceSize])
+                # Report progress
+                if thread:
+                    uploaded += len(batches[i])
+                    thread.emit(QtCore.SIGNAL("taskUpdated"), [uploaded, sourceSize])
+
+        # Connection reuse of the pooled HTTP session (counted since the session was created)
+        stats = svcHttp.connectionStats()
+        self._logger.info(
+            "Upload of " + str(len(batches)) + " batches finished, pooled session: " + str(stats["requests"]) + " requests, " +
+            str(stats["connections"]) + " connections opened, " + str(stats["reused"]) + " reused"
+        )
 
         # Remove temporary directory
         if os.path.exists(self.directory_tmp):
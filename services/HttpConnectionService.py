@@ -16,7 +16,16 @@ import logging.config
 
 # HTTP
 import binascii
+import threading
+
+# Queue
+if sys.version < "3":
+    import Queue as queue
+else:
+    import queue
+
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 
 # Disable insecure connection warnings
@@ -48,12 +57,18 @@ from services.DataPersistanceService import StudySerializer
 from services.DataPersistanceService import OCStudySerializer
 from services.DataPersistanceService import SoftwareSerializer
 
+# Contexts
+from contexts.ConfigDetails import ConfigDetails
+
 # Domain
 from domain.Subject import Subject
 from domain.Event import Event
 from domain.Crf import Crf
 from dcm.DicomSeries import DicomSeries
 
+# Utils
+from utils.MultipartFileStream import MultipartFileStream
+
  ######  ######## ########  ##     ## ####  ######  ########
 ##    ## ##       ##     ## ##     ##  ##  ##    ## ##
 ##       ##       ##     ## ##     ##  ##  ##       ##
@@ -107,6 +122,20 @@ class HttpConnectionService(object):
         #             collections of objects such as studies or series)
         self._chunk_size = None
 
+        # Pooled keep-alive connections shared by all requests of the service (created on first use)
+        # pool has to keep connections of concurrent DICOM uploads, each request has its own session (cookies)
+        self._connectionPoolSize = max(10, ConfigDetails().uploadConcurrency)
+        self._adapter = None
+        self._sessionLock = threading.Lock()
+
+        # Authenticated OpenClinica sessions (key = (ocUrl, username))
+        self._ocSessions = {}
+        self._ocLock = threading.Lock()
+
+        # Proxies and proxy authentication are resolved once (reset when proxy setup or server changes)
+        self._proxies = None
+        self._auth = None
+
 ########  ########   #######  ########  ######## ########  ######## #### ########  ######
 ##     ## ##     ## ##     ## ##     ## ##       ##     ##    ##     ##  ##       ##    ##
 ##     ## ##     ## ##     ## ##     ## ##       ##     ##    ##     ##  ##       ##
@@ -140,6 +169,7 @@ class HttpConnectionService(object):
         """
         if self.__ip != value:
             self.__ip = value
+            self._resetServerState()
 
     @property
     def port(self):
@@ -153,6 +183,7 @@ class HttpConnectionService(object):
         """
         if self.__port != value:
             self.__port = value
+            self._resetServerState()
 
     @property
     def application(self):
@@ -184,6 +215,7 @@ class HttpConnectionService(object):
             self._noProxy = noProxy
 
             self._proxyEnabled = True
+            self._proxies = None
 
     def setupProxyAuth(self, login, password):
         """Enable proxy authentication
@@ -192,6 +224,26 @@ class HttpConnectionService(object):
         self._proxyAuthPassword = password
 
         self._proxyAuthEnabled = True
+        self._auth = None
+
+    def connectionStats(self):
+        """Connection reuse of the pooled connections
+        requests: number of requests sent over pooled connections
+        connections: number of opened connections (TCP + TLS handshakes)
+        reused: number of requests which reused already opened connection
+        """
+        stats = {"requests": 0, "connections": 0, "reused": 0}
+
+        if self._adapter is not None:
+            for key in self._adapter.poolmanager.pools.keys():
+                pool = self._adapter.poolmanager.pools.get(key)
+                if pool is not None:
+                    stats["requests"] += pool.num_requests
+                    stats["connections"] += pool.num_connections
+
+            stats["reused"] = max(0, stats["requests"] - stats["connections"])
+
+        return stats
 
  ######   ######## ########
 ##    ##  ##          ##
@@ -332,9 +384,16 @@ class HttpConnectionService(object):
     def getCrfItemsValues(self, data, thread=None):
         """Get values of specified items fields from OpenClinica
         within one study event for multiple data item fields
+
+        When OpenClinica URL, study OID and subject key are provided the values are resolved
+        from one clinical data document of the event, otherwise (or when the document is not available)
+        each item value is requested separately with concurrent requests
         """
         results = []
 
+        ocUrl = None
+        annotations = []
+
         if data:
             studyid = data[0]
             subjectPid = data[1]      
@@ -342,18 +401,27 @@ class HttpConnectionService(object):
             studyEventRepeatKey = data[3]
             annotations = data[4]
 
-        for a in annotations:
-            method = "/api/v2/getCrfItemValue/" + studyid + "/" + subjectPid + "/" + studyEventOid + "/" + studyEventRepeatKey + "/" + a.formoid + "/" + a.crfitemoid
+            if len(data) > 7:
+                ocUrl = data[5]
+                studyOid = data[6]
+                subjectKey = data[7]
 
-            r = self._sentRequest(method)
-
-            if r.status_code == 200:
-                value = r.json()["itemValue"]
+        # Bulk retrieval from OpenClinica clinical data of the event
+        itemValues = None
+        if ocUrl and annotations:
+            itemValues = self._getEventItemValues(ocUrl, studyOid, subjectKey, studyEventOid, studyEventRepeatKey)
 
-                if value is None:
-                    value = ""
-
-                results.append(value)
+        if itemValues is not None:
+            for a in annotations:
+                # Items missing in clinical data (without value) yield ""
+                results.append(itemValues.get((a.formoid, a.crfitemoid), ""))
+        else:
+            methods = []
+            for a in annotations:
+                methods.append(
+                    "/api/v2/getCrfItemValue/" + studyid + "/" + subjectPid + "/" + studyEventOid + "/" + studyEventRepeatKey + "/" + a.formoid + "/" + a.crfitemoid
+                )
+            results = self._getCrfItemValuesConcurrently(methods)
 
         if thread:
             thread.emit(QtCore.SIGNAL("finished(QVariant)"), results)
@@ -523,252 +591,17 @@ class HttpConnectionService(object):
         r = self._ocRequest(ocUrl, method)
 
         if r.status_code == 200:
-            if "ClinicalData" in r.json():
-                if "SubjectData" in r.json()["ClinicalData"]:
-                    if "StudyEventData" in r.json()["ClinicalData"]["SubjectData"]:
-                        
-                        eventData = r.json()["ClinicalData"]["SubjectData"]["StudyEventData"]
-
-                        # Multiple events
-                        if type(eventData) is list:
-                            for ed in eventData:
-                                event = Event()
-                                event.eventDefinitionOID = ed["@StudyEventOID"]
-                                event.status = ed["@OpenClinica:Status"]
-
-                                dateString = ed["@OpenClinica:StartDate"]
-                                format = ""
-                                # Is it only date or datetime (in json the date format looks like this)
-                                if len(dateString) == 11:
-                                    format = "%d-%b-%Y"
-                                elif len(dateString) == 20:
-                                    format = "%d-%b-%Y %H:%M:%S"
-
-                                event.startDate = datetime.strptime(dateString, format)
-                                event.studyEventRepeatKey = ed["@StudyEventRepeatKey"]
-
-                                # Subject Age At Event is optional (because collect birth date is optional)
-                                if "OpenClinica:SubjectAgeAtEvent" in ed:
-                                    event.subjectAgeAtEvent = ed["OpenClinica:SubjectAgeAtEvent"]
-
-                                # Resulting eCRFs
-                                if "FormData" in ed:
-                                    formData = ed["FormData"]
-
-                                    # Multiple forms
-                                    if type(formData) is list:
-                                        for frm in formData:
-                                            crf = Crf()
-                                            crf.oid = frm["@FormOID"]
-                                            crf.version = frm["@OpenClinica:Version"]
-                                            crf.status = frm["@OpenClinica:Status"]
-                                            event.addCrf(crf)
-                                    # Only one form in event
-                                    elif type(formData) is dict:
-                                        frm  = formData
-                                        crf = Crf()
-                                        crf.oid = frm["@FormOID"]
-                                        crf.version = frm["@OpenClinica:Version"]
-                                        crf.status = frm["@OpenClinica:Status"]
-                                        event.addCrf(crf)
-                                
-                                # + automatically schedule default version only (if it is not)
-                                eventFormOids = []
-
-                                eventDefinition = r.json()["Study"]["MetaDataVersion"]["StudyEventDef"]
-                                if type(eventDefinition) is list:
-                                    for ed in eventDefinition:
-                                        formRef = ed["FormRef"]
-                                        if type(formRef) is list:
-                                            for fr in formRef:
-                                                eventFormOids.append(fr["@FormOID"])
-                                        elif type(formRef) is dict:
-                                            eventFormOids.append(formRef["@FormOID"])
-                                elif type(eventDefinition) is dict:
-                                    ed = eventDefinition
-                                    formRef = ed["FormRef"]
-                                    if type(formRef) is list:
-                                        for fr in formRef:
-                                            eventFormOids.append(fr["@FormOID"])
-                                    elif type(formRef) is dict:
-                                        eventFormOids.append(formRef["@FormOID"])
-
-                                formDefinition = r.json()["Study"]["MetaDataVersion"]["FormDef"]
-                                if type(formDefinition) is list:
-                                    for fd in formDefinition:
-                                        if fd["@OID"] in eventFormOids:
-                                            if not event.hasScheduledCrf(fd["@OID"]):
-
-                                                presentInEventDefinition = fd["OpenClinica:FormDetails"]["OpenClinica:PresentInEventDefinition"]
-
-                                                # Form used in multiple Events
-                                                if type(presentInEventDefinition) is list:
-                                                    for pied in presentInEventDefinition:
-                                                        # Only default version forms
-                                                        if pied["@IsDefaultVersion"] == "Yes":
-                                                            # Only the form that belong to the current event
-                                                            if pied["@StudyEventOID"] == event.eventDefinitionOID:
-                                                                crf = Crf()
-                                                                crf.oid = fd["@OID"]
-                                                                event.addCrf(crf)
-                                                                break
-
-                                                # Form used in one Event
-                                                elif type(presentInEventDefinition) is dict:
-                                                    # Only default version forms
-                                                    if presentInEventDefinition["@IsDefaultVersion"] == "Yes":
-                                                        crf = Crf()
-                                                        crf.oid = fd["@OID"]
-                                                        event.addCrf(crf)
-
-                                elif type(formDefinition) is dict:
-                                    fd = formDefinition
-                                    if fd["@OID"] in eventFormOids:
-                                        if not event.hasScheduledCrf(fd["@OID"]):
-
-                                            presentInEventDefinition = fd["OpenClinica:FormDetails"]["OpenClinica:PresentInEventDefinition"]
-
-                                            # Form used in multiple Events
-                                            if type(presentInEventDefinition) is list:
-                                                for pied in presentInEventDefinition:
-                                                    # Only default version forms
-                                                    if pied["@IsDefaultVersion"] == "Yes":
-                                                        # Only the form that belong to the current event
-                                                        if pied["@StudyEventOID"] == event.eventDefinitionOID:
-                                                            crf = Crf()
-                                                            crf.oid = fd["@OID"]
-                                                            event.addCrf(crf)
-                                                            break
-
-                                            # Form used in one Event
-                                            elif type(presentInEventDefinition) is dict:
-                                                # Only default version forms
-                                                if presentInEventDefinition["@IsDefaultVersion"] == "Yes":
-                                                    crf = Crf()
-                                                    crf.oid = fd["@OID"]
-                                                    event.addCrf(crf)
-
-                                results.append(event)
-                        # Only one event reported
-                        elif type(eventData) is dict:
-                            ed = eventData
-
-                            event = Event()
-                            event.eventDefinitionOID = ed["@StudyEventOID"]
-                            event.status = ed["@OpenClinica:Status"]
-                            dateString = ed["@OpenClinica:StartDate"]
-
-                            format = ""
-                            # Is it only date or datetime (in json the date format looks like this)
-                            if len(dateString) == 11:
-                                format = "%d-%b-%Y"
-                            elif len(dateString) == 20:
-                                format = "%d-%b-%Y %H:%M:%S"
-
-                            event.startDate = datetime.strptime(dateString, format)
-                            event.studyEventRepeatKey = ed["@StudyEventRepeatKey"]
-
-                            # Subject Age At Event is optional (because collect birth date is optional)
-                            if "OpenClinica:SubjectAgeAtEvent" in ed:
-                                event.subjectAgeAtEvent = ed["OpenClinica:SubjectAgeAtEvent"]
-
-                            # Resulting eCRFs
-                            if "FormData" in ed:
-                                formData = ed["FormData"]
-
-                                # Multiple forms
-                                if type(formData) is list:
-                                    for frm in formData:
-                                        crf = Crf()
-                                        crf.oid = frm["@FormOID"]
-                                        crf.version = frm["@OpenClinica:Version"]
-                                        crf.status = frm["@OpenClinica:Status"]
-                                        event.addCrf(crf)
-                                # Only one form in event
-                                elif type(formData) is dict:
-                                    frm  = formData
-                                    crf = Crf()
-                                    crf.oid = frm["@FormOID"]
-                                    crf.version = frm["@OpenClinica:Version"]
-                                    crf.status = frm["@OpenClinica:Status"]
-                                    event.addCrf(crf)
-                            # + automatically schedule default version (if it is not)
-                            eventFormOids = []
-
-                            eventDefinition = r.json()["Study"]["MetaDataVersion"]["StudyEventDef"]
-                            if type(eventDefinition) is list:
-                                for ed in eventDefinition:
-                                    formRef = ed["FormRef"]
-                                    if type(formRef) is list:
-                                        for fr in formRef:
-                                            eventFormOids.append(fr["@FormOID"])
-                                    elif type(formRef) is dict:
-                                        eventFormOids.append(formRef["@FormOID"])
-                            elif type(eventDefinition) is dict:
-                                ed = eventDefinition
-                                formRef = ed["FormRef"]
-                                if type(formRef) is list:
-                                    for fr in formRef:
-                                        eventFormOids.append(fr["@FormOID"])
-                                elif type(formRef) is dict:
-                                    eventFormOids.append(formRef["@FormOID"])
-
-                            formDefinition = r.json()["Study"]["MetaDataVersion"]["FormDef"]
-                            if type(formDefinition) is list:
-                                for fd in formDefinition:
-                                    if fd["@OID"] in eventFormOids:
-                                        if not event.hasScheduledCrf(fd["@OID"]):
-
-                                            presentInEventDefinition = fd["OpenClinica:FormDetails"]["OpenClinica:PresentInEventDefinition"]
-
-                                            # Form used in multiple Events
-                                            if type(presentInEventDefinition) is list:
-                                                for pied in presentInEventDefinition:
-                                                    # Only default version forms
-                                                    if pied["@IsDefaultVersion"] == "Yes":
-                                                        # Only the form that belong to the current event
-                                                        if pied["@StudyEventOID"] == event.eventDefinitionOID:
-                                                            crf = Crf()
-                                                            crf.oid = fd["@OID"]
-                                                            event.addCrf(crf)
-                                                            break
-
-                                            # Form used in one Event
-                                            elif type(presentInEventDefinition) is dict:
-                                                # Only default version forms
-                                                if presentInEventDefinition["@IsDefaultVersion"] == "Yes":
-                                                    crf = Crf()
-                                                    crf.oid = fd["@OID"]
-                                                    event.addCrf(crf)
-
-                            elif type(formDefinition) is dict:
-                                fd = formDefinition
-                                if fd["@OID"] in eventFormOids:
-                                    if not event.hasScheduledCrf(fd["@OID"]):
-
-                                        presentInEventDefinition = fd["OpenClinica:FormDetails"]["OpenClinica:PresentInEventDefinition"]
-
-                                        # Form used in multiple Events
-                                        if type(presentInEventDefinition) is list:
-                                            for pied in presentInEventDefinition:
-                                                # Only default version forms
-                                                if pied["@IsDefaultVersion"] == "Yes":
-                                                    # Only the form that belong to the current event
-                                                    if pied["@StudyEventOID"] == event.eventDefinitionOID:
-                                                        crf = Crf()
-                                                        crf.oid = fd["@OID"]
-                                                        event.addCrf(crf)
-                                                        break
-
-                                        # Form used in one Event
-                                        elif type(presentInEventDefinition) is dict:
-                                            # Only default version forms
-                                            if presentInEventDefinition["@IsDefaultVersion"] == "Yes":
-                                                crf = Crf()
-                                                crf.oid = fd["@OID"]
-                                                event.addCrf(crf)
-
-                            results.append(event)
+            # Parse the response only once
+            odm = r.json()
+
+            if "ClinicalData" in odm:
+                subjectData = odm["ClinicalData"].get("SubjectData")
+                if type(subjectData) is dict and "StudyEventData" in subjectData:
+                    results = self._parseCasebookEvents(
+                        odm["Study"]["MetaDataVersion"],
+                        subjectData["StudyEventData"],
+                        False
+                    )
 
         if thread:
             thread.emit(QtCore.SIGNAL("finished(QVariant)"), results)
@@ -790,267 +623,34 @@ class HttpConnectionService(object):
         r = self._ocRequest(ocUrl, method)
 
         if r.status_code == 200:
-            if "ClinicalData" in r.json():
-                if "SubjectData" in r.json()["ClinicalData"]:
-                    
-                    subjectData = r.json()["ClinicalData"]["SubjectData"]
-                    # Exactly one subject should be reported
-                    if type(subjectData) is dict:
-                        subj = subjectData
+            # Parse the response only once
+            odm = r.json()
 
-                        subject = Subject()
-                        subject.oid = subj["@SubjectKey"]
-                        subject.studySubjectId = subj["@OpenClinica:StudySubjectID"]
-                        subject.status = subj["@OpenClinica:Status"]
+            if "ClinicalData" in odm:
+                subjectData = odm["ClinicalData"].get("SubjectData")
 
-                        if "@OpenClinica:UniqueIdentifier" in subj:
-                            subject.uniqueIdentifier = subj["@OpenClinica:UniqueIdentifier"]
-                        result = subject
-
-                    if "StudyEventData" in r.json()["ClinicalData"]["SubjectData"]:
-                        
-                        eventData = r.json()["ClinicalData"]["SubjectData"]["StudyEventData"]
-
-                        # Multiple events
-                        if type(eventData) is list:
-                            for ed in eventData:
-                                event = Event()
-                                event.eventDefinitionOID = ed["@StudyEventOID"]
-                                event.status = ed["@OpenClinica:Status"]
-
-                                dateString = ed["@OpenClinica:StartDate"]
-                                format = ""
-                                # Is it only date or datetime (in json the date format looks like this)
-                                if len(dateString) == 11:
-                                    format = "%d-%b-%Y"
-                                elif len(dateString) == 20:
-                                    format = "%d-%b-%Y %H:%M:%S"
-
-                                event.startDate = datetime.strptime(dateString, format)
-                                event.studyEventRepeatKey = ed["@StudyEventRepeatKey"]
-
-                                # Subject Age At Event is optional (because collect birth date is optional)
-                                if "OpenClinica:SubjectAgeAtEvent" in ed:
-                                    event.subjectAgeAtEvent = ed["OpenClinica:SubjectAgeAtEvent"]
-
-                                # Resulting eCRFs
-                                if "FormData" in ed:
-                                    formData = ed["FormData"]
-
-                                    # Multiple forms
-                                    if type(formData) is list:
-                                        for frm in formData:
-                                            crf = Crf()
-                                            crf.oid = frm["@FormOID"]
-                                            crf.version = frm["@OpenClinica:Version"]
-                                            crf.status = frm["@OpenClinica:Status"]
-                                            event.addCrf(crf)
-                                    # Only one form in event
-                                    elif type(formData) is dict:
-                                        frm = formData
-                                        crf = Crf()
-                                        crf.oid = frm["@FormOID"]
-                                        crf.version = frm["@OpenClinica:Version"]
-                                        crf.status = frm["@OpenClinica:Status"]
-                                        event.addCrf(crf)
-                                
-                                # + automatically schedule default version only (if it is not)
-                                eventFormOids = []
-
-                                eventDefinition = r.json()["Study"]["MetaDataVersion"]["StudyEventDef"]
-                                if type(eventDefinition) is list:
-                                    for ed in eventDefinition:
-                                        formRef = ed["FormRef"]
-                                        if type(formRef) is list:
-                                            for fr in formRef:
-                                                eventFormOids.append(fr["@FormOID"])
-                                        elif type(formRef) is dict:
-                                            eventFormOids.append(formRef["@FormOID"])
-                                elif type(eventDefinition) is dict:
-                                    ed = eventDefinition
-                                    formRef = ed["FormRef"]
-                                    if type(formRef) is list:
-                                        for fr in formRef:
-                                            eventFormOids.append(fr["@FormOID"])
-                                    elif type(formRef) is dict:
-                                        eventFormOids.append(formRef["@FormOID"])
-
-                                formDefinition = r.json()["Study"]["MetaDataVersion"]["FormDef"]
-                                if type(formDefinition) is list:
-                                    for fd in formDefinition:
-                                        if fd["@OID"] in eventFormOids:
-                                            if not event.hasScheduledCrf(fd["@OID"]):
-                                                
-                                                presentInEventDefinition = fd["OpenClinica:FormDetails"]["OpenClinica:PresentInEventDefinition"]
-
-                                                # Form used in multiple Events
-                                                if type(presentInEventDefinition) is list:
-                                                    for pied in presentInEventDefinition:
-                                                        # Only default version of non-hidden forms
-                                                        if pied["@IsDefaultVersion"] == "Yes" and pied["@HideCRF"] == "No":
-                                                            # Only the form that belong to the current event
-                                                            if pied["@StudyEventOID"] == event.eventDefinitionOID:
-                                                                crf = Crf()
-                                                                crf.oid = fd["@OID"]
-                                                                event.addCrf(crf)
-                                                                break
-
-                                                # Form used in one Event
-                                                elif type(presentInEventDefinition) is dict:
-                                                    # Only default version of non-hidden forms
-                                                    if presentInEventDefinition["@IsDefaultVersion"] == "Yes" and presentInEventDefinition["@HideCRF"] == "No":
-                                                        crf = Crf()
-                                                        crf.oid = fd["@OID"]
-                                                        event.addCrf(crf)
-                                elif type(formDefinition) is dict:
-                                    fd = formDefinition
-                                    if fd["@OID"] in eventFormOids:
-                                        if not event.hasScheduledCrf(fd["@OID"]):
-
-                                            presentInEventDefinition = fd["OpenClinica:FormDetails"]["OpenClinica:PresentInEventDefinition"]
-
-                                            # Form used in multiple Events
-                                            if type(presentInEventDefinition) is list:
-                                                for pied in presentInEventDefinition:
-                                                    # Only default version of non-hidden forms
-                                                    if pied["@IsDefaultVersion"] == "Yes" and pied["@HideCRF"] == "No":
-                                                        # Only the form that belong to the current event
-                                                        if pied["@StudyEventOID"] == event.eventDefinitionOID:
-                                                            crf = Crf()
-                                                            crf.oid = fd["@OID"]
-                                                            event.addCrf(crf)
-                                                            break
-
-                                            # Form used in one Event
-                                            elif type(presentInEventDefinition) is dict:
-                                                # Only default version of non-hidden forms
-                                                if presentInEventDefinition["@IsDefaultVersion"] == "Yes" and presentInEventDefinition["@HideCRF"] == "No":
-                                                    crf = Crf()
-                                                    crf.oid = fd["@OID"]
-                                                    event.addCrf(crf)
-
-                                result.studyEventData.append(event)
-                        
-                        # Only one event reported
-                        elif type(eventData) is dict:
-                            ed = eventData
-
-                            event = Event()
-                            event.eventDefinitionOID = ed["@StudyEventOID"]
-                            event.status = ed["@OpenClinica:Status"]
-                            dateString = ed["@OpenClinica:StartDate"]
-
-                            format = ""
-                            # Is it only date or datetime (in json the date format looks like this)
-                            if len(dateString) == 11:
-                                format = "%d-%b-%Y"
-                            elif len(dateString) == 20:
-                                format = "%d-%b-%Y %H:%M:%S"
-
-                            event.startDate = datetime.strptime(dateString, format)
-                            event.studyEventRepeatKey = ed["@StudyEventRepeatKey"]
-
-                            # Subject Age At Event is optional (because collect birth date is optional)
-                            if "OpenClinica:SubjectAgeAtEvent" in ed:
-                                event.subjectAgeAtEvent = ed["OpenClinica:SubjectAgeAtEvent"]
-
-                            # Resulting eCRFs
-                            if "FormData" in ed:
-                                formData = ed["FormData"]
-
-                                # Multiple forms
-                                if type(formData) is list:
-                                    for frm in formData:
-                                        crf = Crf()
-                                        crf.oid = frm["@FormOID"]
-                                        crf.version = frm["@OpenClinica:Version"]
-                                        crf.status = frm["@OpenClinica:Status"]
-                                        event.addCrf(crf)
-                                # Only one form in event
-                                elif type(formData) is dict:
-                                    frm  = formData
-                                    crf = Crf()
-                                    crf.oid = frm["@FormOID"]
-                                    crf.version = frm["@OpenClinica:Version"]
-                                    crf.status = frm["@OpenClinica:Status"]
-                                    event.addCrf(crf)
-                            # + automatically schedule default version (if it is not)
-                            eventFormOids = []
-
-                            eventDefinition = r.json()["Study"]["MetaDataVersion"]["StudyEventDef"]
-                            if type(eventDefinition) is list:
-                                for ed in eventDefinition:
-                                    formRef = ed["FormRef"]
-                                    if type(formRef) is list:
-                                        for fr in formRef:
-                                            eventFormOids.append(fr["@FormOID"])
-                                    elif type(formRef) is dict:
-                                        eventFormOids.append(formRef["@FormOID"])
-                            elif type(eventDefinition) is dict:
-                                ed = eventDefinition
-                                formRef = ed["FormRef"]
-                                if type(formRef) is list:
-                                    for fr in formRef:
-                                        eventFormOids.append(fr["@FormOID"])
-                                elif type(formRef) is dict:
-                                    eventFormOids.append(formRef["@FormOID"])
-
-                            formDefinition = r.json()["Study"]["MetaDataVersion"]["FormDef"]
-                            if type(formDefinition) is list:
-                                for fd in formDefinition:
-                                    if fd["@OID"] in eventFormOids:
-                                        if not event.hasScheduledCrf(fd["@OID"]):
-
-                                            presentInEventDefinition = fd["OpenClinica:FormDetails"]["OpenClinica:PresentInEventDefinition"]
-
-                                            # Form used in multiple Events
-                                            if type(presentInEventDefinition) is list:
-                                                for pied in presentInEventDefinition:
-                                                    # Only default version of non-hidden forms
-                                                    if pied["@IsDefaultVersion"] == "Yes" and pied["@HideCRF"] == "No":
-                                                        # Only the form that belong to the current event
-                                                        if pied["@StudyEventOID"] == event.eventDefinitionOID:
-                                                            crf = Crf()
-                                                            crf.oid = fd["@OID"]
-                                                            event.addCrf(crf)
-                                                            break
-
-                                            # Form used in one Event
-                                            elif type(presentInEventDefinition) is dict:
-                                                # Only default version of non-hidden forms
-                                                if presentInEventDefinition["@IsDefaultVersion"] == "Yes" and presentInEventDefinition["@HideCRF"] == "No":
-                                                    crf = Crf()
-                                                    crf.oid = fd["@OID"]
-                                                    event.addCrf(crf)
-
-                            elif type(formDefinition) is dict:
-                                fd = formDefinition
-                                if fd["@OID"] in eventFormOids:
-                                    if not event.hasScheduledCrf(fd["@OID"]):
-
-                                        presentInEventDefinition = fd["OpenClinica:FormDetails"]["OpenClinica:PresentInEventDefinition"]
-
-                                        # Form used in multiple Events
-                                        if type(presentInEventDefinition) is list:
-                                            for pied in presentInEventDefinition:
-                                                # Only default version of non-hidden forms
-                                                if pied["@IsDefaultVersion"] == "Yes" and pied["@HideCRF"] == "No":
-                                                    # Only the form that belong to the current event
-                                                    if pied["@StudyEventOID"] == event.eventDefinitionOID:
-                                                        crf = Crf()
-                                                        crf.oid = fd["@OID"]
-                                                        event.addCrf(crf)
-                                                        break
-
-                                        # Form used in one Event
-                                        elif type(presentInEventDefinition) is dict:
-                                            # Only default version of non-hidden forms
-                                            if presentInEventDefinition["@IsDefaultVersion"] == "Yes" and presentInEventDefinition["@HideCRF"] == "No":
-                                                crf = Crf()
-                                                crf.oid = fd["@OID"]
-                                                event.addCrf(crf)
-
-                            result.studyEventData.append(event)
+                # Exactly one subject should be reported
+                if type(subjectData) is dict:
+                    subj = subjectData
+
+                    subject = Subject()
+                    subject.oid = subj["@SubjectKey"]
+                    subject.studySubjectId = subj["@OpenClinica:StudySubjectID"]
+                    subject.status = subj["@OpenClinica:Status"]
+
+                    if "@OpenClinica:UniqueIdentifier" in subj:
+                        subject.uniqueIdentifier = subj["@OpenClinica:UniqueIdentifier"]
+                    result = subject
+
+                    if "StudyEventData" in subj:
+                        # Hidden default version eCRFs are not scheduled
+                        result.studyEventData.extend(
+                            self._parseCasebookEvents(
+                                odm["Study"]["MetaDataVersion"],
+                                subj["StudyEventData"],
+                                True
+                            )
+                        )
 
         if thread:
             thread.emit(QtCore.SIGNAL("finished(QVariant)"), result)
@@ -1089,29 +689,7 @@ class HttpConnectionService(object):
             url = portalUrl + method + remoteFilename
             self._logger.info("Downloading from: %s" % url)
 
-            s = requests.Session()
-
-            auth = None
-            if self._proxyAuthEnabled:
-                auth = HTTPBasicAuth(self._proxyAuthLogin, self._proxyAuthPassword)
-                self._logger.info("Connecting with authentication: %s" % str(self._proxyAuthLogin))
-
-            # Application proxy enabled
-            if self._proxyEnabled:
-                # No proxy
-                if self._noProxy != "" and self._noProxy is not whitespace and self._noProxy in "https://" + self.__ip:
-                    proxies = {}
-                    self._logger.info("Connecting without proxy because of no proxy: %s" % self._noProxy)
-                # RPB client defined proxy
-                else:
-                    proxies = {"http": "http://" + self._proxyHost + ":" + self._proxyPort, "https": "https://" + self._proxyHost + ":" + self._proxyPort}
-                    self._logger.info("Connecting with application defined proxy: %s" % str(proxies))
-            # Use system proxy
-            else:
-                proxies = requests.utils.get_environ_proxies("https://" + self.__ip)
-                self._logger.info("Using system proxy variables (no proxy applied): " + str(proxies))
-
-            response = s.get(url, stream=True, auth=auth, verify=False, proxies=proxies)
+            response = self._newSession().get(url, stream=True, auth=self._getAuth(), verify=False, proxies=self._getProxies())
 
             if not response.ok:
                 self._logger.error("Error during new RadPlanBio client download.")
@@ -1191,7 +769,7 @@ class HttpConnectionService(object):
         """Performs a HTTP POST request.
         Parameters
         ----------
-        data: bytes
+        data: bytes or MultipartFileStream
             HTTP request message payload
         headers: Dict[str, str]
             HTTP request message headers
@@ -1200,6 +778,15 @@ class HttpConnectionService(object):
         method = "/api/v1/dicomweb/studies/"
 
         def serveDataChunks(data):
+            # Streamed body is read block by block
+            if hasattr(data, "read"):
+                while True:
+                    chunk = data.read(self._chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+                return
+
             for i, offset in enumerate(range(0, len(data), self._chunk_size)):
                 self._logger.debug("Serve data chunk #{i}")
                 end = offset + self._chunk_size
@@ -1278,6 +865,37 @@ class HttpConnectionService(object):
         # TODO: maybe here return status
         return ""
 
+    def httpPostMultipartApplicationDicomFiles(self, filenames):
+        """Performs a HTTP POST request with a multipart payload with
+        "application/dicom" media type, files are streamed from disk.
+        Parameters
+        ----------
+        filenames: Sequence[str]
+            DICOM files that should be posted
+        Returns
+        -------
+        String
+            empty string
+        """
+
+        # Generate random boundary value
+        boundary = binascii.hexlify(os.urandom(16)).decode('ascii')
+        content_type = (
+            'multipart/related; '
+            'type="application/dicom"; '
+            'boundary=' + boundary
+        )
+        content = MultipartFileStream(filenames, boundary, "application/dicom")
+        try:
+            self.httpPost(
+                content,
+                headers={'Content-Type': content_type}
+            )
+        finally:
+            content.close()
+
+        return ""
+
     def encodeMultipartMessage(self, data, content_type):
         """Encodes the payload of a HTTP multipart response message.
         Parameters
@@ -1294,18 +912,18 @@ class HttpConnectionService(object):
         multipart, content_type_field, boundary_field = content_type.split(';')
         content_type = content_type_field.split('=')[1].strip('"')
         boundary = boundary_field.split('=')[1]
-        body = b''
+        parts = []
         for payload in data:
-            body += (
+            parts.append(
                 '\r\n--{boundary}'
                 '\r\nContent-Type: {content_type}\r\n\r\n'.format(
                     boundary=boundary,
                     content_type=content_type
                 ).encode('utf-8')
             )
-            body += payload
-        body += '\r\n--{boundary}--'.format(boundary=boundary).encode('utf-8')
-        return body
+            parts.append(payload)
+        parts.append('\r\n--{boundary}--'.format(boundary=boundary).encode('utf-8'))
+        return b''.join(parts)
 
 ########  ########  #### ##     ##    ###    ######## ######## 
 ##     ## ##     ##  ##  ##     ##   ## ##      ##    ##       
@@ -1315,89 +933,285 @@ class HttpConnectionService(object):
 ##        ##    ##   ##    ## ##   ##     ##    ##    ##       
 ##        ##     ## ####    ###    ##     ##    ##    ######## 
 
-    def _sentRequest(self, method):
-        """Generic GET request to RadPlanBio server
+    @staticmethod
+    def _odmList(value):
+        """ODM JSON element as list (single element is reported as object)
         """
-        # Standard header
+        if type(value) is list:
+            return value
+        elif type(value) is dict:
+            return [value]
+        else:
+            return []
+
+    def _defaultEventForms(self, metaDataVersion, visibleOnly):
+        """Index of default version forms which are automatically scheduled in events
+        Returns (dictionary key = StudyEventOID, value = form OIDs; form OIDs for events not in dictionary)
+        visibleOnly: forms hidden in event definition are not scheduled
+        """
+        # Forms referenced from event definitions
+        eventFormOids = set()
+        for ed in self._odmList(metaDataVersion["StudyEventDef"]):
+            for fr in self._odmList(ed["FormRef"]):
+                eventFormOids.add(fr["@FormOID"])
+
+        # Form OIDs in order of form definitions (form used in one Event is scheduled for any event)
+        eventForms = {}
+        anyEventForms = []
+        for fd in self._odmList(metaDataVersion["FormDef"]):
+            formOid = fd["@OID"]
+            if formOid not in eventFormOids:
+                continue
+
+            presentInEventDefinition = fd["OpenClinica:FormDetails"]["OpenClinica:PresentInEventDefinition"]
+
+            # Form used in multiple Events
+            if type(presentInEventDefinition) is list:
+                for pied in presentInEventDefinition:
+                    # Only default version (of non-hidden) forms
+                    if pied["@IsDefaultVersion"] == "Yes" and (not visibleOnly or pied["@HideCRF"] == "No"):
+                        oids = eventForms.setdefault(pied["@StudyEventOID"], list(anyEventForms))
+                        if not oids or oids[-1] != formOid:
+                            oids.append(formOid)
+
+            # Form used in one Event
+            elif type(presentInEventDefinition) is dict:
+                pied = presentInEventDefinition
+                # Only default version (of non-hidden) forms
+                if pied["@IsDefaultVersion"] == "Yes" and (not visibleOnly or pied["@HideCRF"] == "No"):
+                    anyEventForms.append(formOid)
+                    for oids in eventForms.values():
+                        oids.append(formOid)
+
+        return eventForms, anyEventForms
+
+    def _parseCasebookEvents(self, metaDataVersion, eventData, visibleOnly):
+        """Study events with eCRFs from casebook StudyEventData
+        Reported eCRFs are followed by default version eCRFs of the event which are not scheduled yet.
+        visibleOnly: hidden default version eCRFs are not scheduled
+        """
+        results = []
+
+        # Definitions are indexed once per response
+        eventForms, anyEventForms = self._defaultEventForms(metaDataVersion, visibleOnly)
+
+        for ed in self._odmList(eventData):
+            event = Event()
+            event.eventDefinitionOID = ed["@StudyEventOID"]
+            event.status = ed["@OpenClinica:Status"]
+
+            dateString = ed["@OpenClinica:StartDate"]
+            format = ""
+            # Is it only date or datetime (in json the date format looks like this)
+            if len(dateString) == 11:
+                format = "%d-%b-%Y"
+            elif len(dateString) == 20:
+                format = "%d-%b-%Y %H:%M:%S"
+
+            event.startDate = datetime.strptime(dateString, format)
+            event.studyEventRepeatKey = ed["@StudyEventRepeatKey"]
+
+            # Subject Age At Event is optional (because collect birth date is optional)
+            if "OpenClinica:SubjectAgeAtEvent" in ed:
+                event.subjectAgeAtEvent = ed["OpenClinica:SubjectAgeAtEvent"]
+
+            # Resulting eCRFs
+            scheduledOids = set()
+            for frm in self._odmList(ed.get("FormData")):
+                crf = Crf()
+                crf.oid = frm["@FormOID"]
+                crf.version = frm["@OpenClinica:Version"]
+                crf.status = frm["@OpenClinica:Status"]
+                event.addCrf(crf)
+                scheduledOids.add(crf.oid)
+
+            # + automatically schedule default version only (if it is not)
+            for formOid in eventForms.get(event.eventDefinitionOID, anyEventForms):
+                if formOid not in scheduledOids:
+                    crf = Crf()
+                    crf.oid = formOid
+                    event.addCrf(crf)
+                    scheduledOids.add(formOid)
+
+            results.append(event)
+
+        return results
+
+    def _getEventItemValues(self, ocUrl, studyOid, subjectKey, studyEventOid, studyEventRepeatKey):
+        """Item values of study event occurrence from OpenClinica clinical data
+        Returns dictionary (key = (form OID, item OID), value = item value) or None when event data is not available
+        """
+        method = studyOid + "/" + subjectKey + "/" + studyEventOid + "/*"
+
+        try:
+            r = self._ocRequest(ocUrl, method)
+            if r.status_code != 200:
+                return None
+            odm = r.json()
+        except Exception as err:
+            self._logger.warning("Clinical data of event are not available: " + str(err))
+            return None
+
+        if "ClinicalData" not in odm:
+            return None
+
+        for sd in self._odmList(odm["ClinicalData"].get("SubjectData")):
+            for ed in self._odmList(sd.get("StudyEventData")):
+                if ed["@StudyEventOID"] == studyEventOid and ed["@StudyEventRepeatKey"] == studyEventRepeatKey:
+
+                    itemValues = {}
+                    for fd in self._odmList(ed.get("FormData")):
+                        formOid = fd["@FormOID"]
+                        for igd in self._odmList(fd.get("ItemGroupData")):
+                            for item in self._odmList(igd.get("ItemData")):
+                                # First occurrence of item (in repeating groups)
+                                key = (formOid, item["@ItemOID"])
+                                if key not in itemValues:
+                                    itemValues[key] = item.get("@Value", "")
+
+                    return itemValues
+
+        return None
+
+    def _getCrfItemValuesConcurrently(self, methods):
+        """Item values requested one by one with concurrent requests to RadPlanBio server
+        Returns list of values in order of methods (empty value when the request failed)
+        """
+        results = [""] * len(methods)
+        tasks = queue.Queue()
+
+        def request():
+            """Request item values of indexes taken from tasks queue until None is received
+            """
+            while True:
+                i = tasks.get()
+                if i is None:
+                    break
+
+                try:
+                    r = self._sentRequest(methods[i])
+                    if r.status_code == 200:
+                        value = r.json()["itemValue"]
+                        if value is not None:
+                            results[i] = value
+                except Exception as err:
+                    self._logger.error(err)
+
+        workers = []
+        for w in range(min(self._connectionPoolSize, len(methods))):
+            worker = threading.Thread(target=request)
+            worker.daemon = True
+            worker.start()
+            workers.append(worker)
+
+        for i in range(len(methods)):
+            tasks.put(i)
+        for worker in workers:
+            tasks.put(None)
+
+        for worker in workers:
+            worker.join()
+
+        return results
+
+    def _getAdapter(self):
+        """Connection pool shared by all sessions of the service
+        """
+        with self._sessionLock:
+            if self._adapter is None:
+                self._adapter = HTTPAdapter(
+                    pool_connections=self._connectionPoolSize,
+                    pool_maxsize=self._connectionPoolSize
+                )
+
+            return self._adapter
+
+    def _resetServerState(self):
+        """Forget proxies and OpenClinica logins resolved for the previous server
+        """
+        self._proxies = None
+        with self._ocLock:
+            self._ocSessions = {}
+
+    def _newSession(self):
+        """New session (own cookies) using pooled connections of the service
+        """
+        adapter = self._getAdapter()
+
         s = requests.Session()
-        s.headers.update({
-            "Content-Type": "application/json",
-            "Username": self.__userDetails.username.lower(),
-            "Password": self.__userDetails.password,
-            "Clearpass": self.__userDetails.clearpass
-        })
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
 
-        # Proxy authentication
-        auth = None
-        if self._proxyAuthEnabled:
-            auth = HTTPBasicAuth(self._proxyAuthLogin, self._proxyAuthPassword)
+        return s
+
+    def _getAuth(self):
+        """Proxy authentication (None when not enabled)
+        """
+        if self._proxyAuthEnabled and self._auth is None:
+            self._auth = HTTPBasicAuth(self._proxyAuthLogin, self._proxyAuthPassword)
             self._logger.info("Connecting with authentication: %s" % str(self._proxyAuthLogin))
 
+        return self._auth
+
+    def _getProxies(self):
+        """Proxies for requests to RadPlanBio server
+        """
+        if self._proxies is None:
+            # Application proxy enabled
+            if self._proxyEnabled:
+                # No proxy
+                if self._noProxy != "" and self._noProxy is not whitespace and self._noProxy in "https://" + self.__ip:
+                    proxies = {}
+                    self._logger.info("Connecting without proxy because of no proxy: %s" % self._noProxy)
+                # RPB client defined proxy
+                else:
+                    proxies = {"http": "http://" + self._proxyHost + ":" + self._proxyPort, "https": "https://" + self._proxyHost + ":" + self._proxyPort}
+                    self._logger.info("Connecting with application defined proxy: %s" % str(proxies))
+            # Use system proxy
+            else:
+                proxies = requests.utils.get_environ_proxies("https://" + self.__ip)
+                self._logger.info("Using system proxy variables (no proxy applied): %s" % str(proxies))
+
+            self._proxies = proxies
+
+        return self._proxies
+
+    def _url(self, method):
+        """URL of RadPlanBio server method
+        """
         # Unicode for URL depends on python version
         if sys.version < "3":
-            url = "%s://%s:%s%s%s" % (self.__protocol, self.__ip, str(self.__port), self.__application, method.encode("utf-8"))
+            return "%s://%s:%s%s%s" % (self.__protocol, self.__ip, str(self.__port), self.__application, method.encode("utf-8"))
         else:
-            url = "%s://%s:%s%s%s" % (self.__protocol, self.__ip, str(self.__port), self.__application, method)
-
-        # Application proxy enabled
-        if self._proxyEnabled:
-            # No proxy
-            if self._noProxy != "" and self._noProxy is not whitespace and self._noProxy in "https://" + self.__ip:
-                proxies = {}
-                self._logger.info("Connecting without proxy because of no proxy: %s" % self._noProxy)
-            # RPB client defined proxy
-            else:
-                proxies = {"http": "http://" + self._proxyHost + ":" + self._proxyPort, "https": "https://" + self._proxyHost + ":" + self._proxyPort}
-                self._logger.info("Connecting with application defined proxy: %s" % str(proxies))
-        # Use system proxy
-        else:
-            proxies = requests.utils.get_environ_proxies("https://" + self.__ip)
-            self._logger.info("Using system proxy variables (no proxy applied): %s" % str(proxies))
+            return "%s://%s:%s%s%s" % (self.__protocol, self.__ip, str(self.__port), self.__application, method)
+
+    def _sentRequest(self, method):
+        """Generic GET request to RadPlanBio server
+        """
+        # Standard header
+        headers = {
+            "Content-Type": "application/json",
+            "Username": self.__userDetails.username.lower(),
+            "Password": self.__userDetails.password,
+            "Clearpass": self.__userDetails.clearpass
+        }
 
-        r = s.get(url, auth=auth, verify=False, proxies=proxies)
+        r = self._newSession().get(self._url(method), headers=headers, auth=self._getAuth(), verify=False, proxies=self._getProxies())
 
         return r
 
     def _postRequest(self, method, body, contentType):
         """Generic POST request to RadPlanBio server
         """
-        s = requests.Session()
-        s.headers.update({
-                "Content-Type": contentType,
-                "Content-Length": str(len(body)),
-                "Username": self.__userDetails.username.lower(),
-                "Password": self.__userDetails.password,
-                "Clearpass": self.__userDetails.clearpass
-            }
-        )
-
-        auth = None
-        if self._proxyAuthEnabled:
-            auth = HTTPBasicAuth(self._proxyAuthLogin, self._proxyAuthPassword)
-            self._logger.info("Connecting with authentication: %s" % str(self._proxyAuthLogin))
-
-        # Unicode for URL depends on python version
-        if sys.version < "3":
-            url = "%s://%s:%s%s" % (self.__protocol, self.__ip, str(self.__port), self.__application + method.encode("utf-8"))
-        else:
-            url = "%s://%s:%s%s" % (self.__protocol, self.__ip, str(self.__port), self.__application + method)
-
-        # Application proxy enabled
-        if self._proxyEnabled:
-            # No proxy
-            if self._noProxy != "" and self._noProxy is not whitespace and self._noProxy in "https://" + self.__ip:
-                proxies = {}
-                self._logger.info("Connecting without proxy because of no proxy: %s" % self._noProxy)
-            # RPB client defined proxy
-            else:
-                proxies = {"http": "http://" + self._proxyHost + ":" + self._proxyPort, "https": "https://" + self._proxyHost + ":" + self._proxyPort}
-                self._logger.info("Connecting with application defined proxy: %s" % str(proxies))
-        # Use system proxy
-        else:
-            proxies = requests.utils.get_environ_proxies("https://" + self.__ip)
-            self._logger.info("Using system proxy variables (no proxy applied): %s" % str(proxies))
+        headers = {
+            "Content-Type": contentType,
+            "Content-Length": str(len(body)),
+            "Username": self.__userDetails.username.lower(),
+            "Password": self.__userDetails.password,
+            "Clearpass": self.__userDetails.clearpass
+        }
 
-        r = s.post(url, auth=auth, data=body, verify=False, proxies=proxies)
+        r = self._newSession().post(self._url(method), headers=headers, auth=self._getAuth(), data=body, verify=False, proxies=self._getProxies())
 
         return r
 
@@ -1405,40 +1219,12 @@ class HttpConnectionService(object):
         """Generic GET request to RadPlanBio portal server
         """
         # Standard header
-        s = requests.Session()
-        s.headers.update({
+        headers = {
             "Content-Type": "application/json",
             "X-Api-Key": self.__userDetails.apikey
-        })
+        }
 
-        # Proxy authentication
-        auth = None
-        if self._proxyAuthEnabled:
-            auth = HTTPBasicAuth(self._proxyAuthLogin, self._proxyAuthPassword)
-            self._logger.info("Connecting with authentication: %s" % str(self._proxyAuthLogin))
-
-        # Unicode for URL depends on python version
-        if sys.version < "3":
-            url = "%s://%s:%s%s%s" % (self.__protocol, self.__ip, str(self.__port), self.__application, method.encode("utf-8"))
-        else:
-            url = "%s://%s:%s%s%s" % (self.__protocol, self.__ip, str(self.__port), self.__application, method)
-
-        # Application proxy enabled
-        if self._proxyEnabled:
-            # No proxy
-            if self._noProxy != "" and self._noProxy is not whitespace and self._noProxy in "https://" + self.__ip:
-                proxies = {}
-                self._logger.info("Connecting without proxy because of no proxy: %s" % self._noProxy)
-            # RPB client defined proxy
-            else:
-                proxies = {"http": "http://" + self._proxyHost + ":" + self._proxyPort, "https": "https://" + self._proxyHost + ":" + self._proxyPort}
-                self._logger.info("Connecting with application defined proxy: %s" % str(proxies))
-        # Use system proxy
-        else:
-            proxies = requests.utils.get_environ_proxies("https://" + self.__ip)
-            self._logger.info("Using system proxy variables (no proxy applied): %s" % str(proxies))
-
-        r = s.get(url, auth=auth, verify=False, proxies=proxies)
+        r = self._newSession().get(self._url(method), headers=headers, auth=self._getAuth(), verify=False, proxies=self._getProxies())
 
         return r
 
@@ -1446,84 +1232,23 @@ class HttpConnectionService(object):
         """Generic PUT request to RadPlanBio portal server
         """
         # Standard header
-        s = requests.Session()
-        s.headers.update({
+        headers = {
             "Content-Type": "application/json",
             "X-Api-Key": self.__userDetails.apikey
-        })
-
-        # Proxy authentication
-        auth = None
-        if self._proxyAuthEnabled:
-            auth = HTTPBasicAuth(self._proxyAuthLogin, self._proxyAuthPassword)
-            self._logger.info("Connecting with authentication: %s" % str(self._proxyAuthLogin))
-
-        # Unicode for URL depends on python version
-        if sys.version < "3":
-            url = "%s://%s:%s%s%s" % (self.__protocol, self.__ip, str(self.__port), self.__application, method.encode("utf-8"))
-        else:
-            url = "%s://%s:%s%s%s" % (self.__protocol, self.__ip, str(self.__port), self.__application, method)
-
-        # Application proxy enabled
-        if self._proxyEnabled:
-            # No proxy
-            if self._noProxy != "" and self._noProxy is not whitespace and self._noProxy in "https://" + self.__ip:
-                proxies = {}
-                self._logger.info("Connecting without proxy because of no proxy: %s" % self._noProxy)
-            # RPB client defined proxy
-            else:
-                proxies = {"http": "http://" + self._proxyHost + ":" + self._proxyPort, "https": "https://" + self._proxyHost + ":" + self._proxyPort}
-                self._logger.info("Connecting with application defined proxy: %s" % str(proxies))
-        # Use system proxy
-        else:
-            proxies = requests.utils.get_environ_proxies("https://" + self.__ip)
-            self._logger.info("Using system proxy variables (no proxy applied): %s" % str(proxies))
+        }
 
-        r = s.put(url, auth=auth, verify=False, proxies=proxies)
+        r = self._newSession().put(self._url(method), headers=headers, auth=self._getAuth(), verify=False, proxies=self._getProxies())
 
         return r
 
     def _postPortalRequest(self, method, data, headers):
         """Generic POST request to RadPlanBio portal server
         """
-
         # Standard header
-        s = requests.Session()
-        s.headers.update(headers)
-        s.headers.update({
-            "X-Api-Key": self.__userDetails.apikey
-        })
-
-        # Proxy authentication
-        auth = None
-        if self._proxyAuthEnabled:
-            auth = HTTPBasicAuth(self._proxyAuthLogin, self._proxyAuthPassword)
-            self._logger.info("Connecting with authentication: %s" % str(self._proxyAuthLogin))
-
-        # Unicode for URL depends on python version
-        if sys.version < "3":
-            url = "%s://%s:%s%s%s" % (
-            self.__protocol, self.__ip, str(self.__port), self.__application, method.encode("utf-8"))
-        else:
-            url = "%s://%s:%s%s%s" % (self.__protocol, self.__ip, str(self.__port), self.__application, method)
-
-        # Application proxy enabled
-        if self._proxyEnabled:
-            # No proxy
-            if self._noProxy != "" and self._noProxy is not whitespace and self._noProxy in "https://" + self.__ip:
-                proxies = {}
-                self._logger.info("Connecting without proxy because of no proxy: %s" % self._noProxy)
-            # RPB client defined proxy
-            else:
-                proxies = {"http": "http://" + self._proxyHost + ":" + self._proxyPort,
-                           "https": "https://" + self._proxyHost + ":" + self._proxyPort}
-                self._logger.info("Connecting with application defined proxy: %s" % str(proxies))
-        # Use system proxy
-        else:
-            proxies = requests.utils.get_environ_proxies("https://" + self.__ip)
-            self._logger.info("Using system proxy variables (no proxy applied): %s" % str(proxies))
+        headers = dict(headers)
+        headers["X-Api-Key"] = self.__userDetails.apikey
 
-        r = s.post(url, data=data, auth=auth, verify=False, proxies=proxies)
+        r = self._newSession().post(self._url(method), data=data, headers=headers, auth=self._getAuth(), verify=False, proxies=self._getProxies())
 
         return r
 
@@ -1533,67 +1258,54 @@ class HttpConnectionService(object):
          # xml, html
         dataFormat = "json"
 
-        s = requests.Session()
-        loginCredentials = {"j_username": self.__userDetails.username.lower(), "j_password": self.__userDetails.clearpass}
-
-        auth = None
-        if self._proxyAuthEnabled:
-            auth = HTTPBasicAuth(self._proxyAuthLogin, self._proxyAuthPassword)
-            self._logger.info("Connecting with authentication: " + str(self._proxyAuthLogin))
-
         # Ensure that URL ends with /
         if not ocUrl.endswith("/"):
             ocUrl += "/"
 
-        # Application proxy enabled
-        if self._proxyEnabled:
-            if self._noProxy != "" and self._noProxy is not whitespace and self._noProxy in "https://" + self.__ip:
-                self._logger.info("Connecting without proxy because of no proxy: " + self._noProxy)
-                r = s.post(
-                    ocUrl + "j_spring_security_check",
-                    loginCredentials,
-                    auth=auth,
-                    verify=False,
-                    proxies={}
-                )
-                r = s.get(
-                    ocUrl + "rest/clinicaldata/" + dataFormat + "/view/" + method,
-                    auth=auth,
-                    verify=False,
-                    proxies={}
-                )
-            else:
-                proxies = {"http": "http://" + self._proxyHost + ":" + self._proxyPort, "https": "https://" + self._proxyHost + ":" + self._proxyPort}
-                self._logger.info("Connecting with application defined proxy: " + str(proxies))
-                r = s.post(
+        url = ocUrl + "rest/clinicaldata/" + dataFormat + "/view/" + method
+
+        s = self._ocSession(ocUrl)
+        r = s.get(url, auth=self._getAuth(), verify=False, proxies=self._getProxies())
+
+        # Login expired, login again and repeat the request
+        if self._ocLoginRequired(r):
+            self._logger.info("OpenClinica login expired, login again: " + ocUrl)
+            s = self._ocSession(ocUrl, s)
+            r = s.get(url, auth=self._getAuth(), verify=False, proxies=self._getProxies())
+
+        return r
+
+    def _ocSession(self, ocUrl, expiredSession=None):
+        """Authenticated OpenClinica session for ocUrl
+        Login is performed once and its cookies are reused by following requests.
+        expiredSession: session which login expired (it is replaced with new login)
+        """
+        username = self.__userDetails.username.lower()
+        key = (ocUrl, username)
+
+        with self._ocLock:
+            s = self._ocSessions.get(key)
+
+            # Other thread could have already replaced the expired session
+            if s is None or s is expiredSession:
+                s = self._newSession()
+                loginCredentials = {"j_username": username, "j_password": self.__userDetails.clearpass}
+                s.post(
                     ocUrl + "j_spring_security_check",
                     loginCredentials,
-                    auth=auth,
+                    auth=self._getAuth(),
                     verify=False,
-                    proxies=proxies
+                    proxies=self._getProxies()
                 )
-                r = s.get(
-                    ocUrl + "rest/clinicaldata/" + dataFormat + "/view/" + method,
-                    auth=auth,
-                    verify=False,
-                    proxies=proxies
-                )
-        # Use system proxy
-        else:
-            proxies = requests.utils.get_environ_proxies("https://" + self.__ip)
-            self._logger.info("Using system proxy variables (no proxy applied): " + str(proxies))
-            r = s.post(
-                ocUrl + "j_spring_security_check",
-                loginCredentials,
-                auth=auth,
-                verify=False,
-                proxies=proxies
-            )
-            r = s.get(
-                ocUrl + "rest/clinicaldata/" + dataFormat + "/view/" + method,
-                auth=auth,
-                verify=False,
-                proxies=proxies
-            )
+                self._ocSessions[key] = s
 
-        return r
+            return s
+
+    @staticmethod
+    def _ocLoginRequired(r):
+        """OpenClinica responded with unauthorised or redirect to login page
+        """
+        if r.status_code == 401:
+            return True
+
+        return len(r.history) > 0 and "login" in r.url.lower()
@@ -31,6 +31,7 @@ except ImportError:
 from domain.StudySubject import StudySubject
 from domain.Subject import Subject
 from domain.StudyEventDefinition import StudyEventDefinition
+from domain.StudyMetadataIndex import StudyMetadataIndex
 from domain.Event import Event
 
 STUDYSUBJECTNAMESPACE = "http://openclinica.org/ws/studySubject/v1"
@@ -403,27 +404,24 @@ class OCStudySubjectWsService:
         return result
 
     def loadEventsFromMetadata(self, metadata):
-        """Extract a list of Study Event domain objects according to ODM from metadata XML
+        """Extract a list of Study Event domain objects according to ODM from metadata (XML or StudyMetadataIndex)
         """
         studyEvents = []
 
         # Check if file path is setup
         if metadata:
 
-            documentTree = ET.ElementTree(ET.fromstring(str(metadata)))
+            if isinstance(metadata, StudyMetadataIndex):
+                metadataIndex = metadata
+            else:
+                metadataIndex = StudyMetadataIndex(metadata)
 
             # First obtain list of references (OIDs) to events defined in ODM -> Study -> MetaDataVersion -> Protocol
-            studyEventRefs = []
-
-            for studyEventRef in documentTree.iterfind('.//odm:StudyEventRef', namespaces=nsmaps):
-                studyEventRefs.append(studyEventRef.attrib['StudyEventOID'])
-                # # In case I need this information later
-                # print studyEventRef.attrib['Mandatory']
-                # print studyEventRef.attrib['OrderNumber']
+            studyEventRefs = metadataIndex.studyEventRefs()
 
             # Now for each study event reference find study event definition
             for eventRef in studyEventRefs:
-                for element in documentTree.iterfind('.//odm:StudyEventDef[@OID="' + eventRef + '"]', namespaces=nsmaps):
+                for element in metadataIndex.studyEventDefs(eventRef):
                     studyEvent = StudyEventDefinition()
 
                     studyEvent.setOid(element.attrib['OID'])
@@ -18,6 +18,7 @@ from domain.EventDefinitionCrf import EventDefinitionCrf
 from domain.Item import Item
 from domain.Study import Study
 from domain.StudyEventDefinition import StudyEventDefinition
+from domain.StudyMetadataIndex import StudyMetadataIndex
 from domain.StudyParameterConfiguration import StudyParameterConfiguration
 
 # Prefer C accelerated version of ElementTree for XML parsing
@@ -191,7 +192,7 @@ class OdmFileDataService(object):
         return eventCrfs
 
     def loadCrfItem(self, formOid, itemOid, metadata):
-        """Load CRF item details from ODM metadata
+        """Load CRF item details from ODM metadata (XML or StudyMetadataIndex)
         """
         item = None
 
@@ -200,10 +201,10 @@ class OdmFileDataService(object):
 
         # Check if file path is setup
         if metadata:
-            documentTree = ET.ElementTree((ET.fromstring(str(metadata))))
+            metadataIndex = self.getStudyMetadataIndex(metadata)
 
-            # Locate ItemDefs data in XML file via XPath
-            for itemElement in documentTree.iterfind('.//odm:ItemDef[@OID="' + itemOid + '"]', namespaces=nsmaps):
+            # Locate ItemDefs data in metadata
+            for itemElement in metadataIndex.itemDefs(itemOid):
                 # Check FormOID, normally I would do it in XPath but python does not support contains wildcard
                 if itemElement.attrib["{http://www.openclinica.org/ns/odm_ext_v130/v3.1}FormOIDs"].find(formOid) != -1:
                     item = Item()
@@ -223,6 +224,17 @@ class OdmFileDataService(object):
         # Return resulting CRT item
         return item
 
+    def getStudyMetadataIndex(self, metadata):
+        """Get parsed and indexed study metadata
+
+        Param metadata study metadata (XML or already created StudyMetadataIndex)
+        Return StudyMetadataIndex
+        """
+        if isinstance(metadata, StudyMetadataIndex):
+            return metadata
+        else:
+            return StudyMetadataIndex(metadata)
+
     def printData(self):
         """Print the content of file to the console
         """
@@ -318,18 +330,15 @@ class OdmFileDataService(object):
     def getItemOidFromMetadata(self, metadata, formOid, itemName):
         """Get item OID from metadata when form and itemName are known
 
-        Param metadata study metadata
+        Param metadata study metadata (XML or StudyMetadataIndex)
         Param formOid specify which form to search in metadata
         Param itemName specify which item to search
         Return string OID value of specified itemName from metadata or None
         """
-        documentTree = ET.ElementTree((ET.fromstring(str(metadata))))
-
-        itemOids = []
+        metadataIndex = self.getStudyMetadataIndex(metadata)
 
-        # Locate ItemDefs data in XML file via XPath
-        for item in documentTree.iterfind('.//odm:ItemDef[@OpenClinica:FormOIDs="' + formOid + '"]' + '[@Name="' + itemName + '"]', namespaces=nsmaps):
-            itemOids.append(item.attrib['OID'])
+        # Locate ItemDefs in metadata
+        itemOids = metadataIndex.itemOids(formOid, itemName)
 
         if len(itemOids) == 1:
             return itemOids[0]
@@ -338,43 +347,27 @@ class OdmFileDataService(object):
 
     def getItemGroupOidFromMetadata(self, metadata, itemOid):
         """
-        Param metadata study metadata
+        Param metadata study metadata (XML or StudyMetadataIndex)
         Param itemOid specifies the oid of item which group we are searching
         Return string OID value of found ItemGroupDef or None
         """
-        documentTree = ET.ElementTree((ET.fromstring(str(metadata))))
-
-        itemGroupOids = []
+        metadataIndex = self.getStudyMetadataIndex(metadata)
 
-        groupFound = False
-        # Locate ItemGroupDefs data in XML file via XPath
-        for group in documentTree.iterfind('.//odm:ItemGroupDef', namespaces=nsmaps):
-            for element in group:
-                if (str(element.tag)).strip() == "{http://www.cdisc.org/ns/odm/v1.3}ItemRef":
-                    if element.attrib['ItemOID'] == itemOid:
-                        itemGroupOids.append(group.attrib['OID'])
-                        groupFound = True
-                        break
-
-            if groupFound:
-                break
-
-        if len(itemGroupOids) == 1:
-            return itemGroupOids[0]
-        else:
-            return None
+        # The first ItemGroupDef referencing the item
+        return metadataIndex.itemGroupOid(itemOid)
 
     def getStudyParameterConfigurationFromMetadata(self, metadata):
         """
-        Param metadata study metadata
+        Param metadata study metadata (XML or StudyMetadataIndex)
         Return StudyParameterConfiguration
         """
 
         studyParameterConfiguration = None
-        documentTree = ET.ElementTree((ET.fromstring(str(metadata))))
+        metadataIndex = self.getStudyMetadataIndex(metadata)
 
-        # Locate EDC StudyParameterConfiguration element in XML file via XPath
-        for configuration in documentTree.iterfind('.//OpenClinica:StudyParameterConfiguration', namespaces=nsmaps):
+        # Locate EDC StudyParameterConfiguration element in metadata
+        configuration = metadataIndex.studyParameterConfiguration()
+        if configuration is not None:
 
             studyParameterConfiguration = StudyParameterConfiguration()
 
@@ -399,8 +392,6 @@ class OdmFileDataService(object):
                         elif parameter.attrib['Value'] == "false":
                             studyParameterConfiguration.sexRequired = False
 
-            break
-
         self.logger.info("Study configuration - CollectSubjectDOB: " + studyParameterConfiguration.collectSubjectDob)
         self.logger.info("Study configuration - SexRequired: " + str(studyParameterConfiguration.sexRequired))
 
@@ -0,0 +1,112 @@
+import sys, os, json, time
+
+sys.path.insert(0, os.path.abspath("./../"))
+
+from domain.Crf import Crf
+from domain.Event import Event
+from services.HttpConnectionService import HttpConnectionService
+
+# Synthetic casebook parameters
+NUMBER_OF_EVENT_DEFINITIONS = 100
+FORMS_PER_EVENT_DEFINITION = 5
+NUMBER_OF_EVENTS = 500
+
+
+def createSyntheticCasebook():
+    """ODM JSON of one subject casebook with repeated events
+    """
+    eventDefinitions = []
+    formDefinitions = []
+    for e in range(NUMBER_OF_EVENT_DEFINITIONS):
+        formRefs = []
+        for f in range(FORMS_PER_EVENT_DEFINITION):
+            formOid = "F_%d_%d" % (e, f)
+            formRefs.append({"@FormOID": formOid})
+            formDefinitions.append({
+                "@OID": formOid,
+                "OpenClinica:FormDetails": {
+                    "OpenClinica:PresentInEventDefinition": [
+                        {"@StudyEventOID": "SE_%d" % e, "@IsDefaultVersion": "Yes", "@HideCRF": "No"},
+                        {"@StudyEventOID": "SE_%d" % ((e + 1) % NUMBER_OF_EVENT_DEFINITIONS), "@IsDefaultVersion": "No", "@HideCRF": "No"}
+                    ]
+                }
+            })
+        eventDefinitions.append({"@OID": "SE_%d" % e, "FormRef": formRefs})
+
+    events = []
+    for i in range(NUMBER_OF_EVENTS):
+        e = i % NUMBER_OF_EVENT_DEFINITIONS
+        events.append({
+            "@StudyEventOID": "SE_%d" % e,
+            "@OpenClinica:Status": "data entry started",
+            "@OpenClinica:StartDate": "01-Jan-2015",
+            "@StudyEventRepeatKey": str(i // NUMBER_OF_EVENT_DEFINITIONS + 1),
+            "FormData": {"@FormOID": "F_%d_0" % e, "@OpenClinica:Version": "v1.0", "@OpenClinica:Status": "initial data entry"}
+        })
+
+    return json.dumps({
+        "Study": {"MetaDataVersion": {"StudyEventDef": eventDefinitions, "FormDef": formDefinitions}},
+        "ClinicalData": {"SubjectData": {"@SubjectKey": "SS_1", "StudyEventData": events}}
+    })
+
+
+def scheduleByDefinitionWalk(content):
+    """Events with default eCRFs by parsing the response and walking all definitions for each event
+    """
+    results = []
+    for ed in json.loads(content)["ClinicalData"]["SubjectData"]["StudyEventData"]:
+        event = Event()
+        event.eventDefinitionOID = ed["@StudyEventOID"]
+
+        crf = Crf()
+        crf.oid = ed["FormData"]["@FormOID"]
+        event.addCrf(crf)
+
+        eventFormOids = []
+        for sed in json.loads(content)["Study"]["MetaDataVersion"]["StudyEventDef"]:
+            for fr in sed["FormRef"]:
+                eventFormOids.append(fr["@FormOID"])
+
+        for fd in json.loads(content)["Study"]["MetaDataVersion"]["FormDef"]:
+            if fd["@OID"] in eventFormOids and not event.hasScheduledCrf(fd["@OID"]):
+                for pied in fd["OpenClinica:FormDetails"]["OpenClinica:PresentInEventDefinition"]:
+                    if pied["@IsDefaultVersion"] == "Yes" and pied["@StudyEventOID"] == event.eventDefinitionOID:
+                        crf = Crf()
+                        crf.oid = fd["@OID"]
+                        event.addCrf(crf)
+                        break
+
+        results.append(event)
+
+    return results
+
+
+def main():
+    """Compare casebook events loading with definition walk per event and indexed definitions
+    """
+    content = createSyntheticCasebook()
+    svc = HttpConnectionService("https", "localhost", 443, None)
+
+    start = time.time()
+    walkEvents = scheduleByDefinitionWalk(content)
+    walkElapsed = time.time() - start
+
+    start = time.time()
+    odm = json.loads(content)
+    indexedEvents = svc._parseCasebookEvents(
+        odm["Study"]["MetaDataVersion"],
+        odm["ClinicalData"]["SubjectData"]["StudyEventData"],
+        True
+    )
+    indexedElapsed = time.time() - start
+
+    walkForms = sum(len(e.forms) for e in walkEvents)
+    indexedForms = sum(len(e.forms) for e in indexedEvents)
+
+    print("%d events, %d event definitions, %d form definitions" % (NUMBER_OF_EVENTS, NUMBER_OF_EVENT_DEFINITIONS, NUMBER_OF_EVENT_DEFINITIONS * FORMS_PER_EVENT_DEFINITION))
+    print("Definition walk: %8.3f s (%d eCRFs)" % (walkElapsed, walkForms))
+    print("Indexed:         %8.3f s (%d eCRFs)" % (indexedElapsed, indexedForms))
+
+
+if __name__ == '__main__':
+    main()
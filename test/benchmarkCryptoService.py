@@ -0,0 +1,51 @@
+import sys, os, shutil, tempfile, time
+
+sys.path.insert(0, os.path.abspath("./../"))
+
+from services.CryptoService import CryptoService
+
+# Synthetic payload parameters (size of serialized Modified Attributes Sequence)
+NUMBER_OF_PAYLOADS = 10000
+PAYLOAD_SIZE = 300
+
+
+def report(name, elapsed, count=NUMBER_OF_PAYLOADS, size=PAYLOAD_SIZE):
+    """Print throughput
+    """
+    print("%-28s %10.0f payloads/s %8.2f MB/s" % (name, count / elapsed, count * size / elapsed / 1e6))
+
+
+def main():
+    """Compare per call AES-CBC with base64, binary tokens and batched encryption
+    """
+    directory = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        # Encryption key of the service is created in working directory
+        os.chdir(directory)
+        svc = CryptoService()
+
+        payloads = [os.urandom(PAYLOAD_SIZE) for i in range(NUMBER_OF_PAYLOADS)]
+
+        start = time.time()
+        for raw in payloads:
+            svc.encrypt(raw)
+        report("encrypt (CBC, base64)", time.time() - start)
+
+        start = time.time()
+        for raw in payloads:
+            svc.encryptBytes(raw)
+        report("encryptBytes", time.time() - start)
+
+        start = time.time()
+        tokens = svc.encryptBatch(payloads)
+        report("encryptBatch", time.time() - start)
+
+        print("Token version: %r, overhead %d bytes" % (tokens[0][:1], len(tokens[0]) - PAYLOAD_SIZE))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
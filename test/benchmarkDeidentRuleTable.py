@@ -0,0 +1,158 @@
+import sys, os, shutil, tempfile, time
+
+sys.path.insert(0, os.path.abspath("./../"))
+
+# DICOM
+if sys.version < "3":
+    from dicom.dataset import Dataset
+    from dicom.sequence import Sequence
+else:
+    from pydicom.dataset import Dataset
+    from pydicom.sequence import Sequence
+
+from dcm.DicomPatient import DicomPatient
+from dicomdeident.DeidentRuleTable import DeidentRuleTable
+from services.AnonymisationService import AnonymisationService
+
+# Synthetic RTSTRUCT parameters
+NUMBER_OF_ROIS = 50
+CONTOURS_PER_ROI = 100
+POINTS_PER_CONTOUR = 64
+UID_ROOT = "1.2.826.0.1.3680043.2.1125.1."
+
+
+def createSyntheticStructureSet(rois=NUMBER_OF_ROIS, contours=CONTOURS_PER_ROI):
+    """RTSTRUCT dataset with contours referencing CT slices
+    """
+    ds = Dataset()
+    ds.SOPClassUID = "1.2.840.10008.5.1.4.1.1.481.3"
+    ds.SOPInstanceUID = UID_ROOT + "5"
+    ds.PatientID = "BENCHMARK"
+    ds.PatientName = "Benchmark^Patient"
+    ds.PatientBirthDate = "19700101"
+    ds.StudyInstanceUID = UID_ROOT + "1"
+    ds.SeriesInstanceUID = UID_ROOT + "6"
+    ds.StudyDate = "20150101"
+    ds.StationName = "BENCHMARK"
+    ds.Modality = "RTSTRUCT"
+    ds.StructureSetLabel = "Benchmark"
+
+    roiSequence = Sequence()
+    contourSequence = Sequence()
+    observationSequence = Sequence()
+    for r in range(rois):
+        roi = Dataset()
+        roi.ROINumber = r + 1
+        roi.ReferencedFrameOfReferenceUID = UID_ROOT + "4"
+        roi.ROIName = "ROI" + str(r + 1)
+        roi.ROIGenerationAlgorithm = "MANUAL"
+        roiSequence.append(roi)
+
+        roiContour = Dataset()
+        roiContour.ReferencedROINumber = r + 1
+        roiContour.ROIDisplayColor = [255, 0, 0]
+        roiContour.ContourSequence = Sequence()
+        for c in range(contours):
+            contourImage = Dataset()
+            contourImage.ReferencedSOPClassUID = "1.2.840.10008.5.1.4.1.1.2"
+            contourImage.ReferencedSOPInstanceUID = UID_ROOT + "3." + str(c + 1)
+
+            contour = Dataset()
+            contour.ContourImageSequence = Sequence([contourImage])
+            contour.ContourGeometricType = "CLOSED_PLANAR"
+            contour.NumberOfContourPoints = POINTS_PER_CONTOUR
+            contour.ContourData = [float(c)] * (POINTS_PER_CONTOUR * 3)
+            roiContour.ContourSequence.append(contour)
+        contourSequence.append(roiContour)
+
+        observation = Dataset()
+        observation.ObservationNumber = r + 1
+        observation.ReferencedROINumber = r + 1
+        observation.RTROIInterpretedType = "ORGAN"
+        observation.ROIInterpreter = "Benchmark^Observer"
+        observationSequence.append(observation)
+
+    ds.StructureSetROISequence = roiSequence
+    ds.ROIContourSequence = contourSequence
+    ds.RTROIObservationsSequence = observationSequence
+
+    return ds
+
+
+def decideByNames(svc, dataset, counter):
+    """Rule decision of the element by name lists and iteration of option attributes
+    """
+    for element in dataset:
+        counter[0] += 1
+
+        applied = False
+        for option in svc._options:
+            for attribute in option.Attributes:
+                if (str(attribute)).lower() == (str(element.tag)).lower():
+                    applied = True
+                    break
+            if applied:
+                break
+
+        if applied:
+            continue
+        elif element.name in svc.li_NameRemove:
+            continue
+        elif element.name in svc.li_NameReplace:
+            continue
+        elif element.VR == "SQ":
+            for sequence in element.value:
+                decideByNames(svc, sequence, counter)
+
+
+def decideByRuleTable(table, dataset, counter):
+    """Rule decision of the element by one lookup in compiled rule table
+    """
+    for element in dataset:
+        counter[0] += 1
+
+        action, optionAction = table.rule(element)
+        if action == DeidentRuleTable.KEEP and element.VR == "SQ":
+            for sequence in element.value:
+                decideByRuleTable(table, sequence, counter)
+
+
+def main():
+    """Compare elements/second of name list rules and compiled rule table
+    """
+    directory = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        # Encryption key of the service is created in working directory
+        os.chdir(directory)
+
+        patient = DicomPatient()
+        patient.newName = "Benchmark"
+        svc = AnonymisationService(directory, patient, None, {})
+
+        ds = createSyntheticStructureSet()
+
+        counter = [0]
+        start = time.time()
+        decideByNames(svc, ds, counter)
+        namesElapsed = time.time() - start
+
+        start = time.time()
+        table = DeidentRuleTable(svc._deidentConfig, svc.li_NameRemove, svc.li_NameReplace, svc._options)
+        compileElapsed = time.time() - start
+
+        tableCounter = [0]
+        start = time.time()
+        decideByRuleTable(table, ds, tableCounter)
+        tableElapsed = time.time() - start
+
+        print("%d elements of RTSTRUCT (%d ROIs, %d contours per ROI)" % (counter[0], NUMBER_OF_ROIS, CONTOURS_PER_ROI))
+        print("Name lists:  %10.0f elements/s" % (counter[0] / namesElapsed))
+        print("Rule table:  %10.0f elements/s (compiled in %.4f s)" % (tableCounter[0] / tableElapsed, compileElapsed))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import sys, os, shutil, tempfile, time
+
+sys.path.insert(0, os.path.abspath("./../"))
+
+# DICOM
+if sys.version < "3":
+    from dicom.dataset import Dataset, FileDataset
+else:
+    from pydicom.dataset import Dataset, FileDataset
+
+from services.DicomDirectoryService import DicomDirectoryService
+
+# Synthetic study parameters
+NUMBER_OF_SLICES = 200
+ROWS = 512
+COLUMNS = 512
+UID_ROOT = "1.2.826.0.1.3680043.2.1125.1."
+
+
+def createSyntheticStudy(directory, slices=NUMBER_OF_SLICES):
+    """Write CT series with pixel data of realistic size into directory
+    """
+    pixelData = b"\0" * (ROWS * COLUMNS * 2)
+
+    for i in range(slices):
+        fileMeta = Dataset()
+        fileMeta.MediaStorageSOPClassUID = "1.2.840.10008.5.1.4.1.1.2"
+        fileMeta.MediaStorageSOPInstanceUID = UID_ROOT + "3." + str(i + 1)
+        fileMeta.TransferSyntaxUID = "1.2.840.10008.1.2.1"
+
+        filename = os.path.join(directory, "CT_%04d.dcm" % i)
+        ds = FileDataset(filename, {}, file_meta=fileMeta, preamble=b"\0" * 128)
+        ds.is_little_endian = True
+        ds.is_implicit_VR = False
+
+        ds.SOPClassUID = fileMeta.MediaStorageSOPClassUID
+        ds.SOPInstanceUID = fileMeta.MediaStorageSOPInstanceUID
+        ds.PatientID = "BENCHMARK"
+        ds.PatientName = "Benchmark^Patient"
+        ds.PatientBirthDate = "19700101"
+        ds.PatientSex = "O"
+        ds.StudyInstanceUID = UID_ROOT + "1"
+        ds.SeriesInstanceUID = UID_ROOT + "2"
+        ds.FrameOfReferenceUID = UID_ROOT + "4"
+        ds.StudyDescription = "Benchmark study"
+        ds.Modality = "CT"
+        ds.InstanceNumber = i + 1
+        ds.Rows = ROWS
+        ds.Columns = COLUMNS
+        ds.BitsAllocated = 16
+        ds.BitsStored = 16
+        ds.HighBit = 15
+        ds.PixelRepresentation = 1
+        ds.SamplesPerPixel = 1
+        ds.PhotometricInterpretation = "MONOCHROME2"
+        ds.PixelData = pixelData
+
+        ds.save_as(filename)
+
+
+def measure(directory, headerOnly):
+    """Scan the directory and return the number of files per second
+    """
+    svc = DicomDirectoryService(directory, headerOnly=headerOnly)
+
+    start = time.time()
+    svc.setup()
+    elapsed = time.time() - start
+
+    return svc.descriptorSize / elapsed
+
+
+def main():
+    """Compare full file reading with header only scanning
+    """
+    directory = tempfile.mkdtemp()
+    try:
+        createSyntheticStudy(directory)
+
+        # Warm up OS file cache so that both runs read from memory
+        measure(directory, True)
+
+        print("Full read:   %8.1f files/s" % measure(directory, False))
+        print("Header only: %8.1f files/s" % measure(directory, True))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
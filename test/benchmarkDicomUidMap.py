@@ -0,0 +1,61 @@
+import sys, os, time
+
+sys.path.insert(0, os.path.abspath("./../"))
+
+from dcm.DicomUidMap import DicomUidMap
+
+# Synthetic study parameters
+NUMBER_OF_INSTANCES = 5000
+UID_ELEMENTS_PER_INSTANCE = 6
+UID_ROOT = "1.2.826.0.1.3680043.2.1125.1."
+
+
+def createSyntheticUids(instances=NUMBER_OF_INSTANCES):
+    """Original and pseudonymised UIDs of study with one series
+    """
+    originals = [UID_ROOT + "3." + str(i + 1) for i in range(instances)]
+    originals += [UID_ROOT + "1", UID_ROOT + "2", UID_ROOT + "4"]
+    originals.sort()
+
+    pseudonymised = ["2.25." + str(10 ** 40 + i) for i in range(len(originals))]
+
+    return originals, pseudonymised
+
+
+def lookups(originals, instances=NUMBER_OF_INSTANCES):
+    """UID values resolved while rewriting the study (SOP instance UID and shared study level UIDs)
+    """
+    result = []
+    for i in range(instances):
+        result.append(UID_ROOT + "3." + str(i + 1))
+        for j in range(UID_ELEMENTS_PER_INSTANCE - 1):
+            result.append(originals[j % 3])
+
+    return result
+
+
+def main():
+    """Compare parallel lists with linear index lookup to dictionary based UID map
+    """
+    originals, pseudonymised = createSyntheticUids()
+    values = lookups(originals)
+
+    start = time.time()
+    for value in values:
+        pseudonymised[originals.index(value)]
+    listElapsed = time.time() - start
+
+    uidMap = DicomUidMap(zip(originals, pseudonymised))
+
+    start = time.time()
+    for value in values:
+        uidMap[value]
+    mapElapsed = time.time() - start
+
+    print("%d lookups over %d UIDs" % (len(values), len(originals)))
+    print("Parallel lists: %10.4f s" % listElapsed)
+    print("UID map:        %10.4f s" % mapElapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import sys, os, shutil, tempfile, time
+
+sys.path.insert(0, os.path.abspath("./../"))
+
+# DICOM
+if sys.version < "3":
+    from dicom.dataset import Dataset
+else:
+    from pydicom.dataset import Dataset
+
+from contexts.ConfigDetails import ConfigDetails
+from dcm.DicomPatient import DicomPatient
+from services.AnonymisationService import AnonymisationService
+
+# Synthetic study parameters
+NUMBER_OF_INSTANCES = 1000
+UID_ROOT = "1.2.826.0.1.3680043.2.1125.1."
+
+
+def createSyntheticInstance(i):
+    """CT instance header with identity attributes
+    """
+    ds = Dataset()
+    ds.file_meta = Dataset()
+    ds.file_meta.TransferSyntaxUID = "1.2.840.10008.1.2.1"
+
+    ds.SOPInstanceUID = UID_ROOT + "3." + str(i + 1)
+    ds.PatientID = "BENCHMARK"
+    ds.PatientName = "Benchmark^Patient"
+    ds.PatientBirthDate = "19700101"
+    ds.StudyInstanceUID = UID_ROOT + "1"
+    ds.FrameOfReferenceUID = UID_ROOT + "4"
+
+    return ds
+
+
+def measure(svc, compact, studyIdentity=False, instances=NUMBER_OF_INSTANCES):
+    """Store identity of instances and return (bytes of encrypted content per instance, seconds)
+    """
+    ConfigDetails().compactIdentityEncoding = compact
+    datasets = [createSyntheticInstance(i) for i in range(instances)]
+
+    svc._studyIdentity = None
+    if studyIdentity:
+        svc._studyIdentity = Dataset()
+        for tag in svc._studyIdentityTags:
+            svc._studyIdentity[tag] = datasets[0][tag]
+
+    start = time.time()
+    for i, ds in enumerate(datasets):
+        svc._storeIdentity(ds, i == 0)
+    elapsed = time.time() - start
+
+    size = 0
+    for ds in datasets:
+        for item in ds.EncryptedAttributesSequence:
+            size += len(item.EncryptedContent)
+
+    return size / float(instances), elapsed
+
+
+def main():
+    """Compare pickled/base64 and compact binary encoding of Encrypted Attributes Sequence
+    and compact encoding with study identity record
+    """
+    directory = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    try:
+        # Encryption key of the service is created in working directory
+        os.chdir(directory)
+
+        patient = DicomPatient()
+        patient.newName = "Benchmark"
+        svc = AnonymisationService(directory, patient, None, {})
+
+        pickledSize, pickledElapsed = measure(svc, False)
+        compactSize, compactElapsed = measure(svc, True)
+        studySize, studyElapsed = measure(svc, True, True)
+
+        print("%d instances" % NUMBER_OF_INSTANCES)
+        print("Pickled: %8.0f bytes %10.1f us per instance" % (pickledSize, pickledElapsed * 1e6 / NUMBER_OF_INSTANCES))
+        print("Compact: %8.0f bytes %10.1f us per instance" % (compactSize, compactElapsed * 1e6 / NUMBER_OF_INSTANCES))
+        print("Study:   %8.0f bytes %10.1f us per instance" % (studySize, studyElapsed * 1e6 / NUMBER_OF_INSTANCES))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
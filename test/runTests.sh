@@ -1,2 +1,2 @@
-nosetests --tests=testOdmFileDataService.py,testCsvFileDataService.py,testDateConverter.py,testFloatConverter.py --with-xunit
+nosetests --tests=testOdmFileDataService.py,testCsvFileDataService.py,testDateConverter.py,testFloatConverter.py,testDicomDescriptorCacheService.py,testDicomDescriptorStore.py,testDicomUidMap.py,testMultipartFileStream.py,testDataPersistanceService.py,testStudyMetadataIndex.py,testDicomTagPathExtractor.py --with-xunit
 
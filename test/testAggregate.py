@@ -4,12 +4,26 @@ import testCsvFileDataService
 import testDateConverter
 import testFloatConverter
 import testOdmFileDataService
+import testDicomDescriptorCacheService
+import testDicomDescriptorStore
+import testDicomUidMap
+import testMultipartFileStream
+import testDataPersistanceService
+import testStudyMetadataIndex
+import testDicomTagPathExtractor
 #import testTransformationService
 
 suite1 = testCsvFileDataService.suite()
 suite2 = testOdmFileDataService.suite()
 suite3 = testDateConverter.suite()
 suite4 = testFloatConverter.suite()
+suite6 = testDicomDescriptorCacheService.suite()
+suite7 = testDicomDescriptorStore.suite()
+suite8 = testDicomUidMap.suite()
+suite9 = testMultipartFileStream.suite()
+suite10 = testDataPersistanceService.suite()
+suite11 = testStudyMetadataIndex.suite()
+suite12 = testDicomTagPathExtractor.suite()
 #suite5 = testTransformationService.suit()
 
 suite = unittest.TestSuite()
@@ -17,6 +31,13 @@ suite.addTest(suite1)
 suite.addTest(suite2)
 suite.addTest(suite3)
 suite.addTest(suite4)
+suite.addTest(suite6)
+suite.addTest(suite7)
+suite.addTest(suite8)
+suite.addTest(suite9)
+suite.addTest(suite10)
+suite.addTest(suite11)
+suite.addTest(suite12)
 #suite.addTest(suite5)
 
 unittest.TextTestRunner(verbosity=2).run(suite)
@@ -1,10 +1,34 @@
-import sys, os, tempfile
+import sys, os, errno, shutil, tempfile
 import unittest
 
 sys.path.insert(0,os.path.abspath("./../"))
 
+if sys.version < "3":
+    import dicom
+
+    from dicom.dataset import Dataset, FileDataset
+else:
+    from pydicom import dicomio as dicom
+
+    from pydicom.dataset import Dataset, FileDataset
+
+from contexts.ConfigDetails import ConfigDetails
+from dcm.DicomPatient import DicomPatient
 from services.AnonymisationService import AnonymisationService
 
+
+class Node(object):
+    """Selected node of DICOM data tree (study or series)
+    """
+    def __init__(self, suid, children=None, files=None, modality="CT"):
+        self.suid = suid
+        self.children = children or []
+        self.files = files or []
+        self.modality = modality
+        self.sopInstanceUid = None
+        self.newDescription = ""
+        self.isChecked = True
+
 class TestAnonymisationService(unittest.TestCase):
     """
     """
@@ -35,11 +59,159 @@ class TestAnonymisationService(unittest.TestCase):
         patientID, anonymisedSeriesID = svc.makeAnonymous()
 
 
+class TestAnonymisationServicePool(unittest.TestCase):
+    """
+    """
+    def setUp(self):
+        """Set up data used in the tests.
+        setUp is called before each test function execution.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.destination = tempfile.mkdtemp()
+
+        self.studyUid = "1.2.826.0.1.3680043.2.1125.1"
+        self.seriesUid = "1.2.826.0.1.3680043.2.1125.2"
+
+        files = []
+        for i in range(4):
+            files.append(self._writeDicomFile(i))
+
+        series = Node(self.seriesUid, files=files)
+        study = Node(self.studyUid, children=[series])
+        self.dicomDataRoot = Node(None, children=[study])
+
+        self.processes = ConfigDetails().deidentProcesses
+        self.uidStrategy = ConfigDetails().uidStrategy
+
+    def tearDown(self):
+        """Clean up after each test function execution.
+        """
+        ConfigDetails().deidentProcesses = self.processes
+        ConfigDetails().uidStrategy = self.uidStrategy
+
+        shutil.rmtree(self.folder)
+        shutil.rmtree(self.destination)
+
+    def _writeDicomFile(self, number):
+        """Write CT instance of the test series
+        """
+        sopInstanceUid = "1.2.826.0.1.3680043.2.1125.3.%d" % number
+
+        fileMeta = Dataset()
+        fileMeta.MediaStorageSOPClassUID = "1.2.840.10008.5.1.4.1.1.2"
+        fileMeta.MediaStorageSOPInstanceUID = sopInstanceUid
+        fileMeta.TransferSyntaxUID = "1.2.840.10008.1.2"
+
+        filename = os.path.join(self.folder, "CT%d.dcm" % number)
+        ds = FileDataset(filename, {}, file_meta=fileMeta, preamble=b"\0" * 128)
+        ds.SOPClassUID = fileMeta.MediaStorageSOPClassUID
+        ds.SOPInstanceUID = sopInstanceUid
+        ds.StudyInstanceUID = self.studyUid
+        ds.SeriesInstanceUID = self.seriesUid
+        ds.FrameOfReferenceUID = "1.2.826.0.1.3680043.2.1125.4"
+        ds.Modality = "CT"
+        ds.PatientID = "PID"
+        ds.PatientsName = "Patient^Name"
+        ds.is_little_endian = True
+        ds.is_implicit_VR = True
+        ds.save_as(filename)
+
+        return filename
+
+    def test_pooled_hmac_anonymisation_maps_series_uid(self):
+        """
+        """
+        ConfigDetails().deidentProcesses = 2
+        ConfigDetails().uidStrategy = "hmac"
+
+        patient = DicomPatient()
+        patient.newName = "Pseudonym"
+
+        svc = AnonymisationService(self.destination, patient, self.dicomDataRoot, {})
+        svc.PatientID = "XXX"
+        svc.makeAnonymous()
+
+        seriesUids = set()
+        for filename in os.listdir(self.destination):
+            seriesUids.add(dicom.read_file(os.path.join(self.destination, filename)).SeriesInstanceUID)
+
+        self.assertEqual(4, len(os.listdir(self.destination)))
+        self.assertEqual(set([svc.uidMap[self.seriesUid]]), seriesUids)
+        self.assertNotEqual(self.seriesUid, svc.uidMap[self.seriesUid])
+
+
+class TestAnonymisationServiceCopyFileRange(unittest.TestCase):
+    """
+    """
+    def setUp(self):
+        """Set up data used in the tests.
+        setUp is called before each test function execution.
+        """
+        self.folder = tempfile.mkdtemp()
+
+        self.source = os.path.join(self.folder, "source.dcm")
+        self.content = os.urandom(10000)
+        with open(self.source, "wb") as f:
+            f.write(self.content)
+
+        self.destination = os.path.join(self.folder, "destination.dcm")
+        with open(self.destination, "wb") as f:
+            f.write(b"HEADER")
+
+        patient = DicomPatient()
+        patient.newName = "Pseudonym"
+
+        self.svc = AnonymisationService(self.folder, patient, None, {})
+        # Several buffered reads for the copied range
+        self.svc._copyBufferSize = 1000
+
+    def tearDown(self):
+        """Clean up after each test function execution.
+        """
+        shutil.rmtree(self.folder)
+
+    def _destinationContent(self):
+        """
+        """
+        with open(self.destination, "rb") as f:
+            return f.read()
+
+    def test_range_is_appended_with_sendfile(self):
+        """
+        """
+        if not hasattr(os, "sendfile"):
+            self.skipTest("os.sendfile is not available")
+
+        self.svc._copyFileRange(self.source, self.destination, (132, 9500))
+
+        self.assertEqual(b"HEADER" + self.content[132:9500], self._destinationContent())
+
+    def test_range_is_appended_with_buffered_copy(self):
+        """
+        """
+        def unsupportedSendfile(*args):
+            raise OSError(errno.EINVAL, "Invalid argument")
+
+        sendfile = getattr(os, "sendfile", None)
+        os.sendfile = unsupportedSendfile
+        try:
+            self.svc._copyFileRange(self.source, self.destination, (132, 9500))
+        finally:
+            if sendfile is not None:
+                os.sendfile = sendfile
+            else:
+                del os.sendfile
+
+        self.assertEqual(b"HEADER" + self.content[132:9500], self._destinationContent())
+
+
 def suite():
     """
     """
     suite = unittest.TestSuite()
     suite.addTest(unittest.makeSuite(TestAnonymisationService))
+    suite.addTest(unittest.makeSuite(TestAnonymisationServicePool))
+    suite.addTest(unittest.makeSuite(TestAnonymisationServiceCopyFileRange))
 
     return suite
 
@@ -0,0 +1,211 @@
+import sys, os
+import logging
+import unittest
+
+sys.path.insert(0, os.path.abspath("./../"))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from contexts.ConfigDetails import ConfigDetails
+from services.DataPersistanceService import DataPersistanceService
+
+
+class RecordingHandler(logging.Handler):
+    """Logging handler which keeps the emitted messages
+    """
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+# Subset of OpenClinica schema used by eCRF item value queries
+OC_SCHEMA = [
+    "create table study (study_id integer primary key, oc_oid varchar)",
+    "create table subject (subject_id integer primary key, date_of_birth date, gender varchar, unique_identifier varchar)",
+    "create table study_subject (study_subject_id integer primary key, study_id integer, subject_id integer, label varchar)",
+    "create table study_event_definition (study_event_definition_id integer primary key, oc_oid varchar, name varchar, description varchar, ordinal integer)",
+    "create table study_event (study_event_id integer primary key, study_subject_id integer, study_event_definition_id integer, sample_ordinal integer)",
+    "create table crf (crf_id integer primary key, name varchar)",
+    "create table crf_version (crf_version_id integer primary key, crf_id integer, oc_oid varchar, name varchar)",
+    "create table event_crf (event_crf_id integer primary key, study_event_id integer, crf_version_id integer)",
+    "create table event_definition_crf (event_definition_crf_id integer primary key, crf_id integer, study_event_definition_id integer, ordinal integer)",
+    "create table item (item_id integer primary key, oc_oid varchar, name varchar, description varchar)",
+    "create table item_form_metadata (item_form_metadata_id integer primary key, crf_version_id integer, item_id integer, ordinal integer, show_item boolean, response_set_id integer)",
+    "create table item_data (item_data_id integer primary key, event_crf_id integer, item_id integer, ordinal integer, value varchar)"
+]
+
+OC_DATA = [
+    "insert into study values (1, 'S_SITE')",
+    "insert into subject values (1, null, 'm', 'PID1')",
+    "insert into study_subject values (1, 1, 1, 'SS1')",
+    "insert into study_event_definition values (1, 'SE_TREATMENT', 'Treatment', '', 1)",
+    "insert into study_event values (1, 1, 1, 1)",
+    "insert into study_event values (2, 1, 1, 2)",
+    "insert into crf values (1, 'DICOM')",
+    "insert into crf_version values (1, 1, 'F_DICOM_V10', 'v1.0')",
+    "insert into event_crf values (1, 1, 1)",
+    "insert into event_crf values (2, 2, 1)",
+    "insert into event_definition_crf values (1, 1, 1, 1)",
+    "insert into item values (1, 'I_DICOM_CT', 'CT', '')",
+    "insert into item values (2, 'I_DICOM_RTSTRUCT', 'RTSTRUCT', '')",
+    "insert into item values (3, 'I_DICOM_RTPLAN', 'RTPLAN', '')",
+    "insert into item_form_metadata values (1, 1, 1, 1, 1, null)",
+    "insert into item_form_metadata values (2, 1, 2, 2, 1, null)",
+    "insert into item_form_metadata values (3, 1, 3, 3, 1, null)",
+    "insert into item_data values (1, 1, 1, 1, '1.2.3.1')",
+    "insert into item_data values (2, 1, 2, 1, '1.2.3.2')",
+    "insert into item_data values (3, 2, 1, 1, '1.2.3.9')"
+]
+
+
+class TestDataPersistanceService(unittest.TestCase):
+    """
+    """
+    def setUp(self):
+        """Set up data used in the tests.
+        setUp is called before each test function execution.
+        """
+        self.engine = create_engine("sqlite://")
+        for statement in OC_SCHEMA + OC_DATA:
+            self.engine.execute(statement)
+
+        self.session = sessionmaker(bind=self.engine)()
+
+        # OpenClinica queries only use the provided session (RadPlanBio database is never connected)
+        self.svc = DataPersistanceService("user", "password", "radplanbio", "localhost", "5432")
+
+    def tearDown(self):
+        """
+        """
+        self.session.close()
+        self.engine.dispose()
+
+    def test_batch_values_are_in_order_of_items(self):
+        """
+        """
+        values = self.svc.getCrfItemValuesV2(
+            self.session, "S_SITE", "PID1", "SE_TREATMENT", "1",
+            [("F_DICOM_V10", "I_DICOM_RTSTRUCT"), ("F_DICOM_V10", "I_DICOM_CT")]
+        )
+
+        self.assertEqual(["1.2.3.2", "1.2.3.1"], values)
+
+    def test_batch_values_are_from_event_repeat(self):
+        """
+        """
+        values = self.svc.getCrfItemValuesV2(
+            self.session, "S_SITE", "PID1", "SE_TREATMENT", "2",
+            [("F_DICOM_V10", "I_DICOM_CT")]
+        )
+
+        self.assertEqual(["1.2.3.9"], values)
+
+    def test_batch_item_without_value(self):
+        """
+        """
+        values = self.svc.getCrfItemValuesV2(
+            self.session, "S_SITE", "PID1", "SE_TREATMENT", "1",
+            [("F_DICOM_V10", "I_DICOM_RTPLAN"), ("F_DICOM_V99", "I_DICOM_CT")]
+        )
+
+        # Item is in form but has no data, form version is not in event
+        self.assertEqual([None, ""], values)
+
+    def test_batch_values_of_unknown_study_site(self):
+        """
+        """
+        values = self.svc.getCrfItemValuesV2(
+            self.session, "S_UNKNOWN", "PID1", "SE_TREATMENT", "1",
+            [("F_DICOM_V10", "I_DICOM_CT")]
+        )
+
+        self.assertEqual([""], values)
+
+    def test_batch_without_items_does_not_query(self):
+        """
+        """
+        self.assertEqual([], self.svc.getCrfItemValuesV2(None, "S_SITE", "PID1", "SE_TREATMENT", "1", []))
+
+    def test_engines_do_not_echo_statements(self):
+        """
+        """
+        self.assertFalse(self.svc.engine.echo)
+
+    def test_oc_engine_is_reused(self):
+        """
+        """
+        self.svc.createOcDbConnection("user", "password", "openclinica", "localhost", "5432")
+        engine = self.svc.ocengine
+        self.svc.createOcDbConnection("user", "password", "openclinica", "localhost", "5432")
+
+        self.assertIs(engine, self.svc.ocengine)
+
+        self.svc.createOcDbConnection("user", "password", "openclinica", "otherhost", "5432")
+
+        self.assertIsNot(engine, self.svc.ocengine)
+
+    def test_slow_queries_are_logged(self):
+        """
+        """
+        handler = RecordingHandler()
+        logger = logging.getLogger("services.DataPersistanceService")
+        logger.addHandler(handler)
+        try:
+            # Every query is slower than zero threshold
+            self.svc._slowQueryThreshold = 0
+            self.svc._logSlowQueries(self.engine)
+
+            self.svc.getCrfItemValuesV2(
+                self.session, "S_SITE", "PID1", "SE_TREATMENT", "1",
+                [("F_DICOM_V10", "I_DICOM_CT")]
+            )
+        finally:
+            logger.removeHandler(handler)
+
+        self.assertEqual(1, len(handler.messages))
+        self.assertTrue(handler.messages[0].startswith("Slow query"))
+        self.assertFalse("PID1" in handler.messages[0])
+
+    def test_failed_queries_are_timed_without_connection_state(self):
+        """
+        """
+        self.svc._slowQueryThreshold = 0
+        self.svc._logSlowQueries(self.engine)
+
+        conn = self.engine.connect()
+        try:
+            self.assertRaises(Exception, conn.execute, "select * from missing_table")
+            conn.execute("select 1")
+
+            self.assertFalse("queryStartTime" in conn.info)
+        finally:
+            conn.close()
+
+    def test_pool_settings_default_to_configuration(self):
+        """
+        """
+        poolSize = ConfigDetails().dbPoolSize
+        ConfigDetails().dbPoolSize = 3
+        try:
+            svc = DataPersistanceService("user", "password", "radplanbio", "localhost", "5432", maxOverflow=1)
+        finally:
+            ConfigDetails().dbPoolSize = poolSize
+
+        self.assertEqual(3, svc._poolSize)
+        self.assertEqual(1, svc._maxOverflow)
+        self.assertEqual(ConfigDetails().dbPoolRecycle, svc._poolRecycle)
+
+
+def suite():
+    """
+    """
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestDataPersistanceService))
+
+    return suite
+
+if __name__ == '__main__':
+    unittest.main()
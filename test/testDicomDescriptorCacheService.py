@@ -0,0 +1,107 @@
+import sys, os, shutil, tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath("./../"))
+
+from services.DicomDescriptorCacheService import DicomDescriptorCacheService
+
+
+class UID(str):
+    """Element value type (subclass of built-in type) as created by DICOM parsing
+    """
+    pass
+
+
+class IS(int):
+    """Element value type (subclass of built-in type) as created by DICOM parsing
+    """
+    pass
+
+
+class TestDicomDescriptorCacheService(unittest.TestCase):
+    """
+    """
+    def setUp(self):
+        """Set up data used in the tests.
+        setUp is called before each test function execution.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.dicomFile = os.path.join(self.folder, "CT.dcm")
+        with open(self.dicomFile, "wb") as f:
+            f.write(b"DICM")
+
+        self.result = ({"Filename": self.dicomFile, "Modality": "CT"}, {}, None, [])
+
+        self.svc = DicomDescriptorCacheService(os.path.join(self.folder, "cache.db"))
+        self.svc.open()
+
+    def tearDown(self):
+        """Clean up after each test function execution.
+        """
+        self.svc.close()
+        shutil.rmtree(self.folder)
+
+    def test_unknown_file_is_not_cached(self):
+        """
+        """
+        self.assertIsNone(self.svc.lookup(self.dicomFile))
+        self.assertEqual(1, self.svc.misses)
+
+    def test_stored_result_is_returned_for_unchanged_file(self):
+        """
+        """
+        self.svc.store(self.dicomFile, self.result)
+
+        self.assertEqual(self.result, self.svc.lookup(self.dicomFile))
+        self.assertEqual(1, self.svc.hits)
+
+    def test_stored_result_survives_reopening(self):
+        """
+        """
+        self.svc.store(self.dicomFile, self.result)
+        self.svc.close()
+        self.svc.open()
+
+        self.assertEqual(self.result, self.svc.lookup(self.dicomFile))
+
+    def test_changed_file_is_not_cached(self):
+        """
+        """
+        self.svc.store(self.dicomFile, self.result)
+        with open(self.dicomFile, "ab") as f:
+            f.write(b"changed")
+
+        self.assertIsNone(self.svc.lookup(self.dicomFile))
+
+    def test_cached_descriptor_refers_to_lookup_path(self):
+        """
+        """
+        self.svc.store(self.dicomFile, self.result)
+        relativePath = os.path.relpath(self.dicomFile)
+
+        self.assertEqual(relativePath, self.svc.lookup(relativePath)[0]["Filename"])
+
+    def test_element_values_are_stored_as_plain_values(self):
+        """
+        """
+        descriptor = {"Filename": self.dicomFile, "SOPInstanceUID": UID("1.2.3"), "InstanceNumber": IS(7)}
+        self.svc.store(self.dicomFile, (descriptor, {IS(1): [UID("GTV")]}, None, []))
+
+        descriptor, rois, studyDate, errors = self.svc.lookup(self.dicomFile)
+
+        self.assertIs(str, type(descriptor["SOPInstanceUID"]))
+        self.assertIs(int, type(descriptor["InstanceNumber"]))
+        self.assertEqual({1: ["GTV"]}, rois)
+        self.assertIs(str, type(rois[1][0]))
+
+
+def suite():
+    """
+    """
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestDicomDescriptorCacheService))
+
+    return suite
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import sys, os
+import unittest
+
+sys.path.insert(0, os.path.abspath("./../"))
+
+from dcm.DicomDescriptorStore import DicomDescriptorStore
+
+
+class TestDicomDescriptorStore(unittest.TestCase):
+    """
+    """
+    def setUp(self):
+        """Set up data used in the tests.
+        setUp is called before each test function execution.
+        """
+        self.store = DicomDescriptorStore()
+        self.store.append({"Filename": "CT1.dcm", "Modality": "CT", "SOPInstanceUID": "1.1"})
+        self.store.append({"Filename": "CT2.dcm", "Modality": "CT", "SOPInstanceUID": "1.2"})
+        self.store.append({"Filename": "RS.dcm", "Modality": "RTSTRUCT", "SOPInstanceUID": "1.3",
+                           "ContourImageSequence": ["1.1", "1.2"]})
+
+    def test_size_is_number_of_appended_descriptors(self):
+        """
+        """
+        self.assertEqual(3, len(self.store))
+
+    def test_unique_returns_distinct_values(self):
+        """
+        """
+        self.assertEqual(["CT", "RTSTRUCT"], sorted(self.store.unique("Modality")))
+        self.assertEqual([], self.store.unique("RTPlanLabel"))
+
+    def test_belonging_to_returns_matching_descriptors(self):
+        """
+        """
+        result = self.store.belongingTo("Modality", "CT")
+
+        self.assertEqual(["1.1", "1.2"], [d["SOPInstanceUID"] for d in result])
+        self.assertEqual([], self.store.belongingTo("Modality", "RTPLAN"))
+
+    def test_missing_tags_are_not_in_descriptor(self):
+        """
+        """
+        descriptor = self.store.belongingTo("Filename", "CT1.dcm")[0]
+
+        self.assertFalse("ContourImageSequence" in descriptor)
+        self.assertEqual(["1.1", "1.2"], self.store.belongingTo("Modality", "RTSTRUCT")[0]["ContourImageSequence"])
+
+    def test_tag_added_later_is_missing_in_previous_rows(self):
+        """
+        """
+        self.store.append({"Filename": "RP.dcm", "Modality": "RTPLAN", "RTPlanLabel": "Plan"})
+
+        self.assertEqual(1, len(self.store.belongingTo("RTPlanLabel", "Plan")))
+        self.assertEqual(["Plan"], self.store.unique("RTPlanLabel"))
+        self.assertFalse("RTPlanLabel" in self.store.row(0))
+
+
+def suite():
+    """
+    """
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestDicomDescriptorStore))
+
+    return suite
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import sys, os
+import unittest
+
+sys.path.insert(0, os.path.abspath("./../"))
+
+if sys.version < "3":
+    from dicom.dataset import Dataset
+    from dicom.sequence import Sequence
+else:
+    from pydicom.dataset import Dataset
+    from pydicom.sequence import Sequence
+
+from dcm.DicomTagPathExtractor import DicomTagPathExtractor
+
+
+class TestDicomTagPathExtractor(unittest.TestCase):
+    """
+    """
+    def setUp(self):
+        """Set up data used in the tests.
+        setUp is called before each test function execution.
+        """
+        # RTSTRUCT like dataset with nested references
+        self.dataset = Dataset()
+        self.dataset.Modality = "RTSTRUCT"
+        self.dataset.FrameOfReferenceUID = "1.2.3.1"
+        self.dataset.ImagePositionPatient = ["-1.5", "2", "3.25"]
+
+        referencedFrameOfReference = Dataset()
+        referencedFrameOfReference.FrameOfReferenceUID = "1.2.3.2"
+        self.dataset.ReferencedFrameOfReferenceSequence = Sequence([referencedFrameOfReference])
+
+        contours = []
+        for uid in ["1.2.3.10", "1.2.3.11"]:
+            contourImage = Dataset()
+            contourImage.ReferencedSOPInstanceUID = uid
+            contour = Dataset()
+            contour.ContourImageSequence = Sequence([contourImage])
+            contours.append(contour)
+
+        roiContour = Dataset()
+        roiContour.ContourSequence = Sequence(contours)
+        self.dataset.ROIContourSequence = Sequence([roiContour])
+
+    def test_direct_element_is_extracted(self):
+        """
+        """
+        extractor = DicomTagPathExtractor({"Modality": "(0008,0060)"})
+
+        self.assertEqual({"Modality": "RTSTRUCT"}, extractor.extract(self.dataset))
+
+    def test_nested_elements_are_collected(self):
+        """
+        """
+        extractor = DicomTagPathExtractor(
+            {
+                "ContourImageSequence": "(3006,0039)>(3006,0040)>(3006,0016)>(0008,1155)",
+                "LastContourImage": "(3006,0039)>(3006,0040)>(3006,0016)>(0008,1155)"
+            },
+            collected=["ContourImageSequence"]
+        )
+        values = extractor.extract(self.dataset)
+
+        self.assertEqual(["1.2.3.10", "1.2.3.11"], values["ContourImageSequence"])
+        self.assertEqual("1.2.3.11", values["LastContourImage"])
+
+    def test_any_depth_element_is_matched_in_sequences(self):
+        """
+        """
+        extractor = DicomTagPathExtractor(
+            {
+                "FrameOfReferenceUID": "*>(0020,0052)",
+                "FrameOfReferenceUIDs": "*>(0020,0052)"
+            },
+            collected=["FrameOfReferenceUIDs"]
+        )
+        values = extractor.extract(self.dataset)
+
+        # Elements are visited in tag order, the last occurrence wins
+        self.assertEqual(["1.2.3.1", "1.2.3.2"], values["FrameOfReferenceUIDs"])
+        self.assertEqual("1.2.3.2", values["FrameOfReferenceUID"])
+
+    def test_missing_elements_are_not_extracted(self):
+        """
+        """
+        extractor = DicomTagPathExtractor(
+            {
+                "RTPlanLabel": "(300A,0002)",
+                "ReferencedSOPInstanceUID_RTPLAN": "(300C,0002)>(0008,1155)",
+                "RadiationType": "*>(300A,00C6)",
+                "ReferencedRTPlans": "(300C,0002)>(0008,1155)"
+            },
+            collected=["ReferencedRTPlans"]
+        )
+
+        self.assertEqual({"ReferencedRTPlans": []}, extractor.extract(self.dataset))
+
+    def test_multi_valued_element_is_extracted(self):
+        """
+        """
+        extractor = DicomTagPathExtractor({"ImagePositionPatient": "(0020,0032)"})
+        values = extractor.extract(self.dataset)
+
+        self.assertEqual([-1.5, 2.0, 3.25], [float(v) for v in values["ImagePositionPatient"]])
+
+    def test_any_depth_path_addresses_one_element(self):
+        """
+        """
+        self.assertRaises(ValueError, DicomTagPathExtractor, {"Invalid": "*>(3006,0039)>(3006,0084)"})
+
+
+def suite():
+    """
+    """
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestDicomTagPathExtractor))
+
+    return suite
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import sys, os, shutil, tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath("./../"))
+
+from dcm.DicomUidMap import DicomUidMap
+
+
+class TestDicomUidMap(unittest.TestCase):
+    """
+    """
+    def setUp(self):
+        """Set up data used in the tests.
+        setUp is called before each test function execution.
+        """
+        self.uidMap = DicomUidMap()
+        self.uidMap.add("1.2.3", "2.25.1")
+        self.uidMap.add("1.2.4", "2.25.2")
+
+    def test_mapped_uid_is_returned(self):
+        """
+        """
+        self.assertEqual("2.25.1", self.uidMap["1.2.3"])
+        self.assertTrue("1.2.4" in self.uidMap)
+        self.assertEqual(2, len(self.uidMap))
+
+    def test_unknown_uid_is_not_mapped(self):
+        """
+        """
+        self.assertFalse("1.2.5" in self.uidMap)
+        self.assertIsNone(self.uidMap.get("1.2.5"))
+        self.assertRaises(KeyError, lambda: self.uidMap["1.2.5"])
+
+    def test_persisted_mapping_can_be_loaded(self):
+        """
+        """
+        folder = tempfile.mkdtemp()
+        try:
+            fileName = os.path.join(folder, "uids.csv")
+            self.uidMap.save(fileName)
+
+            loaded = DicomUidMap.load(fileName)
+
+            self.assertEqual(sorted(self.uidMap.items()), sorted(loaded.items()))
+        finally:
+            shutil.rmtree(folder)
+
+
+def suite():
+    """
+    """
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestDicomUidMap))
+
+    return suite
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import sys, os, shutil, tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath("./../"))
+
+from utils.MultipartFileStream import MultipartFileStream
+
+
+class TestMultipartFileStream(unittest.TestCase):
+    """
+    """
+    def setUp(self):
+        """Set up data used in the tests.
+        setUp is called before each test function execution.
+        """
+        self.folder = tempfile.mkdtemp()
+
+        self.contents = [b"DICM" * 100, b"", b"0123456789"]
+        self.filenames = []
+        for i, content in enumerate(self.contents):
+            filename = os.path.join(self.folder, "CT%d.dcm" % i)
+            with open(filename, "wb") as f:
+                f.write(content)
+            self.filenames.append(filename)
+
+        self.expected = b""
+        for content in self.contents:
+            self.expected += b"\r\n--b0\r\nContent-Type: application/dicom\r\n\r\n" + content
+        self.expected += b"\r\n--b0--"
+
+    def tearDown(self):
+        """Clean up after each test function execution.
+        """
+        shutil.rmtree(self.folder)
+
+    def test_length_is_known_in_advance(self):
+        """
+        """
+        stream = MultipartFileStream(self.filenames, "b0", "application/dicom")
+
+        self.assertEqual(len(self.expected), len(stream))
+
+    def test_read_all_returns_multipart_body(self):
+        """
+        """
+        stream = MultipartFileStream(self.filenames, "b0", "application/dicom")
+
+        self.assertEqual(self.expected, stream.read())
+        self.assertEqual(b"", stream.read())
+
+    def test_read_in_small_blocks_returns_multipart_body(self):
+        """
+        """
+        stream = MultipartFileStream(self.filenames, "b0", "application/dicom")
+
+        blocks = []
+        while True:
+            block = stream.read(7)
+            if not block:
+                break
+            self.assertTrue(len(block) <= 7)
+            blocks.append(block)
+
+        self.assertEqual(self.expected, b"".join(blocks))
+
+    def test_iteration_returns_multipart_body(self):
+        """
+        """
+        stream = MultipartFileStream(self.filenames, "b0", "application/dicom", blockSize=64)
+
+        self.assertEqual(self.expected, b"".join(stream))
+
+
+def suite():
+    """
+    """
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestMultipartFileStream))
+
+    return suite
+
+if __name__ == '__main__':
+    unittest.main()
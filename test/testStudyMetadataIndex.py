@@ -0,0 +1,104 @@
+import sys, os
+import unittest
+
+sys.path.insert(0, os.path.abspath("./../"))
+
+from domain.StudyMetadataIndex import StudyMetadataIndex
+from services.OdmFileDataService import OdmFileDataService
+
+# Study metadata with one event and DICOM form
+METADATA = """<ODM xmlns="http://www.cdisc.org/ns/odm/v1.3" xmlns:OpenClinica="http://www.openclinica.org/ns/odm_ext_v130/v3.1">
+<Study OID="S_TEST">
+<MetaDataVersion OID="v1.0.0" Name="MetaDataVersion_v1.0.0">
+<Protocol>
+<StudyEventRef StudyEventOID="SE_TREATMENT" OrderNumber="1" Mandatory="Yes"/>
+</Protocol>
+<StudyEventDef OID="SE_TREATMENT" Name="Treatment" Repeating="Yes" Type="Scheduled">
+<FormRef FormOID="F_DICOM_V10" Mandatory="No"/>
+<FormRef FormOID="F_REPORT_V10" Mandatory="No"/>
+</StudyEventDef>
+<ItemGroupDef OID="IG_DICOM_PATIENT" Name="Patient" Repeating="No">
+<ItemRef ItemOID="I_DICOM_PID" Mandatory="Yes"/>
+</ItemGroupDef>
+<ItemGroupDef OID="IG_DICOM_STUDY" Name="Study" Repeating="No">
+<ItemRef ItemOID="I_DICOM_CT" Mandatory="No"/>
+<ItemRef ItemOID="I_DICOM_PID" Mandatory="No"/>
+</ItemGroupDef>
+<ItemDef OID="I_DICOM_PID" Name="PID" DataType="text" Comment="Patient ID" OpenClinica:FormOIDs="F_DICOM_V10">
+<OpenClinica:ItemDetails>
+<OpenClinica:ItemPresentInForm FormOID="F_DICOM_V10">
+<OpenClinica:LeftItemText>Patient identifier</OpenClinica:LeftItemText>
+</OpenClinica:ItemPresentInForm>
+</OpenClinica:ItemDetails>
+</ItemDef>
+<ItemDef OID="I_DICOM_CT" Name="CT" DataType="text" Comment="CT study" OpenClinica:FormOIDs="F_DICOM_V10,F_DICOM_V20"/>
+<OpenClinica:StudyParameterConfiguration>
+<OpenClinica:StudyParameterListRef StudyParameterListID="SPL_collectDob" Value="2"/>
+<OpenClinica:StudyParameterListRef StudyParameterListID="SPL_genderRequired" Value="true"/>
+</OpenClinica:StudyParameterConfiguration>
+</MetaDataVersion>
+</Study>
+</ODM>"""
+
+
+class TestStudyMetadataIndex(unittest.TestCase):
+    """
+    """
+    def setUp(self):
+        """Set up data used in the tests.
+        setUp is called before each test function execution.
+        """
+        self.index = StudyMetadataIndex(METADATA)
+        self.svc = OdmFileDataService()
+
+    def test_event_definitions_are_indexed(self):
+        """
+        """
+        self.assertEqual(["SE_TREATMENT"], self.index.studyEventRefs())
+        self.assertEqual(1, len(self.index.studyEventDefs("SE_TREATMENT")))
+        self.assertEqual(["F_DICOM_V10", "F_REPORT_V10"], self.index.formRefs("SE_TREATMENT"))
+        self.assertEqual([], self.index.formRefs("SE_UNKNOWN"))
+
+    def test_item_group_is_the_first_referencing_group(self):
+        """
+        """
+        self.assertEqual("IG_DICOM_PATIENT", self.svc.getItemGroupOidFromMetadata(self.index, "I_DICOM_PID"))
+        self.assertEqual("IG_DICOM_STUDY", self.svc.getItemGroupOidFromMetadata(METADATA, "I_DICOM_CT"))
+        self.assertIsNone(self.svc.getItemGroupOidFromMetadata(self.index, "I_UNKNOWN"))
+
+    def test_item_oid_is_found_by_form_and_name(self):
+        """
+        """
+        self.assertEqual("I_DICOM_PID", self.svc.getItemOidFromMetadata(self.index, "F_DICOM_V10", "PID"))
+        self.assertEqual("I_DICOM_CT", self.svc.getItemOidFromMetadata(METADATA, "F_DICOM_V10,F_DICOM_V20", "CT"))
+        self.assertIsNone(self.svc.getItemOidFromMetadata(self.index, "F_DICOM_V10", "CT"))
+
+    def test_crf_item_is_loaded(self):
+        """
+        """
+        item = self.svc.loadCrfItem("F_DICOM_V10", "I_DICOM_PID", self.index)
+
+        self.assertEqual("I_DICOM_PID", item.oid)
+        self.assertEqual("Patient identifier", item.label)
+        self.assertEqual("text", item.dataType)
+        self.assertIsNone(self.svc.loadCrfItem("F_REPORT_V10", "I_DICOM_PID", self.index))
+
+    def test_study_parameter_configuration_is_loaded(self):
+        """
+        """
+        configuration = self.svc.getStudyParameterConfigurationFromMetadata(self.index)
+
+        self.assertEqual("ONLY_YEAR", configuration.collectSubjectDob)
+        self.assertTrue(configuration.sexRequired)
+
+
+def suite():
+    """
+    """
+    suite = unittest.TestSuite()
+    suite.addTest(unittest.makeSuite(TestStudyMetadataIndex))
+
+    return suite
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#### ##     ## ########   #######  ########  ########  ######
+ ##  ###   ### ##     ## ##     ## ##     ##    ##    ##    ##
+ ##  #### #### ##     ## ##     ## ##     ##    ##    ##
+ ##  ## ### ## ########  ##     ## ########     ##     ######
+ ##  ##     ## ##        ##     ## ##   ##      ##          ##
+ ##  ##     ## ##        ##     ## ##    ##     ##    ##    ##
+#### ##     ## ##         #######  ##     ##    ##     ######
+
+# Standard
+import os
+
+
+class MultipartFileStream(object):
+    """MultipartFileStream
+    File-like body of HTTP multipart request which reads parts from files lazily in blocks,
+    so the memory does not depend on number and size of the files.
+
+    Length of the body is known in advance (Content-Length is sent instead of chunked encoding).
+
+    filenames: files which content is sent as parts
+    boundary: multipart boundary
+    contentType: content type of each part
+    """
+
+    def __init__(self, filenames, boundary, contentType, blockSize=64 * 1024):
+        """Default constructor
+        """
+        self._blockSize = blockSize
+
+        # Segments of the body: bytes or (filename, size)
+        self._segments = []
+        for filename in filenames:
+            self._segments.append((
+                "\r\n--{boundary}"
+                "\r\nContent-Type: {contentType}\r\n\r\n".format(
+                    boundary=boundary,
+                    contentType=contentType
+                )
+            ).encode("utf-8"))
+            self._segments.append((filename, os.path.getsize(filename)))
+        self._segments.append("\r\n--{boundary}--".format(boundary=boundary).encode("utf-8"))
+
+        self._length = 0
+        for segment in self._segments:
+            self._length += self._segmentSize(segment)
+
+        # Reading position
+        self._segmentIndex = 0
+        self._segmentOffset = 0
+        self._file = None
+
+    def __len__(self):
+        """Length of the body in bytes
+        """
+        return self._length
+
+    def __iter__(self):
+        """Iterate over the body in blocks
+        """
+        while True:
+            block = self.read(self._blockSize)
+            if not block:
+                break
+            yield block
+
+    def read(self, size=-1):
+        """Read at most size bytes of the body (all remaining bytes when size is negative)
+        """
+        if size is None or size < 0:
+            size = self._length
+
+        blocks = []
+        while size > 0 and self._segmentIndex < len(self._segments):
+            segment = self._segments[self._segmentIndex]
+
+            if isinstance(segment, tuple):
+                if self._file is None:
+                    self._file = open(segment[0], "rb")
+                block = self._file.read(min(size, segment[1] - self._segmentOffset))
+            else:
+                block = segment[self._segmentOffset:self._segmentOffset + size]
+
+            self._segmentOffset += len(block)
+            size -= len(block)
+            if block:
+                blocks.append(block)
+
+            # Next segment
+            if self._segmentOffset >= self._segmentSize(segment) or not block:
+                self._nextSegment()
+
+        return b"".join(blocks)
+
+    def close(self):
+        """Close the file which is being read
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _nextSegment(self):
+        """Move reading position to the beginning of next segment
+        """
+        self.close()
+        self._segmentIndex += 1
+        self._segmentOffset = 0
+
+    @staticmethod
+    def _segmentSize(segment):
+        """Size of segment in bytes
+        """
+        if isinstance(segment, tuple):
+            return segment[1]
+        else:
+            return len(segment)